@@ -6,6 +6,9 @@ from PyInstaller.utils.hooks import copy_metadata
 datas = []
 binaries = []
 hiddenimports = ['fitz', 'pymupdf', 'PIL._tkinter_finder', 'PIL.Image', 'PIL.ImageTk']
+# 起動を速くするために最初に使う時に読み込むモジュール（importlib経由なので自動では検出されない）
+hiddenimports += ['PIL.ImageOps', 'PIL.ImageDraw', 'numpy', 'pyperclip', 'webbrowser']
+datas += [('hippo_019_placeholder.png', '.')]
 datas += collect_data_files('pymupdf')
 datas += copy_metadata('pymupdf')
 tmp_ret = collect_all('pymupdf')
@@ -0,0 +1,109 @@
+"""ディスプレイリストによるズーム時レンダリングのベンチマーク
+
+Ctrl+ホイールでのズーム操作（1段ごとに低品質→高品質の2回描画）を再現し、
+毎回 page.get_pixmap() でページを解釈し直す方式と、
+ディスプレイリストを1回だけ作成して描画し直す方式の時間を比較する。
+
+使い方:
+    python benchmarks/display_list.py [file.pdf] [--page N] [--steps N] [--segments N]
+
+PDFを省略した場合はCAD出力を模した線分の多い合成ページを使う。
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import fitz  # PyMuPDF
+
+from pdf_viewer import render_pdf_tile
+
+VIEW_SIZE = (1000, 700)  # 描画する表示範囲（ピクセル）
+
+
+def make_cad_pdf(path, segments):
+    """線分を大量に含むA1の合成ページを作成
+
+    Shapeで1本ずつ描くと遅いので、コンテンツストリームを直接書き込む。
+    """
+    rng = random.Random(0)
+    ops = ["0 G 0.2 w"]
+    for _ in range(segments):
+        x = rng.uniform(0, 2384)
+        y = rng.uniform(0, 1684)
+        ops.append(f"{x:.2f} {y:.2f} m {x + rng.uniform(-30, 30):.2f} {y + rng.uniform(-30, 30):.2f} l S")
+
+    doc = fitz.open()
+    page = doc.new_page(width=2384, height=1684)
+    page.draw_line((0, 0), (1, 1))  # コンテンツストリームを作らせる
+    doc.update_stream(page.get_contents()[0], "\n".join(ops).encode())
+    doc.save(path, deflate=True)
+    doc.close()
+
+
+def zoom_steps(steps):
+    """ズーム操作と同じく1.5倍から1.1倍ずつ拡大した倍率の列"""
+    zoom = 1.5
+    result = []
+    for _ in range(steps):
+        zoom = min(10.0, zoom * 1.1)
+        result.append(zoom)
+    return result
+
+
+def run(source, zooms):
+    """各ズーム段で低品質→高品質の順に表示範囲を描画し、1段ごとの時間を返す"""
+    box = (0, 0) + VIEW_SIZE
+    times = []
+    for zoom in zooms:
+        start = time.perf_counter()
+        render_pdf_tile(source, zoom, box, 'low', False)
+        render_pdf_tile(source, zoom, box, 'high', False)
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('pdf', nargs='?', help='計測に使うPDF（省略時は合成ページ）')
+    parser.add_argument('--page', type=int, default=0, help='ページ番号（0始まり）')
+    parser.add_argument('--steps', type=int, default=10, help='ズームの段数')
+    parser.add_argument('--segments', type=int, default=200000, help='合成ページの線分の数')
+    args = parser.parse_args()
+
+    tmp_dir = None
+    pdf_path = args.pdf
+    if pdf_path is None:
+        tmp_dir = tempfile.TemporaryDirectory()
+        pdf_path = os.path.join(tmp_dir.name, 'cad.pdf')
+        make_cad_pdf(pdf_path, args.segments)
+
+    doc = fitz.open(pdf_path)
+    page = doc[args.page]
+    zooms = zoom_steps(args.steps)
+
+    page_times = run(page, zooms)
+
+    start = time.perf_counter()
+    display_list = page.get_displaylist()
+    build_time = time.perf_counter() - start
+    list_times = run(display_list, zooms)
+
+    print(f"{'zoom':>6} {'page ms':>9} {'dlist ms':>9}")
+    for zoom, t_page, t_list in zip(zooms, page_times, list_times):
+        print(f"{zoom:>6.2f} {t_page * 1000:>9.1f} {t_list * 1000:>9.1f}")
+    print(f"display list build: {build_time * 1000:.1f} ms")
+    print(f"total page.get_pixmap: {sum(page_times) * 1000:.1f} ms")
+    print(f"total display list (incl. build): {(sum(list_times) + build_time) * 1000:.1f} ms")
+
+    doc.close()
+    if tmp_dir is not None:
+        tmp_dir.cleanup()
+
+
+if __name__ == '__main__':
+    main()
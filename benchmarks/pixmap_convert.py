@@ -0,0 +1,122 @@
+"""Pixmap → PIL Image 変換のベンチマーク
+
+PPMへのエンコード/デコードを経由する旧方式と、画素バッファを直接読み込む
+pixmap_to_image() を比較し、1フレームあたりの時間とピークメモリを表示する。
+
+使い方:
+    python benchmarks/pixmap_convert.py [file.pdf] [--page N] [--repeat N]
+
+PDFを省略した場合はA4の合成ページ（線画＋文字）を使う。
+ピークメモリは計測ケースごとに別プロセスで測り、変換前からの増加量を表示する。
+"""
+import argparse
+import io
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import fitz  # PyMuPDF
+from PIL import Image
+
+from pdf_viewer import pixmap_to_image
+
+ZOOMS = [1.5, 4.0, 10.0]
+METHODS = ['ppm', 'direct']
+
+
+def peak_rss_bytes():
+    """プロセスのピークRSS（バイト）。取得できない環境ではNone"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOSはバイト、Linuxはキロバイト単位
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def make_sample_pdf(path):
+    """線画と文字を含むA4の合成ページを作成"""
+    doc = fitz.open()
+    page = doc.new_page(width=595, height=842)
+    shape = page.new_shape()
+    for i in range(0, 595, 5):
+        shape.draw_line((i, 0), (595 - i, 842))
+    for j in range(0, 842, 5):
+        shape.draw_line((0, j), (595, 842 - j))
+    shape.finish(color=(0, 0, 0), width=0.3)
+    shape.commit()
+    for j in range(40, 842, 20):
+        page.insert_text((20, j), "PDF XY Viewer benchmark 0123456789 " * 3, fontsize=8)
+    doc.save(path)
+    doc.close()
+
+
+def convert(pix, method):
+    """指定した方式でPixmapをPIL Imageに変換"""
+    if method == 'ppm':
+        return Image.open(io.BytesIO(pix.tobytes("ppm")))
+    return pixmap_to_image(pix)
+
+
+def run_case(pdf_path, page_index, zoom, method, repeat):
+    """1ケースを計測（子プロセスで実行される）"""
+    doc = fitz.open(pdf_path)
+    pix = doc[page_index].get_pixmap(matrix=fitz.Matrix(zoom, zoom), alpha=False)
+    # 変換前の状態を基準にする（Pixmap自体の分は含めない）
+    base = peak_rss_bytes()
+
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        img = convert(pix, method)
+        img.load()
+        times.append(time.perf_counter() - start)
+        del img
+
+    peak = peak_rss_bytes()
+    extra = None if base is None else peak - base
+    times.sort()
+    print(f"{pix.width}x{pix.height} {times[len(times) // 2]:.6f} {extra if extra is not None else -1}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('pdf', nargs='?', help='計測に使うPDF（省略時は合成ページ）')
+    parser.add_argument('--page', type=int, default=0, help='ページ番号（0始まり）')
+    parser.add_argument('--repeat', type=int, default=5, help='各ケースの繰り返し回数')
+    parser.add_argument('--case', nargs=2, metavar=('ZOOM', 'METHOD'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.case:
+        run_case(args.pdf, args.page, float(args.case[0]), args.case[1], args.repeat)
+        return
+
+    tmp_dir = None
+    pdf_path = args.pdf
+    if pdf_path is None:
+        tmp_dir = tempfile.TemporaryDirectory()
+        pdf_path = os.path.join(tmp_dir.name, 'sample.pdf')
+        make_sample_pdf(pdf_path)
+
+    print(f"{'zoom':>6} {'method':>7} {'size':>12} {'median ms':>10} {'peak +MB':>9}")
+    for zoom in ZOOMS:
+        for method in METHODS:
+            out = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), pdf_path, '--page', str(args.page),
+                 '--repeat', str(args.repeat), '--case', str(zoom), method],
+                capture_output=True, text=True, check=True).stdout.split()
+            size, median, extra = out[-3], float(out[-2]), int(out[-1])
+            extra_mb = f"{extra / 1024 / 1024:.1f}" if extra >= 0 else "n/a"
+            print(f"{zoom:>6} {method:>7} {size:>12} {median * 1000:>10.1f} {extra_mb:>9}")
+
+    if tmp_dir is not None:
+        tmp_dir.cleanup()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,427 @@
+"""合成した重いファイルによる表示処理のベンチマーク一式
+
+線分の多いCAD図面、単語の多いページ、巨大な埋め込み画像、巨大なページサイズの
+PDFと、大きなPNG/JPEGを生成し、次の処理の時間を計測する。
+
+- open: ファイルを開いて1ページ目を表示できる状態にするまで
+- render: 表示範囲のタイルの描画（ズーム倍率 × 低品質/高品質 × 反転あり/なし）
+- markers: 大量のマーカーのオーバーレイの再描画（ズーム倍率ごと）
+
+各ケースは別プロセスで計測し、中央値・p95（ミリ秒）とピークRSSをJSONで出力する。
+2回の結果を --compare で比較すると、悪化したケースを表示して終了コード1を返す。
+
+使い方:
+    python benchmarks/render_suite.py [--output result.json] [--data-dir DIR] [--repeat N]
+                                      [--filter TEXT] [--scale S]
+    python benchmarks/render_suite.py --compare before.json after.json [--threshold 0.1]
+
+--data-dir を指定すると生成したファイルを残し、次回以降はそれを使う（比較する
+実行どうしで同じ入力を使うため）。--scale で生成するファイルの大きさを変えられる。
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import fitz  # PyMuPDF
+import numpy as np
+from PIL import Image, ImageDraw
+
+from pdf_viewer import (LARGE_IMAGE_MB, TILE_SIZE, ImagePyramid, MappedImageStore, MarkerStore,
+                        bytes_per_pixel, display_image_mode, load_mapped_image, render_image_tile,
+                        render_marker_overlay, render_pdf_tile)
+
+VIEW_SIZE = (1000, 700)  # 描画する表示範囲（ピクセル）
+ZOOMS = [0.5, 1.5, 4.0, 10.0]
+QUALITIES = ['low', 'high']
+MARKER_COUNT = 100000  # markers ケースのマーカーの数
+MARKER_INPUT = 'cad.pdf'  # markers ケースで使うページ
+
+
+def peak_rss_bytes():
+    """プロセスのピークRSS（バイト）。取得できない環境ではNone
+
+    Linuxの ru_maxrss は exec をまたいで親プロセスの値を引き継ぐ（入力を生成して
+    大きくなった親の値が子プロセスの結果に出てしまう）ので、/proc の VmHWM を優先する。
+    """
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOSはバイト、Linuxはキロバイト単位
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def write_content_pdf(path, width, height, ops):
+    """コンテンツストリームを直接書き込んだ1ページのPDFを作成
+
+    Shapeで1つずつ描くと遅いので、演算子の列をそのままストリームにする。
+    """
+    doc = fitz.open()
+    page = doc.new_page(width=width, height=height)
+    page.insert_text((0, 0), "x", fontname="helv", fontsize=1)  # コンテンツストリームとフォントを作らせる
+    font = page.get_fonts()[0][4]
+    doc.update_stream(page.get_contents()[0], "\n".join(ops).replace("/F ", f"/{font} ").encode())
+    doc.save(path, deflate=True)
+    doc.close()
+
+
+def make_cad_pdf(path, scale):
+    """線分を大量に含むA1の図面"""
+    rng = random.Random(0)
+    ops = ["0 G 0.2 w"]
+    for _ in range(int(200000 * scale)):
+        x = rng.uniform(0, 2384)
+        y = rng.uniform(0, 1684)
+        ops.append(f"{x:.2f} {y:.2f} m {x + rng.uniform(-30, 30):.2f} {y + rng.uniform(-30, 30):.2f} l S")
+    write_content_pdf(path, 2384, 1684, ops)
+
+
+def make_words_pdf(path, scale):
+    """小さな単語を大量に含むA1のページ"""
+    rng = random.Random(1)
+    ops = ["BT /F 4 Tf"]
+    for i in range(int(50000 * scale)):
+        ops.append(f"1 0 0 1 {rng.uniform(0, 2350):.1f} {rng.uniform(10, 1680):.1f} Tm (W{i}) Tj")
+    ops.append("ET")
+    write_content_pdf(path, 2384, 1684, ops)
+
+
+def make_image_pdf(path, scale):
+    """巨大な写真（JPEG）を埋め込んだA4のページ"""
+    width, height = int(6000 * scale ** 0.5), int(4000 * scale ** 0.5)
+    doc = fitz.open()
+    page = doc.new_page(width=842, height=595)
+    page.insert_image(page.rect, stream=encode_image(synthetic_image(width, height), 'JPEG'))
+    doc.save(path)
+    doc.close()
+
+
+def make_huge_pdf(path, scale):
+    """PDFの上限（14400pt角）の大きさのページに格子と文字を描いたもの"""
+    size = 14400
+    step = max(4, int(40 / scale))
+    ops = ["0 G 0.5 w"]
+    for v in range(0, size + 1, step):
+        ops.append(f"{v} 0 m {v} {size} l S 0 {v} m {size} {v} l S")
+    ops.append("BT /F 12 Tf")
+    for v in range(0, size, step * 10):
+        for u in range(0, size, step * 10):
+            ops.append(f"1 0 0 1 {u + 2} {v + 2} Tm ({u},{v}) Tj")
+    ops.append("ET")
+    write_content_pdf(path, size, size, ops)
+
+
+def make_png(path, scale):
+    """大きなPNG画像"""
+    width, height = int(8000 * scale ** 0.5), int(6000 * scale ** 0.5)
+    synthetic_image(width, height).save(path, compress_level=1)
+
+
+def make_jpeg(path, scale):
+    """大きなJPEG画像"""
+    width, height = int(12000 * scale ** 0.5), int(9000 * scale ** 0.5)
+    synthetic_image(width, height).save(path, quality=90)
+
+
+def synthetic_image(width, height):
+    """グラデーションに線と雑音を重ねたRGB画像（圧縮が効きすぎないように雑音を入れる）"""
+    rng = np.random.default_rng(0)
+    img = Image.new('RGB', (width, height))
+    for y in range(0, height, 512):
+        rows = min(512, height - y)
+        gx = np.linspace(0, 255, width, dtype=np.float32)
+        gy = np.linspace(y, y + rows, rows, dtype=np.float32)[:, None] * 255 / height
+        strip = np.empty((rows, width, 3), dtype=np.uint8)
+        strip[..., 0] = gx
+        strip[..., 1] = gy
+        strip[..., 2] = rng.integers(0, 64, (rows, width), dtype=np.uint8)
+        img.paste(Image.fromarray(strip, 'RGB'), (0, y))
+    draw = ImageDraw.Draw(img)
+    lines = random.Random(2)
+    for _ in range(2000):
+        x, y = lines.uniform(0, width), lines.uniform(0, height)
+        draw.line((x, y, x + lines.uniform(-400, 400), y + lines.uniform(-400, 400)), fill=(0, 0, 0), width=3)
+    return img
+
+
+# 生成するファイル {ファイル名: 生成関数}（大きさは --scale 倍）
+INPUTS = {
+    'cad.pdf': make_cad_pdf,
+    'words.pdf': make_words_pdf,
+    'image.pdf': make_image_pdf,
+    'huge.pdf': make_huge_pdf,
+    'large.png': make_png,
+    'large.jpg': make_jpeg,
+}
+
+
+def encode_image(img, fmt):
+    """画像をファイル形式のバイト列にする"""
+    buffer = io.BytesIO()
+    img.save(buffer, fmt, quality=90)
+    return buffer.getvalue()
+
+
+def prepare_inputs(data_dir, scale):
+    """入力ファイルを生成（既にあれば使い回す）"""
+    for name, make in INPUTS.items():
+        path = os.path.join(data_dir, name)
+        if os.path.exists(path):
+            continue
+        start = time.perf_counter()
+        tmp_path = os.path.join(data_dir, 'tmp-' + name)  # 途中で止めても壊れたファイルが残らないように
+        make(tmp_path, scale)
+        os.replace(tmp_path, path)
+        print(f"generated {name}: {os.path.getsize(path) / 1024 / 1024:.1f} MB "
+              f"in {time.perf_counter() - start:.1f} s", file=sys.stderr)
+
+
+def list_cases():
+    """計測するケースの一覧 [(ケース名, 入力, 処理, パラメータ)]"""
+    cases = []
+    for name in INPUTS:
+        cases.append((f"open/{name}", name, 'open', {}))
+    for name in INPUTS:
+        for zoom in ZOOMS:
+            for quality in QUALITIES:
+                for invert in (False, True):
+                    case = f"render/{name}/z{zoom}/{quality}" + ("/invert" if invert else "")
+                    cases.append((case, name, 'render', {'zoom': zoom, 'quality': quality, 'invert': invert}))
+    for zoom in ZOOMS:
+        cases.append((f"markers/{MARKER_INPUT}/z{zoom}", MARKER_INPUT, 'markers',
+                      {'zoom': zoom, 'count': MARKER_COUNT}))
+    return cases
+
+
+def open_source(path):
+    """ビューアーと同じ手順でファイルを開く
+
+    Returns:
+        (描画に使うもの, ページの大きさ（ポイント/ピクセル）, 後始末する関数)
+        PDFはディスプレイリスト、画像はImagePyramid
+    """
+    if path.lower().endswith('.pdf'):
+        doc = fitz.open(path)
+        page = doc[0]
+        display_list = page.get_displaylist()
+        return display_list, (page.rect.width, page.rect.height), doc.close
+
+    img = Image.open(path)
+    mode = display_image_mode(img.mode)
+    if img.width * img.height * bytes_per_pixel(mode) > LARGE_IMAGE_MB * 1024 * 1024:
+        store = MappedImageStore()
+        return load_mapped_image(path, store), img.size, store.close
+    if img.mode != mode:
+        img = img.convert(mode)
+    img.load()
+    return ImagePyramid(img), img.size, lambda: None
+
+
+def view_tiles(page_size, zoom):
+    """ページ中央の表示範囲にかかるタイルの範囲（ビューアーと同じ TILE_SIZE 単位）"""
+    width, height = int(page_size[0] * zoom), int(page_size[1] * zoom)
+    vx = max(0, (width - VIEW_SIZE[0]) // 2)
+    vy = max(0, (height - VIEW_SIZE[1]) // 2)
+    boxes = []
+    for ty in range(vy // TILE_SIZE, (min(height, vy + VIEW_SIZE[1]) - 1) // TILE_SIZE + 1):
+        for tx in range(vx // TILE_SIZE, (min(width, vx + VIEW_SIZE[0]) - 1) // TILE_SIZE + 1):
+            boxes.append((tx * TILE_SIZE, ty * TILE_SIZE,
+                          min(width, (tx + 1) * TILE_SIZE), min(height, (ty + 1) * TILE_SIZE)))
+    return boxes, (vx, vy, vx + min(width, VIEW_SIZE[0]), vy + min(height, VIEW_SIZE[1]))
+
+
+def run_case(path, op, params, repeat):
+    """1ケースを計測（子プロセスで実行される）
+
+    Returns:
+        各回の時間（秒）のリスト、計測前のピークRSS、計測後のピークRSS
+    """
+    if op == 'open':
+        base = peak_rss_bytes()
+        times = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            source, _, close = open_source(path)
+            times.append(time.perf_counter() - start)
+            close()
+            del source
+        return times, base, peak_rss_bytes()
+
+    source, page_size, close = open_source(path)
+    zoom = params['zoom']
+    boxes, view = view_tiles(page_size, zoom)
+
+    if op == 'render':
+        render = render_pdf_tile if path.lower().endswith('.pdf') else render_image_tile
+
+        def step():
+            for box in boxes:
+                render(source, zoom, box, params['quality'], params['invert'])
+    else:
+        rng = np.random.default_rng(3)
+        markers = MarkerStore()
+        markers.extend(rng.uniform(0, page_size[0], params['count']),
+                       rng.uniform(0, page_size[1], params['count']))
+
+        def step():
+            # update_markers() と同じく表示範囲内を絞り込んでから1枚に描く
+            x0, y0, x1, y1 = view
+            index = markers.in_rect(x0 / zoom, y0 / zoom, x1 / zoom, y1 / zoom)
+            xs, ys = markers.views()
+            render_marker_overlay(xs[index], ys[index], zoom, view)
+
+    step()  # 1回目はキャッシュの準備などを含むので捨てる
+    base = peak_rss_bytes()
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        step()
+        times.append(time.perf_counter() - start)
+    peak = peak_rss_bytes()
+    close()
+    return times, base, peak
+
+
+def percentile(values, q):
+    """最近傍順位法によるパーセンタイル"""
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(np.ceil(q / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def run_all(args):
+    """全ケースを子プロセスで計測して結果をまとめる"""
+    tmp_dir = None
+    data_dir = args.data_dir
+    if data_dir is None:
+        tmp_dir = tempfile.TemporaryDirectory()
+        data_dir = tmp_dir.name
+    os.makedirs(data_dir, exist_ok=True)
+    prepare_inputs(data_dir, args.scale)
+
+    results = []
+    for case, name, op, params in list_cases():
+        if args.filter and not any(f in case for f in args.filter):
+            continue
+        out = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), '--repeat', str(args.repeat),
+             '--case', os.path.join(data_dir, name), op, json.dumps(params)],
+            capture_output=True, text=True)
+        if out.returncode != 0:
+            print(f"{case}: failed\n{out.stderr}", file=sys.stderr)
+            results.append({'case': case, 'error': out.stderr.strip().splitlines()[-1:]})
+            continue
+        measured = json.loads(out.stdout.strip().splitlines()[-1])
+        times = [t * 1000 for t in measured['times']]
+        result = {
+            'case': case, 'input': name, 'op': op, 'params': params, 'repeat': len(times),
+            'median_ms': round(percentile(times, 50), 3),
+            'p95_ms': round(percentile(times, 95), 3),
+            'min_ms': round(min(times), 3),
+            'peak_rss_mb': None if measured['peak'] is None else round(measured['peak'] / 1024 / 1024, 1),
+            'peak_rss_delta_mb': None if measured['base'] is None else
+            round((measured['peak'] - measured['base']) / 1024 / 1024, 1),
+        }
+        results.append(result)
+        rss = f"{result['peak_rss_mb']:.0f}" if result['peak_rss_mb'] is not None else "n/a"
+        print(f"{case:<40} {result['median_ms']:>10.1f} {result['p95_ms']:>10.1f} {rss:>8}", file=sys.stderr)
+
+    report = {
+        'meta': {
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'pymupdf': fitz.VersionBind,
+            'pillow': Image.__version__,
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'repeat': args.repeat,
+            'scale': args.scale,
+            'view_size': VIEW_SIZE,
+            'tile_size': TILE_SIZE,
+        },
+        'inputs': {name: os.path.getsize(os.path.join(data_dir, name)) for name in INPUTS},
+        'results': results,
+    }
+    if tmp_dir is not None:
+        tmp_dir.cleanup()
+    return report
+
+
+def compare(before_path, after_path, threshold):
+    """2回の結果の中央値・p95・ピークRSSを比べ、悪化したケースの数を返す"""
+    with open(before_path, encoding='utf-8') as f:
+        before_report = json.load(f)
+    with open(after_path, encoding='utf-8') as f:
+        after_report = json.load(f)
+    if before_report['inputs'] != after_report['inputs']:
+        print("Warning: 入力ファイルが異なります（--data-dir で同じ入力を使ってください）")
+    before = {r['case']: r for r in before_report['results'] if 'error' not in r}
+    after = {r['case']: r for r in after_report['results'] if 'error' not in r}
+
+    regressions = 0
+    print(f"{'case':<40} {'median ms':>21} {'p95 ms':>21} {'peak MB':>15}")
+    for case in sorted(before.keys() & after.keys()):
+        b, a = before[case], after[case]
+        ratio = a['median_ms'] / b['median_ms'] if b['median_ms'] > 0 else 1.0
+        rss_ratio = (a['peak_rss_mb'] / b['peak_rss_mb']
+                     if a['peak_rss_mb'] and b['peak_rss_mb'] else 1.0)
+        worse = ratio > 1 + threshold or rss_ratio > 1 + threshold
+        regressions += worse
+        print(f"{case:<40} {b['median_ms']:>9.1f} → {a['median_ms']:>9.1f} "
+              f"{b['p95_ms']:>9.1f} → {a['p95_ms']:>9.1f} "
+              f"{b['peak_rss_mb'] or 0:>6.0f} → {a['peak_rss_mb'] or 0:>6.0f}"
+              f"  {ratio:>5.2f}x{'  ← slower' if worse else ''}")
+    for case in sorted(before.keys() ^ after.keys()):
+        print(f"{case:<40} only in {'before' if case in before else 'after'}")
+    print(f"{regressions} case(s) worse than {threshold:.0%}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--output', help='結果のJSONの出力先（省略時は標準出力）')
+    parser.add_argument('--data-dir', help='生成したファイルの置き場所（省略時は一時フォルダ）')
+    parser.add_argument('--repeat', type=int, default=7, help='各ケースの繰り返し回数')
+    parser.add_argument('--filter', action='append', help='ケース名にこの文字列を含むものだけを計測（複数指定可）')
+    parser.add_argument('--scale', type=float, default=1.0, help='生成するファイルの大きさの倍率')
+    parser.add_argument('--compare', nargs=2, metavar=('BEFORE', 'AFTER'), help='2回の結果を比較')
+    parser.add_argument('--threshold', type=float, default=0.1, help='悪化とみなす割合（--compare用）')
+    parser.add_argument('--case', nargs=3, metavar=('PATH', 'OP', 'PARAMS'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.case:
+        times, base, peak = run_case(args.case[0], args.case[1], json.loads(args.case[2]), args.repeat)
+        print(json.dumps({'times': times, 'base': base, 'peak': peak}))
+        return
+
+    if args.compare:
+        sys.exit(1 if compare(args.compare[0], args.compare[1], args.threshold) else 0)
+
+    report = run_all(args)
+    text = json.dumps(report, ensure_ascii=False, indent=1)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text)
+    else:
+        print(text)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,440 @@
+"""記録した入力を再生して操作の応答時間を測るベンチマーク
+
+PDFXY_TRACE_RECORD で記録したイベント列（または合成した典型的な操作）を、記録と同じ間隔で
+PDFViewer のキャンバスに送り、次の値を計測する。
+
+- paint: イベントが届いてから、それを反映した描画（Tkのアイドル処理）までの時間
+- settle: 一連の操作の最後のイベントから、表示範囲のタイルが高品質で揃うまでの時間
+- frames: マウス操作をまとめて処理した1フレームの処理時間、まとめられたイベントの数、
+  処理が遅れて飛ばしたフレームの数、メインスレッドが止まっていた最長の時間
+
+ディスプレイがない環境（DISPLAY未設定）では Xvfb を起動し、その上で実行する。
+結果は render_suite.py と同じ形式のJSONで出力するので、render_suite.py --compare で比較できる。
+
+使い方:
+    PDFXY_TRACE_RECORD=trace.jsonl python pdf_viewer.py file.pdf     # 操作を記録
+    python benchmarks/replay_trace.py trace.jsonl [file.pdf] [--output result.json] [--speed 1.0]
+    python benchmarks/replay_trace.py --synthetic zoom|pan|scroll|flip|all file.pdf
+    python benchmarks/render_suite.py --compare before.json after.json
+
+ディスクキャッシュの有無で結果が変わらないよう、再生中は PDFXY_DISK_CACHE_MB=0 として
+起動する（環境変数で指定した場合はそちらを使う）。
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('PDFXY_DISK_CACHE_MB', '0')
+
+import tkinter as tk
+
+import pdf_viewer
+from pdf_viewer import INPUT_FRAME_MS, TRACE_KEY_EVENTS, PDFViewer
+from render_suite import peak_rss_bytes, percentile
+
+# 記録したイベント → (再生時に送るイベント, ボタン・修飾キーの状態, 集計の種類)
+REPLAY_EVENTS = {
+    '<Motion>': ('<Motion>', 0, 'motion'),
+    '<Button-1>': ('<ButtonPress-1>', 0, 'click'),
+    '<Button-2>': ('<ButtonPress-2>', 0, 'pan_start'),
+    '<Button-3>': ('<ButtonPress-3>', 0, 'pan_start'),
+    '<ButtonRelease-2>': ('<ButtonRelease-2>', 0x200, 'pan_end'),
+    '<ButtonRelease-3>': ('<ButtonRelease-3>', 0x400, 'pan_end'),
+    '<B2-Motion>': ('<Motion>', 0x200, 'pan'),  # Button2Mask
+    '<B3-Motion>': ('<Motion>', 0x400, 'pan'),  # Button3Mask
+    '<MouseWheel>': ('<MouseWheel>', 0, 'scroll'),
+    '<Shift-MouseWheel>': ('<MouseWheel>', 0x1, 'scroll'),  # ShiftMask
+    '<Control-MouseWheel>': ('<MouseWheel>', 0x4, 'zoom'),  # ControlMask
+    '<Left>': ('<KeyPress-Left>', 0, 'page'),
+    '<Right>': ('<KeyPress-Right>', 0, 'page'),
+}
+FRAME_KINDS = {'motion', 'pan', 'scroll', 'zoom'}  # 次の入力フレームでまとめて処理される操作
+SETTLE_KINDS = {'zoom', 'scroll', 'pan_end', 'page'}  # 表示が揃うまでの時間を測る操作
+HEARTBEAT_MS = 5  # メインスレッドが止まっていないかを確認する間隔（ミリ秒）
+STALL_MS = 50  # これ以上メインスレッドが止まったら固まったとみなす（ミリ秒）
+WINDOW_SIZE = (1000, 800)  # 合成した操作を再生する時のウィンドウの大きさ
+
+
+def start_xvfb(size):
+    """Xvfbを起動してDISPLAYを設定し、そのプロセスを返す"""
+    xvfb = shutil.which('Xvfb')
+    if xvfb is None:
+        sys.exit("Error: DISPLAY is not set and Xvfb was not found (apt install xvfb)")
+    # 空いているディスプレイ番号はXvfb自身に選ばせ、パイプで受け取る
+    read_fd, write_fd = os.pipe()
+    process = subprocess.Popen([xvfb, '-displayfd', str(write_fd), '-screen', '0',
+                                f'{size[0] + 200}x{size[1] + 200}x24', '-nolisten', 'tcp'],
+                               pass_fds=(write_fd,))
+    os.close(write_fd)
+    with os.fdopen(read_fd) as f:
+        display = f.readline().strip()
+    if not display:
+        process.kill()
+        sys.exit("Error: Xvfb did not start")
+    os.environ['DISPLAY'] = ':' + display
+    return process
+
+
+def load_trace(path):
+    """記録したイベント列を読み込む
+
+    Returns:
+        (イベントのリスト, 最初の操作の前に開いたファイルの情報（なければNone）)
+        イベントの時刻はファイルを開いた時点（なければ最初のイベントの1秒前）からの秒数にする
+    """
+    events = []
+    load = None
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            entry = json.loads(line)
+            if entry['event'] == '<<Load>>':
+                # 操作の途中で別のファイルを開いた場合は、そこまでを再生する
+                if events:
+                    break
+                load = entry
+                continue
+            if entry['event'] in REPLAY_EVENTS:
+                events.append(entry)
+    if events:
+        base = load['t'] if load is not None else events[0]['t'] - 1.0
+        for entry in events:
+            entry['t'] = max(0.0, entry['t'] - base)
+    return events, load
+
+
+def synthetic_trace(kind, size):
+    """典型的な操作を合成したイベント列
+
+    Args:
+        kind: 'zoom'（ホイールでの連続ズーム）, 'pan'（右ドラッグでの長い移動）,
+              'scroll'（ホイールでの連続スクロール）, 'flip'（キーでのページ送り）, 'all'
+        size: ウィンドウの大きさ（イベントの座標の基準）
+    """
+    cx, cy = size[0] // 2, size[1] // 2
+    events = []
+
+    def add(t, event, x=cx, y=cy, delta=0):
+        events.append({'t': round(t, 4), 'event': event, 'x': x, 'y': y, 'delta': delta})
+
+    t = 1.0
+    if kind in ('zoom', 'all'):
+        # ホイールを素早く8段回す操作を、拡大・縮小の交互に繰り返す
+        for direction in (1, -1, 1, -1):
+            for _ in range(8):
+                add(t, '<Control-MouseWheel>', delta=120 * direction)
+                t += 0.012
+            t += 1.5
+    if kind in ('pan', 'all'):
+        # 2秒かけて斜めに大きく動かす（マウスの報告間隔は約8ミリ秒）
+        for sign in (1, -1):
+            add(t, '<Button-3>')
+            t += 0.05
+            for i in range(1, 241):
+                add(t, '<B3-Motion>', cx - sign * i * 2, cy - sign * i * 2)
+                t += 0.008
+            add(t, '<ButtonRelease-3>', cx - sign * 480, cy - sign * 480)
+            t += 1.5
+    if kind in ('scroll', 'all'):
+        for delta in (-120, 120):
+            for _ in range(30):
+                add(t, '<MouseWheel>', delta=delta)
+                t += 0.01
+            t += 1.0
+    if kind in ('flip', 'all'):
+        # ゆっくりめと、キーを押しっぱなしにした速さのページ送り
+        for event, interval in (('<Right>', 0.15), ('<Left>', 0.05)):
+            for _ in range(10):
+                add(t, event, 0, 0)
+                t += interval
+            t += 1.5
+    return events
+
+
+class TkClipboard:
+    """pyperclip の代わりにTkのクリップボードを使う（Xvfbの環境には xclip などがないことが多い）"""
+
+    def __init__(self, root):
+        self.root = root
+
+    def copy(self, text):
+        self.root.clipboard_clear()
+        self.root.clipboard_append(text)
+
+
+def is_settled(viewer):
+    """表示範囲のタイルが全て高品質で揃い、待っている処理がないかどうか"""
+    return (viewer.open_job is None and viewer.render_timer is None and viewer.input_timer is None
+            and viewer.tile_update_timer is None and viewer.zoom_preview is None and not viewer.stale_tiles
+            and viewer.tiles_in_view(margin=0) <= viewer.tile_items.keys())
+
+
+class Replay:
+    """PDFViewerにイベントを送り、描画までの時間を記録する"""
+
+    def __init__(self, viewer, events, speed, settle_timeout):
+        self.viewer = viewer
+        self.root = viewer.root
+        self.events = events
+        self.speed = speed
+        self.settle_timeout = settle_timeout
+        self.next_event = 0  # 次に送るイベントの番号
+        self.start = None  # 再生を始めた時刻
+        self.waiting = []  # 次の入力フレームで処理されるイベント [(届いた時刻, 種類)]
+        self.unsettled = None  # 表示が揃うのを待っている最後のイベント (届いた時刻, 種類)
+        self.paint = {}  # 描画までの時間 {種類: [ミリ秒]}
+        self.settle = {}  # 表示が揃うまでの時間 {種類: [ミリ秒]}
+        self.timed_out = 0  # 表示が揃わないまま再生が終わった操作の数
+        self.frame_times = []  # 入力フレームの処理時間（ミリ秒）
+        self.frame_due = None  # 予約された入力フレームの予定時刻
+        self.coalesced = 0  # 他のイベントとまとめて処理されたイベントの数
+        self.dropped = 0  # 処理が遅れて飛ばしたフレームの数
+        self.stalls = []  # メインスレッドが止まっていた時間（ミリ秒、STALL_MS 以上のもの）
+        self.last_beat = None
+        self.finished_at = None  # 最後のイベントを送った時刻
+        self.instrument()
+
+    def instrument(self):
+        """入力フレームの予約と処理を計測用に包む（インスタンスの属性で差し替える）"""
+        viewer = self.viewer
+        schedule_input_frame = viewer.schedule_input_frame
+        process_input_frame = viewer.process_input_frame
+
+        def schedule():
+            if viewer.input_timer is None:
+                self.frame_due = time.perf_counter() + INPUT_FRAME_MS / 1000
+            schedule_input_frame()
+
+        def process():
+            start = time.perf_counter()
+            if self.frame_due is not None:
+                self.dropped += max(0, int((start - self.frame_due) * 1000 // INPUT_FRAME_MS))
+                self.frame_due = None
+            batch, self.waiting = self.waiting, []
+            process_input_frame()
+            self.frame_times.append((time.perf_counter() - start) * 1000)
+            self.coalesced += max(0, len(batch) - 1)
+            # キャンバスの再描画はアイドル処理で行われ、その後にこの処理が呼ばれる
+            self.root.after_idle(self.painted, batch)
+
+        viewer.schedule_input_frame = schedule
+        viewer.process_input_frame = process
+
+    def run(self):
+        """再生を開始し、全てのイベントを送って表示が揃うまでメインループを回す"""
+        self.start = time.perf_counter()
+        self.root.after(0, self.step)
+        self.root.after(HEARTBEAT_MS, self.heartbeat)
+        self.root.mainloop()
+
+    def step(self):
+        """予定時刻になったイベントを送り、次のイベントの時刻に再び呼ばれるよう予約"""
+        now = time.perf_counter()
+        while self.next_event < len(self.events):
+            entry = self.events[self.next_event]
+            due = self.start + entry['t'] / self.speed
+            if due > now:
+                self.root.after(max(1, int((due - now) * 1000)), self.step)
+                return
+            self.next_event += 1
+            # メインスレッドが止まっていて送るのが遅れた分も待ち時間に含める（実際の操作ではXのキューで待つ）
+            self.inject(entry, due)
+        self.finished_at = now
+
+    def inject(self, entry, due):
+        """1つのイベントを送る"""
+        sequence, state, kind = REPLAY_EVENTS[entry['event']]
+        if entry['event'] in TRACE_KEY_EVENTS:
+            self.root.event_generate(sequence, state=state)
+        elif sequence == '<MouseWheel>':
+            self.viewer.canvas.event_generate(sequence, x=entry['x'], y=entry['y'], state=state,
+                                              delta=entry['delta'])
+        else:
+            self.viewer.canvas.event_generate(sequence, x=entry['x'], y=entry['y'], state=state)
+
+        if kind in FRAME_KINDS and self.viewer.input_timer is not None:
+            self.waiting.append((due, kind))
+        else:
+            self.root.after_idle(self.painted, [(due, kind)])
+        if kind in SETTLE_KINDS:
+            self.unsettled = (due, kind)
+
+    def painted(self, batch):
+        """描画が終わった時点で、まとめて処理されたイベントの待ち時間を記録"""
+        now = time.perf_counter()
+        for due, kind in batch:
+            self.paint.setdefault(kind, []).append((now - due) * 1000)
+
+    def heartbeat(self):
+        """メインスレッドの停止と表示が揃ったかを確認し、再生が終わったらメインループを抜ける"""
+        now = time.perf_counter()
+        if self.last_beat is not None and (now - self.last_beat) * 1000 - HEARTBEAT_MS >= STALL_MS:
+            self.stalls.append((now - self.last_beat) * 1000 - HEARTBEAT_MS)
+        self.last_beat = now
+
+        if self.unsettled is not None and is_settled(self.viewer):
+            due, kind = self.unsettled
+            self.settle.setdefault(kind, []).append((now - due) * 1000)
+            self.unsettled = None
+
+        if self.finished_at is not None:
+            if self.unsettled is None and not self.waiting:
+                self.root.quit()
+                return
+            if now - self.finished_at > self.settle_timeout:
+                self.timed_out += self.unsettled is not None
+                self.root.quit()
+                return
+        self.root.after(HEARTBEAT_MS, self.heartbeat)
+
+
+def wait_until(root, condition, timeout):
+    """条件が満たされるまでTkのイベントを処理しながら待つ"""
+    deadline = time.perf_counter() + timeout
+    while not condition() and time.perf_counter() < deadline:
+        root.update()
+        time.sleep(0.005)
+    return condition()
+
+
+def measure(values):
+    """ミリ秒のリストの集計（render_suite.py と同じ項目）"""
+    return {
+        'repeat': len(values),
+        'median_ms': round(percentile(values, 50), 3),
+        'p95_ms': round(percentile(values, 95), 3),
+        'min_ms': round(min(values), 3),
+        'max_ms': round(max(values), 3),
+    }
+
+
+def window_size(load):
+    """再生するウィンドウの大きさ（記録した時の大きさ、なければ WINDOW_SIZE）"""
+    if load is not None and load.get('width', 0) > 1 and load.get('height', 0) > 1:
+        return load['width'], load['height']
+    return WINDOW_SIZE
+
+
+def replay(args, events, load, file_path):
+    """ビューアーを起動してファイルを開き、イベント列を再生した結果を返す"""
+    size = window_size(load)
+    root = tk.Tk()
+    root.geometry(f"{size[0]}x{size[1]}+0+0")
+    viewer = PDFViewer(root)
+    # 再生中にダイアログで止まらないように、エラーは表示だけにする
+    pdf_viewer.messagebox.showerror = lambda title, message, **kw: print(f"Warning: {title}: {message}")
+    pdf_viewer.pyperclip = TkClipboard(root)
+    root.update()
+    root.focus_force()
+
+    viewer.load_file(file_path)
+    if not wait_until(root, lambda: viewer.open_job is None, args.settle_timeout * 10):
+        sys.exit("Error: Timed out opening the file")
+    if load is not None and load.get('continuous'):
+        viewer.continuous.set(True)
+        viewer.toggle_continuous()
+    viewer.zoom = load['zoom'] if load is not None else args.zoom
+    viewer.display_page()
+    # 先読みなども含めて落ち着くまで待ってから始める
+    wait_until(root, lambda: is_settled(viewer) and not viewer.pdf_worker.busy()
+               and not viewer.image_worker.busy(), args.settle_timeout)
+
+    session = Replay(viewer, events, args.speed, args.settle_timeout)
+    session.run()
+    viewer.shutdown()
+    root.destroy()
+    return session
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('trace', nargs='?', help='PDFXY_TRACE_RECORD で記録したファイル')
+    parser.add_argument('file', nargs='?', help='開くファイル（省略時は記録の中のファイル）')
+    parser.add_argument('--synthetic', choices=['zoom', 'pan', 'scroll', 'flip', 'all'],
+                        help='記録の代わりに合成した操作を再生する（位置引数はファイルのみ）')
+    parser.add_argument('--speed', type=float, default=1.0, help='再生速度の倍率')
+    parser.add_argument('--zoom', type=float, default=1.5, help='開始時のズーム（合成した操作の場合）')
+    parser.add_argument('--settle-timeout', type=float, default=10.0, help='表示が揃うのを待つ上限（秒）')
+    parser.add_argument('--xvfb', action='store_true', help='DISPLAYがあってもXvfbを起動する')
+    parser.add_argument('--output', help='結果のJSONの出力先（省略時は標準出力）')
+    args = parser.parse_args()
+
+    if args.synthetic:
+        file_path = args.file or args.trace
+        if file_path is None:
+            parser.error("--synthetic needs the file to open")
+        events, load = synthetic_trace(args.synthetic, WINDOW_SIZE), None
+        name = f"synthetic-{args.synthetic}"
+        inputs = {os.path.basename(file_path): os.path.getsize(file_path), name: len(events)}
+    else:
+        if args.trace is None:
+            parser.error("trace file or --synthetic is required")
+        events, load = load_trace(args.trace)
+        file_path = args.file or (load['file'] if load is not None else None)
+        if file_path is None:
+            parser.error("the trace has no <<Load>> entry; give the file to open")
+        name = os.path.splitext(os.path.basename(args.trace))[0]
+        inputs = {os.path.basename(file_path): os.path.getsize(file_path),
+                  os.path.basename(args.trace): os.path.getsize(args.trace)}
+    if not events:
+        sys.exit("Error: No input events to replay")
+
+    xvfb = None
+    if args.xvfb or not os.environ.get('DISPLAY'):
+        xvfb = start_xvfb(window_size(load))
+    try:
+        session = replay(args, events, load, file_path)
+    finally:
+        if xvfb is not None:
+            xvfb.terminate()
+            xvfb.wait()
+
+    peak = peak_rss_bytes()
+    peak_mb = None if peak is None else round(peak / 1024 / 1024, 1)
+    results = []
+    for metric, table in (('paint', session.paint), ('settle', session.settle)):
+        for kind, values in sorted(table.items()):
+            results.append(dict({'case': f"replay/{name}/{metric}/{kind}", 'input': name, 'op': metric,
+                                 'params': {'kind': kind}, 'peak_rss_mb': peak_mb}, **measure(values)))
+    if session.frame_times:
+        results.append(dict({'case': f"replay/{name}/frames", 'input': name, 'op': 'frames', 'params': {},
+                             'peak_rss_mb': peak_mb, 'events': len(events), 'coalesced': session.coalesced,
+                             'dropped_frames': session.dropped, 'stalls': len(session.stalls),
+                             'longest_stall_ms': round(max(session.stalls, default=0), 1),
+                             'unsettled': session.timed_out}, **measure(session.frame_times)))
+
+    for r in results:
+        print(f"{r['case']:<44} {r['median_ms']:>9.1f} {r['p95_ms']:>9.1f} {r['max_ms']:>9.1f}  n={r['repeat']}",
+              file=sys.stderr)
+    print(f"events {len(events)}, coalesced {session.coalesced}, dropped frames {session.dropped}, "
+          f"stalls >= {STALL_MS} ms: {len(session.stalls)}, not settled: {session.timed_out}", file=sys.stderr)
+
+    report = {
+        'meta': {
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'display': os.environ.get('DISPLAY'),
+            'xvfb': xvfb is not None,
+            'speed': args.speed,
+            'tk': tk.TkVersion,
+        },
+        'inputs': inputs,
+        'results': results,
+    }
+    text = json.dumps(report, ensure_ascii=False, indent=1)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text)
+    else:
+        print(text)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,14 +1,170 @@
+import time
+STARTUP_TIME = time.perf_counter()  # 起動時間の計測の基準（モジュールの読み込み開始時）
+
 import tkinter as tk
-from tkinter import filedialog, messagebox
-from tkinterdnd2 import DND_FILES, TkinterDnD
-import fitz  # PyMuPDF
-from PIL import Image, ImageTk, ImageOps, ImageDraw
-import pyperclip
-import io
+from tkinter import filedialog, messagebox, ttk
 import sys
 import os
 import ctypes
-import webbrowser
+import importlib
+import json
+import hashlib
+import struct
+import multiprocessing
+import threading
+import mmap
+import shutil
+import tempfile
+from array import array
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, BrokenExecutor
+
+
+class LazyModule:
+    """最初に使った時に読み込むモジュール
+
+    ウィンドウを表示するまでに重いモジュール（PyMuPDF、numpy、PIL など）を読み込まないようにする。
+    読み込んだ後はモジュール変数を本物のモジュールに差し替えるので、以降は通常の import と同じ速さになる。
+    """
+
+    def __init__(self, module_name, global_name):
+        self._module_name = module_name
+        self._global_name = global_name
+
+    def load(self):
+        """モジュールを読み込んで、モジュール変数を差し替える"""
+        module = importlib.import_module(self._module_name)
+        globals()[self._global_name] = module
+        return module
+
+    def __getattr__(self, name):
+        return getattr(self.load(), name)
+
+
+# PyInstallerは importlib での読み込みを検出できないため、spec の hiddenimports にも列挙している
+fitz = LazyModule('fitz', 'fitz')  # PyMuPDF
+np = LazyModule('numpy', 'np')
+Image = LazyModule('PIL.Image', 'Image')
+ImageTk = LazyModule('PIL.ImageTk', 'ImageTk')
+ImageOps = LazyModule('PIL.ImageOps', 'ImageOps')
+ImageDraw = LazyModule('PIL.ImageDraw', 'ImageDraw')
+pyperclip = LazyModule('pyperclip', 'pyperclip')
+webbrowser = LazyModule('webbrowser', 'webbrowser')
+LAZY_MODULES = [fitz, np, Image, ImageTk, ImageOps, ImageDraw, pyperclip, webbrowser]
+
+# 起動時間の計測（環境変数 PDFXY_STARTUP_TIMING=1 で、起動からの経過時間を表示する）
+STARTUP_TIMING = os.environ.get('PDFXY_STARTUP_TIMING') == '1'
+
+
+def report_startup(stage):
+    """起動時間の計測モードなら、起動からの経過時間を表示"""
+    if STARTUP_TIMING:
+        print(f"Startup: {stage}: {(time.perf_counter() - STARTUP_TIME) * 1000:.1f} ms", flush=True)
+
+
+# 描画の段階ごとの時間の計測（View → Performance HUD で表示、環境変数 PDFXY_PERF_LOG に
+# ファイルを指定するとJSON Linesで1回ごとに追記する）
+PERF_LOG = os.environ.get('PDFXY_PERF_LOG')
+PERF_SAMPLES = 120  # HUDに表示する平均・最大を求める直近の回数（段階ごと）
+PERF_HUD_MS = 500  # HUDの更新間隔（ミリ秒）
+# HUDに表示する段階（ワーカー: ページの解釈・描画・変換・リサイズ・反転、メイン: それ以外）
+PERF_STAGES = ['display_list', 'pixmap', 'convert', 'resize', 'invert', 'resample', 'disk_load',
+               'photo', 'canvas', 'markers', 'preview', 'update_tiles', 'display_page', 'zoom', 'input_frame']
+
+# 入力の記録（環境変数 PDFXY_TRACE_RECORD にファイルを指定すると、キャンバスが受け取った
+# イベントをJSON Linesで記録する。benchmarks/replay_trace.py で再生して応答時間を測る）
+TRACE_RECORD = os.environ.get('PDFXY_TRACE_RECORD')
+TRACE_CANVAS_EVENTS = ['<Motion>', '<Button-1>', '<Button-2>', '<Button-3>', '<ButtonRelease-2>',
+                       '<ButtonRelease-3>', '<B2-Motion>', '<B3-Motion>', '<MouseWheel>',
+                       '<Shift-MouseWheel>', '<Control-MouseWheel>']
+TRACE_KEY_EVENTS = ['<Left>', '<Right>']  # ウィンドウ全体で受け取るキー
+
+
+class PerfRecorder:
+    """描画の段階ごとの時間と画像の大きさの記録
+
+    段階ごとに直近 PERF_SAMPLES 回の値を保持してHUDに表示し、記録先のファイルが
+    あれば1回ごとに1行のJSONとして書き出す。HUDも記録先もなければ何もしない。
+    """
+
+    def __init__(self, log_path=None):
+        self.samples = {}  # 段階ごとの直近の値 {段階: deque[(ミリ秒, 幅, 高さ)]}
+        self.hud = False  # HUDを表示しているかどうか
+        self.log_file = None
+        if log_path:
+            try:
+                self.log_file = open(log_path, 'a', encoding='utf-8')
+            except OSError as e:
+                print(f"Warning: Could not open performance log: {str(e)}")
+
+    @property
+    def enabled(self):
+        """記録するかどうか"""
+        return self.hud or self.log_file is not None
+
+    def record(self, stage, seconds, size=None, **fields):
+        """1回分の時間を記録
+
+        Args:
+            stage: 段階の名前
+            seconds: かかった時間（秒）
+            size: 扱った画像の大きさ (幅, 高さ)（なければNone）
+            fields: ログに一緒に書き出す値（ページ、ズームなど）
+        """
+        if not self.enabled:
+            return
+        ms = seconds * 1000
+        width, height = size if size is not None else (0, 0)
+        samples = self.samples.get(stage)
+        if samples is None:
+            samples = self.samples[stage] = deque(maxlen=PERF_SAMPLES)
+        samples.append((ms, width, height))
+
+        if self.log_file is not None:
+            entry = {'t': round(time.perf_counter() - STARTUP_TIME, 4), 'stage': stage, 'ms': round(ms, 3)}
+            if size is not None:
+                entry['w'], entry['h'] = width, height
+            entry.update(fields)
+            try:
+                self.log_file.write(json.dumps(entry) + '\n')
+            except (OSError, TypeError, ValueError) as e:
+                print(f"Warning: Could not write performance log: {str(e)}")
+
+    def record_all(self, timings, **fields):
+        """ワーカーから返された [(段階, 秒, 大きさ)] をまとめて記録"""
+        for stage, seconds, size in timings:
+            self.record(stage, seconds, size, **fields)
+
+    def summary(self):
+        """HUD用の段階ごとの集計
+
+        Returns:
+            [(段階, 直近の値, 平均, 最大（ミリ秒）, 直近の画像の大きさ)]
+        """
+        rows = []
+        for stage in PERF_STAGES + sorted(self.samples.keys() - set(PERF_STAGES)):
+            samples = self.samples.get(stage)
+            if not samples:
+                continue
+            values = [ms for ms, _, _ in samples]
+            rows.append((stage, values[-1], sum(values) / len(values), max(values), samples[-1][1:]))
+        return rows
+
+    def close(self):
+        """記録先のファイルを閉じる"""
+        if self.log_file is not None:
+            self.log_file.close()
+            self.log_file = None
+
+
+def preload_modules():
+    """重いモジュールを読み込んでおく（ウィンドウの表示後にバックグラウンドで呼ぶ）"""
+    for module in LAZY_MODULES:
+        try:
+            module.load()
+        except ImportError as e:
+            print(f"Warning: Could not load module: {str(e)}")
+    report_startup("modules loaded")
 
 # Windows高DPI対応（アプリ全体をシャープに表示）
 try:
@@ -22,6 +178,1403 @@ except:
     except:
         pass
 
+# タイル描画の設定
+TILE_SIZE = 512  # タイル1枚の一辺（ピクセル）
+TILE_MARGIN = 256  # 表示領域の外側に余分に描画する幅（ピクセル）
+PAGE_GAP = 8.0  # 連続スクロールでのページの間隔（PDFのポイント）
+
+# レンダリングキャッシュの上限（MB、環境変数 PDFXY_RENDER_CACHE_MB で変更可能）
+RENDER_CACHE_MB = int(os.environ.get('PDFXY_RENDER_CACHE_MB', '256'))
+
+# 座標表示の倍率の選択肢
+COORD_SCALE_OPTIONS = [0.0001,0.005,0.001,0.005,0.01,0.05, 0.1, 0.5, 1.0, 2.0]
+
+
+def choose_coord_scale(width):
+    """X座標が3桁以内になる倍率を選ぶ
+
+    Args:
+        width: ズーム適用後のページの幅（ピクセル）
+    """
+    # X座標が999以下になる最大のスケールを見つける
+    best_scale = 1  # デフォルト最小値
+    for scale in COORD_SCALE_OPTIONS:
+        if width * scale <= 999:
+            best_scale = scale
+        else:
+            break
+    return best_scale
+
+
+# バックグラウンドレンダリングの設定
+RENDER_WORKERS = max(1, min(4, (os.cpu_count() or 2) - 1))  # ワーカープロセス数
+RENDER_POLL_MS = 15  # レンダリング結果を確認する間隔（ミリ秒）
+COARSE_SCALE = 0.25  # タイルが揃うまでの間に描く粗い画像の解像度（表示の倍率に対する比）
+INPUT_FRAME_MS = 16  # マウス操作をまとめて処理する間隔（ミリ秒、約60fps）
+
+# 前後ページの先読み設定
+PREFETCH_PAGES = 2  # 進行方向に先読みするページ数
+PREFETCH_PAGES_BEHIND = 1  # 進行方向と逆側に先読みするページ数
+PREFETCH_MB = int(os.environ.get('PDFXY_PREFETCH_MB', '64'))  # 先読みに使うメモリの上限（MB）
+
+# ワーカーごとに保持するディスプレイリストのページ数
+DISPLAY_LIST_PAGES = 8
+
+# PDFを開く設定
+# 修復済みのコピーがないPDFは、読み込みや破損の修復でUIが止まらないよう別プロセスで開く
+OPEN_PROGRESS_DELAY = 0.3  # 別プロセスで開き始めてから進捗を表示するまでの時間（秒、すぐ開けるPDFでちらつかないように）
+PASSWORD_ERROR = "Password-protected PDFs are not supported"
+OPEN_POLL_MS = 100  # 別プロセスで開いているPDFの進捗を確認する間隔（ミリ秒）
+REPAIRED_COPIES = 4  # 保存しておく修復済みPDFの数
+
+# タイルのディスクキャッシュの上限（MB、環境変数 PDFXY_DISK_CACHE_MB で変更可能、0で無効）
+DISK_CACHE_MB = int(os.environ.get('PDFXY_DISK_CACHE_MB', '1024'))
+DISK_CACHE_TRIM_RATIO = 0.8  # 上限を超えたら、この割合まで古いものから削除する
+# タイルの描画方法の版（描画結果が変わる変更をしたら上げる。古い版のタイルはディスクキャッシュから使わない）
+# 2: 反転表示をMuPDFでグレースケールに直接描画
+TILE_RENDER_VERSION = 2
+ZOOM_HISTORY_FILES = 200  # 最後のズームを覚えておくファイル数
+
+
+# 巨大画像の読み込み設定
+# デコード後のサイズがこれ（MB）を超える画像は、メモリマップしたファイルに展開する
+LARGE_IMAGE_MB = int(os.environ.get('PDFXY_LARGE_IMAGE_MB', '512'))
+LARGE_IMAGE_STRIP = 512  # ストリップ単位で処理する行数（偶数）
+
+# サムネイルの設定
+THUMB_WIDTH = 120  # サムネイルの幅（ピクセル）
+THUMB_GAP = 24  # サムネイルの間隔（ページ番号の表示を含む、ピクセル）
+THUMB_PANEL_WIDTH = THUMB_WIDTH + 24  # サムネイル一覧の幅（ピクセル）
+THUMB_PRIORITY = 10  # サムネイルのレンダリングの優先度（表示中のタイルと先読みの後）
+INDEX_PRIORITY = 1.5  # 単語・吸着点の抽出の優先度（見えているタイル0と余白のタイル1の後、先読み2以上の前）
+FINGERPRINT_BYTES = 64 * 1024  # ファイルの識別に使う先頭・末尾のバイト数
+
+
+def get_cache_dir():
+    """ディスクキャッシュの保存先（OSごとのユーザー用キャッシュフォルダ）"""
+    if sys.platform == 'win32':
+        base = os.environ.get('LOCALAPPDATA') or os.path.expanduser('~')
+    elif sys.platform == 'darwin':
+        base = os.path.expanduser('~/Library/Caches')
+    else:
+        base = os.environ.get('XDG_CACHE_HOME') or os.path.expanduser('~/.cache')
+    return os.path.join(base, 'PDFXYViewer')
+
+
+def file_fingerprint(file_path):
+    """ファイルの内容の識別子（サイズ、更新日時、先頭と末尾のハッシュ）
+
+    ファイル全体は読まないので、巨大なPDFでもすぐに求まる。
+    """
+    stat = os.stat(file_path)
+    digest = hashlib.sha1(f"{stat.st_size}:{stat.st_mtime_ns}".encode())
+    with open(file_path, 'rb') as f:
+        digest.update(f.read(FINGERPRINT_BYTES))
+        if stat.st_size > FINGERPRINT_BYTES:
+            f.seek(max(FINGERPRINT_BYTES, stat.st_size - FINGERPRINT_BYTES))
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+RAW_IMAGE_MAGIC = b'PXYT'
+RAW_IMAGE_HEADER = struct.Struct('<4s4sII')  # 識別子, モード, 幅, 高さ
+
+
+def save_raw_image(path, img):
+    """画像を画素データのままファイルに保存（一時ファイルに書いてから置き換える）
+
+    Returns:
+        int: 保存したファイルのサイズ（バイト）
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    data = img.tobytes()
+    with open(temp_path, 'wb') as f:
+        f.write(RAW_IMAGE_HEADER.pack(RAW_IMAGE_MAGIC, img.mode.encode().ljust(4), *img.size))
+        f.write(data)
+    os.replace(temp_path, path)
+    return RAW_IMAGE_HEADER.size + len(data)
+
+
+def load_raw_image(path):
+    """save_raw_image() で保存した画像をメモリマップして読み込む（展開処理なし）"""
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        magic, mode, width, height = RAW_IMAGE_HEADER.unpack_from(mm)
+        if magic != RAW_IMAGE_MAGIC:
+            raise ValueError(f"Not a cached tile: {path}")
+        view = memoryview(mm)[RAW_IMAGE_HEADER.size:]
+        try:
+            return Image.frombytes(mode.rstrip().decode(), (width, height), view)
+        finally:
+            view.release()
+
+
+class DiskTileCache:
+    """レンダリング済みタイルのディスクキャッシュ（セッションをまたいで再利用）
+
+    タイルは画素データのままファイルに保存し、読み込み時はメモリマップする。
+    合計サイズが上限を超えたら、最後に使った日時（更新日時）の古いものから削除する。
+    フォルダの走査（合計サイズの初回の集計と削除）はタイルが多いと時間がかかるため、
+    バックグラウンドスレッドで行う。
+    """
+
+    def __init__(self, directory, max_bytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.total_bytes = None  # 合計サイズ（最初に書き込んだ時にバックグラウンドで数える）
+        self.pending_bytes = 0  # 走査中に保存された分（走査の後で合計に足す）
+        self.scanning = False
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def path(self, key):
+        """キーに対応するファイル"""
+        name = hashlib.sha1(repr(key).encode()).hexdigest()
+        return os.path.join(self.directory, f"{name}.raw")
+
+    def get(self, key):
+        """タイルを読み込む（なければNone）"""
+        path = self.path(key)
+        try:
+            img = load_raw_image(path)
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        except (OSError, ValueError, struct.error) as e:
+            print(f"Warning: Could not load cached tile: {str(e)}")
+            self.misses += 1
+            return None
+
+        # 使った日時を更新（古いものから削除する時の順番に使う）
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        self.hits += 1
+        return img
+
+    def contains(self, key):
+        """タイルが保存されているかどうか"""
+        return os.path.exists(self.path(key))
+
+    def added(self, nbytes):
+        """ワーカーがタイルを保存した時に呼び、上限を超えたら古いものをバックグラウンドで削除
+
+        Args:
+            nbytes: ワーカーが実際に書き込んだバイト数
+        """
+        with self.lock:
+            if self.scanning:
+                # 走査に含まれていれば多めに数えるだけ（次の削除で正しい合計に戻る）
+                self.pending_bytes += nbytes
+                return
+            if self.total_bytes is not None:
+                self.total_bytes += nbytes
+                if self.total_bytes <= self.max_bytes:
+                    return
+            # 保存したファイルは走査で数えられる
+            self.scanning = True
+        threading.Thread(target=self.refresh, daemon=True).start()
+
+    def refresh(self):
+        """合計サイズを数え直し、上限を超えていれば古いものから削除（バックグラウンドスレッド）"""
+        total = None
+        try:
+            entries = sorted(self.scan())
+            total = sum(size for _, size, _ in entries)
+            if total > self.max_bytes:
+                total = self.trim(entries, total)
+        finally:
+            with self.lock:
+                if total is not None:
+                    self.total_bytes = total + self.pending_bytes
+                self.pending_bytes = 0
+                self.scanning = False
+
+    def scan(self):
+        """保存されているタイルの一覧 [(更新日時, サイズ, パス)]"""
+        entries = []
+        try:
+            with os.scandir(self.directory) as it:
+                for entry in it:
+                    if entry.name.endswith('.raw'):
+                        stat = entry.stat()
+                        entries.append((stat.st_mtime, stat.st_size, entry.path))
+        except FileNotFoundError:
+            pass
+        return entries
+
+    def trim(self, entries, total):
+        """最後に使った日時の古いものから、上限の DISK_CACHE_TRIM_RATIO まで削除
+
+        Args:
+            entries: scan() の結果を古い順に並べたもの
+            total: entries の合計サイズ
+
+        Returns:
+            int: 削除後の合計サイズ
+        """
+        target = self.max_bytes * DISK_CACHE_TRIM_RATIO
+        for _, size, path in entries:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+        return total
+
+    def stats(self):
+        """統計情報を返す"""
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'bytes': self.total_bytes or 0,
+            'max_bytes': self.max_bytes,
+        }
+
+
+def bytes_per_pixel(mode):
+    """PILが1ピクセルの保持に使うバイト数"""
+    # PILはRGBも1ピクセル4バイトで保持する
+    if mode in ('1', 'L', 'P'):
+        return 1
+    if mode.startswith('I;16'):
+        return 2
+    return 4
+
+
+def image_nbytes(img):
+    """PIL Imageが使用するおおよそのメモリ量（バイト）"""
+    return img.width * img.height * bytes_per_pixel(img.mode)
+
+
+def display_image_mode(mode):
+    """画像ファイルをメモリ上に読み込む時に変換する表示用のモード
+
+    パレット画像はRGBA、RGB/RGBA以外はRGBに変換する（元のモードより大きくなることがある）。
+    """
+    if mode == 'P':
+        return 'RGBA'
+    if mode in ('RGB', 'RGBA'):
+        return mode
+    return 'RGB'
+
+
+class RenderCache:
+    """レンダリング済みタイルのLRUキャッシュ（バイト数で上限を管理）"""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()  # {キー: (画像, バイト数)}
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        """キャッシュから取得（なければNone）"""
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return entry[0]
+
+    def put(self, key, img):
+        """キャッシュに追加し、上限を超えた分を古い順に破棄"""
+        nbytes = image_nbytes(img)
+        if nbytes > self.max_bytes:
+            return
+        if key in self.entries:
+            self.total_bytes -= self.entries.pop(key)[1]
+        self.entries[key] = (img, nbytes)
+        self.total_bytes += nbytes
+        while self.total_bytes > self.max_bytes:
+            _, (_, old_bytes) = self.entries.popitem(last=False)
+            self.total_bytes -= old_bytes
+            self.evictions += 1
+
+    def clear(self):
+        """キャッシュを空にする（統計は保持）"""
+        self.entries.clear()
+        self.total_bytes = 0
+
+    def stats(self):
+        """ヒット/ミス/破棄の回数と使用量を返す"""
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'entries': len(self.entries),
+            'bytes': self.total_bytes,
+            'max_bytes': self.max_bytes,
+        }
+
+
+def pixmap_to_image(pix):
+    """PixmapをPIL Imageに変換（PPMへのエンコード/デコードを経由しない）
+
+    Pixmapの画素バッファを直接読み込むので、中間のバイト列が作られない。
+    """
+    if pix.n == 3:
+        # RGBはPILの内部形式（1ピクセル4バイト）への1回のコピーだけで済む
+        return Image.frombuffer('RGB', (pix.width, pix.height), pix.samples_mv, 'raw', 'RGB', pix.stride, 1)
+
+    # 他の形式はPILがバッファを共有するため、Pixmapより長生きできるbytesを渡す
+    mode = {1: 'L', 4: 'RGBA'}[pix.n]
+    return Image.frombuffer(mode, (pix.width, pix.height), pix.samples, 'raw', mode, pix.stride, 1)
+
+
+# マーカーの設定
+MARKER_SIZE = 20  # マーカーの直径（ピクセル）
+MARKER_COLOR = (255, 0, 0, 128)  # 赤色、50%透過
+MARKER_ITEM_LIMIT = 2000  # これより多いマーカーが見えている場合は1枚の画像にまとめて描く
+
+
+class MarkerStore:
+    """マーカーの正規化座標の格納先
+
+    座標は array で詰めて保持し、表示範囲内のマーカーはNumPyでまとめて絞り込む。
+    """
+
+    def __init__(self):
+        self.xs = array('d')
+        self.ys = array('d')
+        self.version = 0  # 変更のたびに増える（描画済みのオーバーレイが古いか判定する）
+
+    def __len__(self):
+        return len(self.xs)
+
+    def __iter__(self):
+        return zip(self.xs, self.ys)
+
+    def append(self, x, y):
+        """マーカーを追加し、その番号を返す"""
+        index = len(self.xs)
+        self.xs.append(x)
+        self.ys.append(y)
+        self.version += 1
+        return index
+
+    def extend(self, xs, ys):
+        """NumPy配列でマーカーをまとめて追加"""
+        self.xs.frombytes(np.ascontiguousarray(xs, dtype=np.float64).tobytes())
+        self.ys.frombytes(np.ascontiguousarray(ys, dtype=np.float64).tobytes())
+        self.version += 1
+
+    def clear(self):
+        """全てのマーカーを削除"""
+        self.xs = array('d')
+        self.ys = array('d')
+        self.version += 1
+
+    def as_arrays(self):
+        """座標をNumPy配列（コピー）で返す（書き出しなど、持ち続ける場合に使う）"""
+        return (np.frombuffer(self.xs, dtype=np.float64).copy(),
+                np.frombuffer(self.ys, dtype=np.float64).copy())
+
+    def views(self):
+        """座標をコピーせずにNumPy配列として参照する
+
+        参照している間は array が伸ばせない（append で BufferError になる）ため、
+        その場の絞り込みや取り出しだけに使い、結果を持ち続けない。
+        """
+        return (np.frombuffer(self.xs, dtype=np.float64),
+                np.frombuffer(self.ys, dtype=np.float64))
+
+    def in_rect(self, x0, y0, x1, y1):
+        """矩形（正規化座標）の中にあるマーカーの番号を返す"""
+        xs, ys = self.views()
+        return np.flatnonzero((xs >= x0) & (xs <= x1) & (ys >= y0) & (ys <= y1))
+
+
+def render_marker_overlay(xs, ys, zoom, rect, size=MARKER_SIZE, color=MARKER_COLOR):
+    """大量のマーカーを1枚のRGBA画像にまとめて描画
+
+    マーカーの中心に点を打ってから、円の各行の幅だけ横に広げて縦にずらして重ねる。
+    マーカーの数によらず、処理量は画像の大きさとマーカーの直径で決まる。
+
+    Args:
+        xs, ys: マーカーの正規化座標（NumPy配列）
+        zoom: ズーム倍率
+        rect: 描画範囲（キャンバス座標 x0, y0, x1, y1）
+    """
+    x0, y0, x1, y1 = rect
+    width, height = x1 - x0, y1 - y0
+    radius = size // 2
+
+    # 中心点のマスク
+    cx = np.rint(xs * zoom - x0).astype(np.intp)
+    cy = np.rint(ys * zoom - y0).astype(np.intp)
+    inside = (cx >= 0) & (cx < width) & (cy >= 0) & (cy < height)
+    centers = np.zeros((height, width + 2 * radius), dtype=np.int32)
+    centers[cy[inside], cx[inside] + radius] = 1
+    # 横方向の累積和（任意の幅の区間に点があるかを引き算で求める）
+    cumsum = np.zeros((height, width + 2 * radius + 1), dtype=np.int32)
+    np.cumsum(centers, axis=1, out=cumsum[:, 1:])
+
+    mask = np.zeros((height, width), dtype=bool)
+    for dy in range(-radius, radius + 1):
+        half = int((radius * radius - dy * dy) ** 0.5)
+        # 中心から左右 half ピクセル以内に点がある画素
+        lo = radius - half
+        row = (cumsum[:, lo + 2 * half + 1:lo + 2 * half + 1 + width] - cumsum[:, lo:lo + width]) > 0
+        if dy >= 0:
+            mask[dy:] |= row[:height - dy]
+        else:
+            mask[:height + dy] |= row[-dy:]
+
+    pixels = np.zeros((height, width, 4), dtype=np.uint8)
+    pixels[mask] = color
+    return Image.fromarray(pixels, 'RGBA')
+
+
+# 単語の検索の設定
+WORD_GRID_CELL = 32.0  # 単語の空間インデックスの格子の大きさ（PDFのポイント）
+WORD_SNAP_PX = 24  # カーソルからこの距離（画面のピクセル）以内の単語を対象にする
+WORD_INDEX_PAGES = 16  # 空間インデックスを保持するページ数
+
+
+class WordIndex:
+    """ページ内の単語の空間インデックス
+
+    単語の矩形を格子に登録しておき、カーソル付近の格子だけを調べて最寄りの単語を探す。
+    単語が数万あるページでも、1回の検索で調べるのは数十語程度で済む。
+    """
+
+    def __init__(self, words, cell=WORD_GRID_CELL):
+        """
+        Args:
+            words: [(x0, y0, x1, y1, 文字列)] 正規化座標（ズーム1のピクセル）
+        """
+        self.cell = cell
+        self.words = words
+        self.grid = {}  # {(格子x, 格子y): [単語の番号]}
+        for index, (x0, y0, x1, y1, _) in enumerate(words):
+            for cx in range(int(x0 // cell), int(x1 // cell) + 1):
+                for cy in range(int(y0 // cell), int(y1 // cell) + 1):
+                    self.grid.setdefault((cx, cy), []).append(index)
+
+    def __len__(self):
+        return len(self.words)
+
+    def nearest(self, x, y, max_dist):
+        """(x, y) から max_dist 以内で最も近い単語を返す（矩形の内側は距離0、なければNone）"""
+        cell = self.cell
+        best = None
+        best_dist = max_dist * max_dist
+        for cx in range(int((x - max_dist) // cell), int((x + max_dist) // cell) + 1):
+            for cy in range(int((y - max_dist) // cell), int((y + max_dist) // cell) + 1):
+                for index in self.grid.get((cx, cy), ()):
+                    x0, y0, x1, y1, _ = self.words[index]
+                    dx = max(x0 - x, 0.0, x - x1)
+                    dy = max(y0 - y, 0.0, y - y1)
+                    dist = dx * dx + dy * dy
+                    if dist <= best_dist:
+                        best = index
+                        best_dist = dist
+        return None if best is None else self.words[best]
+
+
+# 図形への吸着の設定
+SNAP_GRID_CELL = 16.0  # 吸着点の空間インデックスの格子の大きさ（PDFのポイント）
+SNAP_TOLERANCE_PX = 10  # カーソルからこの距離（画面のピクセル）以内の点に吸着する
+SNAP_LONG_SEGMENT_CELLS = 64  # これより多くの格子にまたがる線分は格子に登録せず毎回全て調べる
+SNAP_MAX_SEGMENTS = 64  # 交点を求める時に調べるカーソル付近の線分の数
+# 吸着点の空間インデックスを保持するページ数（線分20万本の図面で1ページ約35MBになるため単語より少なくする）
+SNAP_INDEX_PAGES = 4
+
+
+class SnapIndex:
+    """ページの図形の吸着点の空間インデックス
+
+    端点・中点・円の中心は格子の番号順に並べた配列で持ち、カーソル付近の格子の範囲を
+    二分探索で取り出す。交点は全ての線分の組み合わせを事前に調べると時間がかかりすぎるため、
+    カーソル付近の線分だけからその都度求める。
+    """
+
+    KINDS = ('end', 'mid', 'center', 'intersection')
+
+    def __init__(self, points, kinds, segments, cell=SNAP_GRID_CELL):
+        """
+        Args:
+            points: 吸着点 (N, 2) 正規化座標（ズーム1のピクセル）
+            kinds: 吸着点の種類 (N,) KINDS の番号
+            segments: 線分 (M, 4) x0, y0, x1, y1
+        """
+        self.cell = cell
+
+        # 点を格子の番号順に並べる
+        cells = self.cell_ids(np.floor(points[:, 0] / cell), np.floor(points[:, 1] / cell))
+        order = np.argsort(cells, kind='stable')
+        self.points = points[order]
+        self.kinds = kinds[order]
+        self.point_cells = cells[order]
+
+        # 線分は外接矩形が重なる全ての格子に登録する
+        cx0 = np.floor(np.minimum(segments[:, 0], segments[:, 2]) / cell).astype(np.int64)
+        cy0 = np.floor(np.minimum(segments[:, 1], segments[:, 3]) / cell).astype(np.int64)
+        ncx = np.floor(np.maximum(segments[:, 0], segments[:, 2]) / cell).astype(np.int64) - cx0 + 1
+        ncy = np.floor(np.maximum(segments[:, 1], segments[:, 3]) / cell).astype(np.int64) - cy0 + 1
+        counts = ncx * ncy
+        is_long = counts > SNAP_LONG_SEGMENT_CELLS
+        self.segments = segments
+        self.long_segments = np.flatnonzero(is_long)
+
+        counts = np.where(is_long, 0, counts)
+        owners = np.repeat(np.arange(len(segments)), counts)
+        local = np.arange(len(owners)) - np.repeat(np.cumsum(counts) - counts, counts)
+        cells = self.cell_ids(cx0[owners] + local // ncy[owners], cy0[owners] + local % ncy[owners])
+        order = np.argsort(cells, kind='stable')
+        self.segment_owners = owners[order]
+        self.segment_cells = cells[order]
+
+    def __len__(self):
+        return len(self.points) + len(self.segments)
+
+    @staticmethod
+    def cell_ids(cx, cy):
+        """格子の位置を1つの整数にまとめる"""
+        return (np.asarray(cx, dtype=np.int64) + (1 << 20)) * (1 << 21) + (np.asarray(cy, dtype=np.int64) + (1 << 20))
+
+    def cells_near(self, x, y, dist):
+        """(x, y) から dist 以内に重なる格子の番号"""
+        cell = self.cell
+        cxs = np.arange(int((x - dist) // cell), int((x + dist) // cell) + 1)
+        cys = np.arange(int((y - dist) // cell), int((y + dist) // cell) + 1)
+        return self.cell_ids(np.repeat(cxs, len(cys)), np.tile(cys, len(cxs)))
+
+    @staticmethod
+    def gather(sorted_cells, cells):
+        """格子の番号順に並べた配列から、指定した格子に入っている要素の位置を取り出す"""
+        starts = np.searchsorted(sorted_cells, cells, side='left')
+        ends = np.searchsorted(sorted_cells, cells, side='right')
+        if not (ends > starts).any():
+            return np.empty(0, dtype=np.intp)
+        return np.concatenate([np.arange(a, b) for a, b in zip(starts, ends) if b > a])
+
+    def nearest(self, x, y, max_dist):
+        """(x, y) から max_dist 以内で最も近い吸着点を返す（なければNone）
+
+        Returns:
+            (x, y, 種類の名前)
+        """
+        cells = self.cells_near(x, y, max_dist)
+        best = None
+        best_dist = max_dist * max_dist
+
+        # 端点・中点・円の中心
+        found = self.gather(self.point_cells, cells)
+        if len(found):
+            dist = (self.points[found, 0] - x) ** 2 + (self.points[found, 1] - y) ** 2
+            i = int(np.argmin(dist))
+            if dist[i] <= best_dist:
+                best_dist = dist[i]
+                best = (float(self.points[found[i], 0]), float(self.points[found[i], 1]),
+                        self.KINDS[self.kinds[found[i]]])
+
+        # 交点（カーソル付近の線分どうし）
+        found = np.concatenate([self.segment_owners[self.gather(self.segment_cells, cells)], self.long_segments])
+        if len(found) < 2:
+            return best
+        seg = self.segments[np.unique(found)]
+        p = seg[:, :2]
+        r = seg[:, 2:] - p
+        length2 = np.maximum((r ** 2).sum(axis=1), 1e-12)
+        t = np.clip(((x - p[:, 0]) * r[:, 0] + (y - p[:, 1]) * r[:, 1]) / length2, 0.0, 1.0)
+        seg_dist = (p[:, 0] + t * r[:, 0] - x) ** 2 + (p[:, 1] + t * r[:, 1] - y) ** 2
+        near = np.argsort(seg_dist)[:SNAP_MAX_SEGMENTS]
+        near = near[seg_dist[near] <= best_dist]
+        if len(near) < 2:
+            return best
+        p = p[near]
+        r = r[near]
+
+        # 全ての組み合わせで交点を求める（p + t*r と q + u*s）
+        denom = r[:, None, 0] * r[None, :, 1] - r[:, None, 1] * r[None, :, 0]
+        qp_x = p[None, :, 0] - p[:, None, 0]
+        qp_y = p[None, :, 1] - p[:, None, 1]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            t = (qp_x * r[None, :, 1] - qp_y * r[None, :, 0]) / denom
+            u = (qp_x * r[:, None, 1] - qp_y * r[:, None, 0]) / denom
+        valid = (np.abs(denom) > 1e-9) & (t >= 0) & (t <= 1) & (u >= 0) & (u <= 1)
+        ii, jj = np.nonzero(np.triu(valid, 1))
+        if not len(ii):
+            return best
+        ix = p[ii, 0] + t[ii, jj] * r[ii, 0]
+        iy = p[ii, 1] + t[ii, jj] * r[ii, 1]
+        dist = (ix - x) ** 2 + (iy - y) ** 2
+        i = int(np.argmin(dist))
+        if dist[i] < best_dist:
+            best = (float(ix[i]), float(iy[i]), 'intersection')
+        return best
+
+
+class PageLayout:
+    """連続スクロールで全ページを縦に並べた配置
+
+    ページの大きさは最初にまとめて取得し、位置はズームに比例させる
+    （ズームのプレビューで拡大縮小してもページの位置がずれない）。
+    """
+
+    def __init__(self, sizes, gap=PAGE_GAP):
+        """
+        Args:
+            sizes: ページの大きさ [(幅, 高さ)]（PDFのポイント）
+            gap: ページの間隔（PDFのポイント）
+        """
+        self.sizes = np.asarray(sizes, dtype=np.float64).reshape(-1, 2)
+        heights = self.sizes[:, 1] + gap
+        self.tops = np.concatenate(([0.0], np.cumsum(heights)[:-1]))
+        self.width = float(self.sizes[:, 0].max()) if len(self.sizes) else 0.0
+        self.height = float(self.tops[-1] + self.sizes[-1, 1]) if len(self.sizes) else 0.0
+
+    def __len__(self):
+        return len(self.sizes)
+
+    def page_at(self, y):
+        """縦位置（ズーム前）にあるページ番号（ページの間隔は上のページに含める、配列も可）"""
+        index = np.clip(np.searchsorted(self.tops, y, side='right') - 1, 0, len(self.sizes) - 1)
+        return int(index) if np.ndim(index) == 0 else index
+
+    def pages_between(self, y0, y1):
+        """縦の範囲（ズーム前）に重なるページ番号のリスト"""
+        first = self.page_at(y0)
+        last = self.page_at(y1)
+        return [p for p in range(first, last + 1) if self.tops[p] + self.sizes[p, 1] >= y0]
+
+    def origin(self, page_index, zoom):
+        """ページの左上のキャンバス座標"""
+        return 0, int(round(self.tops[page_index] * zoom))
+
+    def page_pixel_size(self, page_index, zoom):
+        """ページのズーム適用後の大きさ（ピクセル）"""
+        width, height = self.sizes[page_index]
+        irect = (fitz.Rect(0, 0, width, height) * fitz.Matrix(zoom, zoom)).irect
+        return irect.width, irect.height
+
+    def pixel_size(self, zoom):
+        """全ページを並べたズーム適用後の大きさ（ピクセル）"""
+        return int(np.ceil(self.width * zoom)), int(np.ceil(self.height * zoom))
+
+
+def render_zoom_preview(images, base_zoom, zoom, view):
+    """表示中のタイル画像を拡大縮小して、新しいズームでの表示範囲のプレビュー画像を作る
+
+    PDFやデコーダーは使わず、手元にあるタイル画像の表示範囲に重なる部分だけを拡大縮小する。
+
+    Args:
+        images: 画像 {(左端, 上端): Image} 位置はズーム base_zoom でのピクセル座標
+        base_zoom: 画像のズーム倍率
+        zoom: 新しいズーム倍率
+        view: 表示範囲（新しいズームでのキャンバス座標 x0, y0, x1, y1）
+    """
+    x0, y0, x1, y1 = view
+    scale = zoom / base_zoom
+    preview = Image.new('RGBA', (x1 - x0, y1 - y0))
+    for (left, top), img in images.items():
+        # 画像のうち表示範囲に重なる部分（ズーム base_zoom での座標）
+        src_x0 = max(left, x0 / scale)
+        src_y0 = max(top, y0 / scale)
+        src_x1 = min(left + img.width, x1 / scale)
+        src_y1 = min(top + img.height, y1 / scale)
+        if src_x1 <= src_x0 or src_y1 <= src_y0:
+            continue
+
+        # 貼り付け先（隣のタイルと隙間ができないように端を丸める）
+        dst_x0 = round(src_x0 * scale) - x0
+        dst_y0 = round(src_y0 * scale) - y0
+        dst_x1 = round(src_x1 * scale) - x0
+        dst_y1 = round(src_y1 * scale) - y0
+        if dst_x1 <= dst_x0 or dst_y1 <= dst_y0:
+            continue
+        piece = img.resize((dst_x1 - dst_x0, dst_y1 - dst_y0), Image.BILINEAR,
+                           box=(src_x0 - left, src_y0 - top, src_x1 - left, src_y1 - top))
+        preview.paste(piece.convert('RGBA'), (dst_x0, dst_y0))
+    return preview
+
+
+def read_points(file_path):
+    """CSV/JSONから座標の一覧を読み込む
+
+    CSVは1行に x,y（見出し行は省略可、ステータスバーと同じ x_y 形式も可）。
+    JSONは [[x, y], ...]、[{"x": .., "y": ..}, ...]、
+    または {"unit": "pt" | "scaled", "points": [...]}。
+
+    Returns:
+        (xs, ys, 単位) 単位がファイルに書かれていなければNone
+    """
+    unit = None
+    if file_path.lower().endswith('.json'):
+        with open(file_path, encoding='utf-8') as f:
+            data = json.load(f)
+        if isinstance(data, dict):
+            unit = data.get('unit')
+            data = data.get('points', [])
+        if data and isinstance(data[0], dict):
+            data = [(p['x'], p['y']) for p in data]
+        points = np.asarray(data, dtype=np.float64).reshape(-1, 2)
+    else:
+        with open(file_path, encoding='utf-8-sig') as f:
+            first_line = f.readline()
+        delimiter = '_' if '_' in first_line and ',' not in first_line else ','
+        try:
+            [float(v) for v in first_line.split(delimiter)[:2]]
+            skiprows = 0
+        except ValueError:
+            skiprows = 1  # 見出し行
+        points = np.loadtxt(file_path, delimiter=delimiter, usecols=(0, 1), skiprows=skiprows,
+                            ndmin=2, encoding='utf-8-sig')
+    return points[:, 0], points[:, 1], unit
+
+
+def write_points(file_path, xs, ys, unit):
+    """座標の一覧をCSV/JSONに書き出す（read_points() で読み込める形式）"""
+    points = np.round(np.column_stack([xs, ys]), 3)
+    if file_path.lower().endswith('.json'):
+        with open(file_path, 'w', encoding='utf-8') as f:
+            json.dump({'unit': unit, 'points': points.tolist()}, f)
+    else:
+        np.savetxt(file_path, points, fmt='%.3f', delimiter=',', header='x,y', comments='')
+
+
+def get_gray_pixmap(page, mat, clip):
+    """ICCカラーマネジメントを切ってグレースケールのPixmapを描画
+
+    ICCが有効なままだとsRGBからグレーへの色変換になり、PILの輝度（299/587/114）より
+    緑や水色の線がかなり暗くなる（反転すると黒い背景に埋もれる）。埋め込み画像の変換も遅い。
+    ICCを切るとMuPDFもほぼ同じ重みで変換する（PILとの差は1〜2階調）。
+    PDFの描画はワーカープロセスの1スレッドで行うため、切り替えが他の描画と重なることはない。
+    """
+    fitz.TOOLS.set_icc(False)
+    try:
+        return page.get_pixmap(matrix=mat, clip=clip, alpha=False, colorspace=fitz.csGRAY)
+    finally:
+        # 通常表示のRGB描画のためにMuPDFの既定（ICC有効）に戻す
+        try:
+            fitz.TOOLS.set_icc(True)
+        except ValueError:
+            pass  # ICCなしでビルドされたMuPDF
+
+
+def render_pdf_tile(page, zoom, box, quality, invert, timings=None):
+    """PDFページのタイルをPIL Imageとしてレンダリング
+
+    Args:
+        page: PDFページ、またはそのディスプレイリスト
+        zoom: ズーム倍率
+        box: タイルの範囲（ズーム適用後のピクセル座標 x0, y0, x1, y1）
+        quality: 'low' (高速・低品質) or 'high' (低速・高品質)
+        invert: グレースケール反転するかどうか
+        timings: 段階ごとの時間 (段階, 秒, 大きさ) を追加するリスト（Noneなら計測しない）
+    """
+    x0, y0, x1, y1 = box
+    tile_size = (x1 - x0, y1 - y0)
+
+    # 品質に応じてレンダリング解像度を変更
+    if quality == 'low':
+        # 低品質モード: 解像度を70%に下げて高速化
+        zoom_factor = zoom * 0.7
+    else:
+        # 高品質モード: 通常の解像度
+        zoom_factor = zoom
+
+    # タイルの範囲だけをクリップしてレンダリング
+    ox, oy = page.rect.x0, page.rect.y0
+    clip = fitz.Rect(ox + x0 / zoom, oy + y0 / zoom, ox + x1 / zoom, oy + y1 / zoom)
+    mat = fitz.Matrix(zoom_factor, zoom_factor)
+    start = time.perf_counter()
+    if invert:
+        # 反転表示はグレースケールで描画し、Pixmapの画素をその場で反転する
+        pix = get_gray_pixmap(page, mat, clip)
+    else:
+        pix = page.get_pixmap(matrix=mat, clip=clip, alpha=False)
+    lap = time.perf_counter()
+    if timings is not None:
+        timings.append(('pixmap', lap - start, (pix.width, pix.height)))
+    if invert:
+        pix.invert_irect()
+        start, lap = lap, time.perf_counter()
+        if timings is not None:
+            timings.append(('invert', lap - start, (pix.width, pix.height)))
+
+    # PixmapをPIL Imageに変換（グレースケールは1ピクセル1バイトのまま）
+    img = pixmap_to_image(pix)
+    start, lap = lap, time.perf_counter()
+    if timings is not None:
+        timings.append(('convert', lap - start, img.size))
+
+    # 低品質モードや丸め誤差でサイズがずれた場合はタイルサイズに合わせる
+    if img.size != tile_size:
+        img = img.resize(tile_size, Image.Resampling.BILINEAR)
+        start, lap = lap, time.perf_counter()
+        if timings is not None:
+            timings.append(('resize', lap - start, tile_size))
+
+    return img
+
+
+class MappedImageStore:
+    """巨大画像の展開先（ディスク上の一時ファイルにメモリマップしたバッファ）
+
+    ここに作った画像はOSのページキャッシュ経由で読み書きされるので、
+    画像全体が常駐メモリに載ることはない。
+
+    Pillowの非公開API（Image.core.map_buffer と Image._new）を使っている。
+    requirements.txtでPillowのバージョンを固定する代わりに、これらが使えなくなっていたら
+    警告を出して普通のメモリ上の画像で代用する（表示はできるが常駐メモリは抑えられない）。
+    """
+
+    def __init__(self):
+        self.directory = tempfile.mkdtemp(prefix='pdfxy_')
+        self.buffers = []  # [(mmap, ファイル)]
+        self.mapped = True  # メモリマップが使えるか（非公開APIが使えなければFalse）
+
+    def new_image(self, mode, size):
+        """メモリマップしたバッファを画素データに使う空の画像を作成"""
+        if not self.mapped:
+            return Image.new(mode, size)
+        nbytes = max(1, size[0] * size[1] * bytes_per_pixel(mode))
+        f = open(os.path.join(self.directory, f'{len(self.buffers)}.raw'), 'w+b')
+        f.truncate(nbytes)
+        buffer = mmap.mmap(f.fileno(), nbytes)
+        self.buffers.append((buffer, f))  # 失敗してもclose()で片付ける
+        try:
+            core = Image.core.map_buffer(buffer, size, 'raw', 0, (mode, 0, 1))
+            return Image.new(mode, (0, 0))._new(core)
+        except (AttributeError, TypeError) as e:
+            print(f"Warning: Could not map image buffer, decoding into memory: {str(e)}")
+            self.mapped = False
+            return Image.new(mode, size)
+
+    def close(self):
+        """バッファと一時ファイルを削除"""
+        for buffer, f in self.buffers:
+            try:
+                buffer.close()
+            except BufferError:
+                pass  # まだ画像から参照されている（プロセス終了時に解放される）
+            f.close()
+        self.buffers = []
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+
+class ImagePyramid:
+    """画像ファイル用の縮小画像ピラミッド（ミップマップ）
+
+    レベル0が元画像、レベルnは縦横1/2^n。必要になったレベルだけを
+    1つ上のレベルから縮小して作るので、ズームのたびに元画像全体を
+    リサイズしなくて済む。
+    """
+
+    def __init__(self, image, base_scale=1.0, full_size=None, store=None):
+        """
+        Args:
+            image: レベル0の画像
+            base_scale: レベル0の元画像に対する縮小率（JPEGの縮小デコード時は1未満）
+            full_size: 元画像のサイズ（省略時はimageのサイズ）
+            store: 大きなレベルを展開するMappedImageStore（省略時はメモリ上に作る）
+        """
+        self.levels = [image]
+        self.base_scale = base_scale
+        self.size = full_size or image.size
+        self.store = store
+        self.lock = threading.Lock()  # レンダリングスレッドから同時に作られないように
+
+    def level_for(self, zoom):
+        """ズーム倍率以上の解像度を持つ、最も小さいレベルを返す
+
+        Returns:
+            (画像, そのレベルの縮小率)
+        """
+        index = 0
+        while zoom <= self.base_scale * 0.5 ** (index + 1) and index < 32:
+            index += 1
+
+        with self.lock:
+            while len(self.levels) <= index:
+                prev = self.levels[-1]
+                if prev.width < 2 or prev.height < 2:
+                    break
+                self.levels.append(self.reduce_level(prev))
+            index = min(index, len(self.levels) - 1)
+            return self.levels[index], self.base_scale * 0.5 ** index
+
+    def reduce_level(self, prev):
+        """1つ上のレベルを縦横1/2に縮小して次のレベルを作る"""
+        reduced_size = ((prev.width + 1) // 2, (prev.height + 1) // 2)
+        if self.store is None or reduced_size[0] * reduced_size[1] * bytes_per_pixel(prev.mode) <= LARGE_IMAGE_MB * 1024 * 1024 // 4:
+            return prev.reduce(2)
+
+        # 大きなレベルはストリップごとに縮小してディスク上に展開
+        level = self.store.new_image(prev.mode, reduced_size)
+        for y in range(0, prev.height, LARGE_IMAGE_STRIP):
+            strip = prev.crop((0, y, prev.width, min(y + LARGE_IMAGE_STRIP, prev.height)))
+            level.paste(strip.reduce(2), (0, y // 2))
+        return level
+
+
+def load_mapped_image(file_path, store):
+    """巨大な画像をメモリマップしたファイルに展開し、縮小画像ピラミッドを作る
+
+    PILのデコード先をあらかじめディスク上のバッファに差し替えてから読み込むので、
+    画像全体がメモリ上に確保されることはない。バックグラウンドスレッドで実行される。
+    """
+    img = Image.open(file_path)
+    target = store.new_image(img.mode, img.size)
+    try:
+        # 非公開の img.im を差し替えて、デコーダーにバッファへ直接書かせる
+        img.im = target.im
+        img.load()
+    except (AttributeError, TypeError) as e:
+        # Pillowの変更で差し替えられなければ、普通に読み込む（MappedImageStore を参照）
+        print(f"Warning: Could not decode into mapped buffer, decoding into memory: {str(e)}")
+        img = Image.open(file_path)
+        img.load()
+
+    # 表示用の形式でなければストリップ単位で変換
+    if img.mode not in ('RGB', 'RGBA', 'L'):
+        mode = 'RGBA' if img.mode in ('P', 'PA', 'LA') else 'RGB'
+        converted = store.new_image(mode, img.size)
+        for y in range(0, img.height, LARGE_IMAGE_STRIP):
+            box = (0, y, img.width, min(y + LARGE_IMAGE_STRIP, img.height))
+            converted.paste(img.crop(box).convert(mode), box[:2])
+        img = converted
+
+    # 全レベルを先に作っておく（表示中のタイル描画を待たせない）
+    pyramid = ImagePyramid(img, store=store)
+    pyramid.level_for(1.0 / max(img.size))
+    return pyramid
+
+
+def render_image_tile(source, zoom, box, quality, invert, timings=None):
+    """画像ファイルのタイルをPIL Imageとしてレンダリング
+
+    Args:
+        source: 元画像のImagePyramid
+        zoom, box, quality, invert, timings: render_pdf_tile() と同じ
+    """
+    x0, y0, x1, y1 = box
+    tile_size = (x1 - x0, y1 - y0)
+
+    # ズームに最も近い、それより大きいレベルのタイル相当部分だけをリサンプリング
+    start = time.perf_counter()
+    level, level_scale = source.level_for(zoom)
+    scale = zoom / level_scale
+    source_box = (x0 / scale, y0 / scale, x1 / scale, y1 / scale)
+    if quality == 'low':
+        img = level.resize(tile_size, Image.Resampling.BILINEAR, box=source_box)
+    else:
+        img = level.resize(tile_size, Image.Resampling.LANCZOS, box=source_box)
+    lap = time.perf_counter()
+    if timings is not None:
+        timings.append(('resample', lap - start, tile_size))
+
+    # グレースケール反転処理
+    if invert:
+        img = img.convert('L')  # グレースケールに変換
+        img = ImageOps.invert(img)  # 反転
+        if timings is not None:
+            timings.append(('invert', time.perf_counter() - lap, tile_size))
+
+    return img
+
+
+def render_image_tile_job(source, zoom, box, quality, invert):
+    """スレッドで画像ファイルのタイルをレンダリングし、(Image, 段階ごとの時間) を返す"""
+    timings = []
+    return render_image_tile(source, zoom, box, quality, invert, timings), timings
+
+
+# ワーカープロセス内で開いたPDF {doc_key: Document}
+_worker_documents = OrderedDict()
+
+# ワーカープロセス内で作成したディスプレイリスト {(doc_key, ページ番号): DisplayList}
+_worker_display_lists = OrderedDict()
+
+# メインプロセスと共有する描画の世代番号（表示が変わるたびに増える）
+_worker_generation = None
+
+
+def init_render_worker(generation):
+    """ワーカープロセスの初期化（描画の世代番号の共有変数を受け取る）"""
+    global _worker_generation
+    _worker_generation = generation
+
+
+def is_stale_job(generation):
+    """ジョブの世代が古くなっていれば真（描画しても表示には使われない）
+
+    Args:
+        generation: ジョブを投入した時の世代番号（Noneは取り消さないジョブ）
+    """
+    return generation is not None and _worker_generation is not None and generation < _worker_generation.value
+
+
+def open_worker_document(doc_key):
+    """ワーカープロセス内でPDFを開く（同じファイルは開きっぱなしで再利用）"""
+    doc = _worker_documents.get(doc_key)
+    if doc is None:
+        doc = fitz.open(doc_key[0])
+        _worker_documents[doc_key] = doc
+        while len(_worker_documents) > 2:
+            old_key, old_doc = _worker_documents.popitem(last=False)
+            # 閉じるPDFのディスプレイリストも破棄
+            for dl_key in [k for k in _worker_display_lists if k[0] == old_key]:
+                del _worker_display_lists[dl_key]
+            old_doc.close()
+    else:
+        _worker_documents.move_to_end(doc_key)
+    return doc
+
+
+def get_worker_display_list(doc_key, page_index):
+    """ページのディスプレイリストを取得（初回のみページの内容を解釈して作成）
+
+    ディスプレイリストがあれば、ズームやクリップを変えて何度描画しても
+    ページのコンテンツストリームを解釈し直さずに済む。
+    """
+    key = (doc_key, page_index)
+    display_list = _worker_display_lists.get(key)
+    if display_list is None:
+        doc = open_worker_document(doc_key)
+        display_list = doc[page_index].get_displaylist()
+        _worker_display_lists[key] = display_list
+        while len(_worker_display_lists) > DISPLAY_LIST_PAGES:
+            _worker_display_lists.popitem(last=False)
+    else:
+        _worker_display_lists.move_to_end(key)
+    return display_list
+
+
+def render_pdf_tile_job(doc_key, page_index, zoom, box, quality, invert, generation=None, disk_path=None):
+    """ワーカープロセスでPDFのタイルをレンダリング
+
+    プロセス間で受け渡せるように (モード, サイズ, 画素データ, 段階ごとの時間, ディスクに保存したバイト数) を返す。
+    実行前とディスプレイリストの作成後に世代番号を確認し、表示が変わっていれば
+    描画せずにNoneを返す（MuPDFの描画自体は途中で止められないため）。
+
+    Args:
+        disk_path: ディスクキャッシュの保存先（Noneなら保存しない）
+    """
+    if is_stale_job(generation):
+        return None
+    timings = []
+    start = time.perf_counter()
+    cached = (doc_key, page_index) in _worker_display_lists
+    display_list = get_worker_display_list(doc_key, page_index)
+    if not cached:
+        timings.append(('display_list', time.perf_counter() - start, None))
+    if is_stale_job(generation):
+        return None
+    img = render_pdf_tile(display_list, zoom, box, quality, invert, timings)
+    saved = 0
+    if disk_path is not None:
+        start = time.perf_counter()
+        try:
+            saved = save_raw_image(disk_path, img)
+        except OSError as e:
+            print(f"Warning: Could not save tile to disk cache: {str(e)}")
+        timings.append(('disk_save', time.perf_counter() - start, img.size))
+    return img.mode, img.size, img.tobytes(), timings, saved
+
+
+def build_word_index_job(doc_key, page_index):
+    """ワーカープロセスでページの単語を取り出し、空間インデックスを作成"""
+    return WordIndex(extract_page_words(open_worker_document(doc_key)[page_index]))
+
+
+def extract_page_words(page):
+    """ページの単語を取り出す
+
+    単語の座標は回転前のページのものなので、表示と同じ向きの座標に変換しておく。
+
+    Returns:
+        [(x0, y0, x1, y1, 文字列)] 座標は正規化座標（ズーム1のピクセル）
+    """
+    matrix = page.rotation_matrix
+    origin = page.rect.tl
+    words = []
+    for word in page.get_text("words"):
+        rect = fitz.Rect(word[:4]) * matrix
+        words.append((rect.x0 - origin.x, rect.y0 - origin.y, rect.x1 - origin.x, rect.y1 - origin.y, word[4]))
+    return words
+
+
+def build_snap_index_job(doc_key, page_index):
+    """ワーカープロセスでページの図形から吸着点を取り出し、空間インデックスを作成"""
+    return SnapIndex(*extract_snap_geometry(open_worker_document(doc_key)[page_index]))
+
+
+def extract_snap_geometry(page):
+    """ページの図形から吸着点と線分を取り出す
+
+    線分（矩形・四角形の辺を含む）の端点と中点、曲線の端点、閉じた曲線（円・楕円）の中心を
+    吸着点にする。座標は表示と同じ向きに変換しておく。
+
+    Returns:
+        (吸着点 (N, 2), 種類 (N,) SnapIndex.KINDS の番号, 線分 (M, 4))
+    """
+    segments = []
+    curve_points = []  # 曲線の端点
+    centers = []
+    for path in page.get_cdrawings():
+        items = path['items']
+        first = None
+        last = None
+        curves_only = True
+        for item in items:
+            op = item[0]
+            if op == 'l':
+                segments.append(item[1] + item[2])
+                curves_only = False
+                start, end = item[1], item[2]
+            elif op == 'c':
+                curve_points.append(item[1])
+                curve_points.append(item[4])
+                start, end = item[1], item[4]
+            elif op == 're':
+                x0, y0, x1, y1 = item[1]
+                segments += [(x0, y0, x1, y0), (x1, y0, x1, y1), (x1, y1, x0, y1), (x0, y1, x0, y0)]
+                curves_only = False
+                continue
+            elif op == 'qu':
+                ul, ur, ll, lr = item[1]
+                segments += [ul + ur, ur + lr, lr + ll, ll + ul]
+                curves_only = False
+                continue
+            else:
+                continue
+            if first is None:
+                first = start
+            last = end
+
+        if first is None:
+            continue
+        if curves_only and len(items) >= 2 and first == last:
+            # 曲線だけで閉じたパスは円・楕円とみなし、外接矩形の中心を吸着点にする
+            x0, y0, x1, y1 = path['rect']
+            centers.append(((x0 + x1) / 2, (y0 + y1) / 2))
+        elif path.get('closePath') and first != last:
+            segments.append(last + first)
+
+    segments = np.array(segments, dtype=np.float64).reshape(-1, 4)
+    curve_points = np.array(curve_points, dtype=np.float64).reshape(-1, 2)
+    centers = np.array(centers, dtype=np.float64).reshape(-1, 2)
+    points = np.concatenate([segments[:, :2], segments[:, 2:], curve_points,
+                             (segments[:, :2] + segments[:, 2:]) / 2, centers])
+    kinds = np.concatenate([np.full(2 * len(segments) + len(curve_points), 0, dtype=np.uint8),
+                            np.full(len(segments), 1, dtype=np.uint8),
+                            np.full(len(centers), 2, dtype=np.uint8)])
+
+    # 回転前のページの座標を表示と同じ向きに変換
+    a, b, c, d, e, f = page.rotation_matrix
+    origin = page.rect.tl
+
+    def transform(xy):
+        return np.column_stack([a * xy[:, 0] + c * xy[:, 1] + e - origin.x,
+                                b * xy[:, 0] + d * xy[:, 1] + f - origin.y])
+
+    points = transform(points)
+    segments = np.column_stack([transform(segments[:, :2]), transform(segments[:, 2:])])
+    return points, kinds, segments
+
+
+def render_thumbnail_job(doc_key, page_index, zoom, cache_path):
+    """ワーカープロセスでページのサムネイルをレンダリングし、ディスクキャッシュに保存
+
+    表示中のページのディスプレイリストを追い出さないよう、ページから直接描画する。
+
+    Args:
+        cache_path: 保存先のファイル（Noneなら保存しない）
+    """
+    page = open_worker_document(doc_key)[page_index]
+    pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), alpha=False)
+    img = pixmap_to_image(pix)
+
+    if cache_path is not None:
+        try:
+            # 書きかけのファイルを読まないよう、一時ファイルに書いてから置き換える
+            os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+            temp_path = f"{cache_path}.{os.getpid()}.tmp"
+            img.save(temp_path, 'PNG')
+            os.replace(temp_path, cache_path)
+        except OSError as e:
+            print(f"Warning: Could not save thumbnail: {str(e)}")
+    return img.mode, img.size, img.tobytes()
+
+
+def open_document_process(file_path, repaired_path, conn):
+    """別プロセスでPDFを開き、進捗をパイプで送る
+
+    MuPDFは壊れたPDFを開く時にファイル全体を読み直して修復するため、巨大なファイルでは時間がかかる。
+    修復した場合は修復済みのコピーを保存し、表示側やワーカーではそれを開く（修復をやり直さない）。
+    送るメッセージは ('pages', ページ数), ('stage', 状態), ('done', 開くファイル), ('error', メッセージ)。
+    修復済みのコピーを保存できない場合やパスワード付きのPDFはエラーにする
+    （表示側で元のファイルを開き直すと、UIのスレッドで修復をやり直すことになるため）。
+    """
+    try:
+        doc = fitz.open(file_path)
+        if doc.needs_pass:
+            conn.send(('error', PASSWORD_ERROR))
+            return
+        conn.send(('pages', len(doc)))
+        path = file_path
+        if doc.is_repaired:
+            conn.send(('stage', "Saving repaired copy"))
+            try:
+                os.makedirs(os.path.dirname(repaired_path), exist_ok=True)
+                temp_path = f"{repaired_path}.{os.getpid()}.tmp"
+                doc.save(temp_path)
+                os.replace(temp_path, repaired_path)
+            except Exception as e:
+                conn.send(('error', f"Could not save repaired copy: {str(e)}"))
+                return
+            path = repaired_path
+        doc.close()
+        conn.send(('done', path))
+    except Exception as e:
+        conn.send(('error', str(e)))
+    finally:
+        conn.close()
+
+
+def trim_repaired_copies(directory, keep=REPAIRED_COPIES):
+    """修復済みPDFのコピーを、最後に使った日時の新しいものから keep 個だけ残す"""
+    try:
+        with os.scandir(directory) as it:
+            copies = sorted((entry.stat().st_mtime, entry.path) for entry in it if entry.name.endswith('.pdf'))
+    except FileNotFoundError:
+        return
+    for _, path in copies[:-keep]:
+        try:
+            os.remove(path)
+        except OSError as e:
+            print(f"Warning: Could not remove repaired copy: {str(e)}")
+
+
+def create_process_executor(generation=None):
+    """PDFレンダリング用のプロセスプールを作成
+
+    PyMuPDFはレンダリング中にGILを解放しないため、スレッドではなくプロセスで並列化する。
+
+    Args:
+        generation: ワーカーと共有する描画の世代番号（multiprocessing.Value）
+    """
+    try:
+        return ProcessPoolExecutor(max_workers=RENDER_WORKERS, initializer=init_render_worker,
+                                   initargs=(generation,))
+    except (OSError, NotImplementedError, ImportError) as e:
+        # プロセスが使えない環境では1スレッドで代用（PyMuPDFはスレッドセーフではない）
+        print(f"Warning: Could not start render processes: {str(e)}")
+        init_render_worker(generation)
+        return ThreadPoolExecutor(max_workers=1)
+
+
+def create_thread_executor():
+    """画像レンダリング用のスレッドプールを作成（PILはリサイズ中にGILを解放する）"""
+    return ThreadPoolExecutor(max_workers=RENDER_WORKERS)
+
+
+class RenderWorker:
+    """バックグラウンドでレンダリングジョブを実行するワーカー
+
+    ジョブはキー単位で管理し、同時に実行するのは max_in_flight 件まで。
+    残りは手元のキューに置いておくので、ページやズームが変わった時に
+    まだ始まっていないジョブをまとめて取り消せる。
+    投入待ちのジョブは優先度の値が小さいもの、同じ優先度なら先に来たものから実行する。
+    打ち切り可能なジョブには、キューに入れた時ではなく実行を始める時の世代番号を渡す
+    （待っている間に世代が進んでも、まだ必要なジョブが投入直後に打ち切られないように）。
+    """
+
+    def __init__(self, executor_factory, max_in_flight, generation=None):
+        self.executor_factory = executor_factory
+        self.executor = None  # 最初のジョブ投入時に作成
+        self.max_in_flight = max_in_flight
+        self.generation = generation  # 描画の世代番号（multiprocessing.Value、Noneなら打ち切らない）
+        self.pending = {}  # 投入待ちのジョブ {キー: (優先度, 順番, 関数, 引数, キーワード引数, 打ち切り可能か)}
+        self.in_flight = {}  # 実行中のジョブ {Future: キー}
+        self.sequence = 0  # 投入順の通し番号
+
+    def is_queued(self, key):
+        """キーのジョブが待機中または実行中かどうか"""
+        return key in self.pending or key in self.in_flight.values()
+
+    def submit(self, key, fn, *args, priority=0, cancellable=False, **kwargs):
+        """ジョブを投入待ちキューに追加
+
+        同じキーのジョブが待機中なら、優先度が高くなる場合だけ更新する。
+
+        Args:
+            cancellable: 真なら実行開始時の世代番号を generation 引数で渡し、表示が変わったら打ち切らせる
+        """
+        if key in self.in_flight.values():
+            return
+        if key in self.pending and self.pending[key][0] <= priority:
+            return
+        self.sequence += 1
+        self.pending[key] = (priority, self.sequence, fn, args, kwargs, cancellable)
+
+    def discard(self, keep):
+        """keep(key) が偽になる投入待ちジョブを取り消す"""
+        for key in [key for key in self.pending if not keep(key)]:
+            del self.pending[key]
+
+    def cancel_all(self):
+        """投入待ちのジョブと、まだ開始していない実行中ジョブを取り消す"""
+        self.pending.clear()
+        for future in list(self.in_flight):
+            if future.cancel():
+                del self.in_flight[future]
+
+    def busy(self):
+        """未完了のジョブがあるかどうか"""
+        return bool(self.pending or self.in_flight)
+
+    def poll(self):
+        """完了したジョブの結果を回収し、空いた分だけ次のジョブを投入
+
+        Returns:
+            [(キー, 結果, 例外)] のリスト
+        """
+        results = []
+        for future, key in list(self.in_flight.items()):
+            if not future.done():
+                continue
+            del self.in_flight[future]
+            if future.cancelled():
+                continue
+            try:
+                results.append((key, future.result(), None))
+            except BrokenExecutor as e:
+                # ワーカーが異常終了した場合は次の投入時に作り直す
+                self.executor = None
+                results.append((key, None, e))
+            except Exception as e:
+                results.append((key, None, e))
+
+        while self.pending and len(self.in_flight) < self.max_in_flight:
+            key = min(self.pending, key=self.pending.get)
+            _, _, fn, args, kwargs, cancellable = self.pending.pop(key)
+            if cancellable and self.generation is not None:
+                kwargs = dict(kwargs, generation=self.generation.value)
+            if self.executor is None:
+                self.executor = self.executor_factory()
+            self.in_flight[self.executor.submit(fn, *args, **kwargs)] = key
+
+        return results
+
+    def shutdown(self):
+        """ワーカーを停止"""
+        self.cancel_all()
+        if self.executor is not None:
+            self.executor.shutdown(wait=False)
+            self.executor = None
+
 
 class PDFViewer:
     def __init__(self, root):
@@ -39,14 +1592,77 @@ class PDFViewer:
         self.image_file = None  # 画像ファイル用（PNG/JPG）
         self.is_image_mode = False  # 画像モードかどうか
         self.cached_image = None  # 画像ファイルのキャッシュ（元画像）
+        self.image_pyramid = None  # 画像ファイルの縮小画像ピラミッド
+        self.image_store = None  # 巨大画像の展開先
+        self.large_image_future = None  # 巨大画像のバックグラウンド読み込み
+        self.decode_executor = None  # 巨大画像の読み込み用スレッド
         self.render_timer = None  # レンダリング遅延用タイマー
+        self.continuous = tk.BooleanVar(value=False)  # 全ページを縦に並べて連続スクロールする
+        self.page_layout = None  # 連続スクロールでのページの配置（PageLayout）
+        self.page_sizes = None  # 全ページの大きさ（PDFのポイント、必要になった時に取得）
         self.invert_colors = False  # グレースケール反転フラグ
 
+        # タイル描画用
+        self.tile_items = {}  # 表示中のタイル {(ページ, tx, ty): (キャンバスID, PhotoImage, Image)}
+        self.tile_quality = 'high'  # 現在のタイルの品質
+        self.page_pixel_size = (0, 0)  # ズーム適用後の表示領域の大きさ（ピクセル、連続スクロールでは全ページ分）
+        self.page_bg_items = {}  # 表示中のページの背景 {ページ: キャンバスID}
+        self.tile_update_timer = None  # タイル更新の遅延実行用
+        self.render_cache = RenderCache(RENDER_CACHE_MB * 1024 * 1024)  # レンダリング済みタイルのキャッシュ
+        self.doc_key = None  # キャッシュのキーに使うファイルの識別子
+        self.doc_fingerprint = None  # ファイルの内容の識別子（ディスクキャッシュ用）
+        self.disk_cache = None  # タイルのディスクキャッシュ（無効ならNone）
+        if DISK_CACHE_MB > 0:
+            self.disk_cache = DiskTileCache(os.path.join(get_cache_dir(), 'tiles'), DISK_CACHE_MB * 1024 * 1024)
+        self.saved_zooms = None  # ファイルごとの最後のズーム {識別子: ズーム}（初回のみ読み込む）
+        self.open_job = None  # 別プロセスで開いているPDF (プロセス, パイプ, ファイル, 修復済みのコピー, 開始時刻)
+        self.open_stage = None  # 別プロセスで開いているPDFの状態（進捗表示用）
+        self.open_progress_shown = False  # 進捗バーとキャンセルボタンを表示したか
+        self.visible_tiles = set()  # 表示範囲（＋余白）に必要なタイル
+        self.stale_tiles = set()  # 差し替え待ちの古いタイル（品質・反転の変更前のもの）
+        self.tile_view = None  # タイルを配置した時の (ファイル, ページ（連続スクロールでは-1）, ズーム)
+        self.zoom_preview = None  # タイルが揃うまでのプレビュー (元の画像の倍率, {(左端, 上端): Image}, キャンバスID, PhotoImage)
+        self.coarse_requests = set()  # 最後に依頼した粗い画像のキー
+
+        # バックグラウンドレンダリング（Tkのメインループを止めない）
+        self.render_generation = multiprocessing.Value('l', 0)  # 表示が変わるたびに増やし、古いジョブを打ち切る
+        self.pdf_worker = RenderWorker(lambda: create_process_executor(self.render_generation), RENDER_WORKERS,
+                                       self.render_generation)
+        self.image_worker = RenderWorker(create_thread_executor, RENDER_WORKERS)
+        self.render_poll_timer = None  # レンダリング結果の確認タイマー
+        self.page_direction = 1  # ページ送りの方向（1: 次へ, -1: 前へ）
+
+        # 描画の段階ごとの時間の計測用
+        self.perf = PerfRecorder(PERF_LOG)
+        self.show_perf_hud = tk.BooleanVar(value=False)  # 計測結果をステータスバーの上に表示する
+        self.perf_hud_timer = None  # HUDの更新タイマー
+
+        # 単語の検索用
+        self.word_indexes = OrderedDict()  # ページごとの単語の空間インデックス {(ファイル, ページ): WordIndex}
+        self.show_nearest_word = tk.BooleanVar(value=False)  # カーソル付近の単語を表示する（既定は無効）
+        self.snap_to_words = tk.BooleanVar(value=False)  # 座標を単語の中心に吸着させる
+        self.snap_indexes = OrderedDict()  # ページごとの図形の吸着点 {(ファイル, ページ): SnapIndex}
+        self.snap_to_geometry = tk.BooleanVar(value=False)  # 座標を図形の端点・中点・中心・交点に吸着させる
+
+        # サムネイル一覧用
+        self.show_thumbnails = tk.BooleanVar(value=False)  # サムネイル一覧を表示する
+        self.thumb_layout = None  # サムネイルの配置（PageLayout）
+        self.thumb_scale = 1.0  # サムネイルの倍率
+        self.thumb_dir = None  # このファイルのサムネイルの保存先
+        self.thumb_items = {}  # 表示中のサムネイル {ページ: (キャンバスIDのリスト, PhotoImage)}
+        self.thumb_update_timer = None  # サムネイル更新の遅延実行用
+
         # パン機能用
-        self.pan_start_x = 0
-        self.pan_start_y = 0
         self.is_panning = False
 
+        # マウス操作はフレームごとにまとめて処理する（高頻度のマウスでもイベントが溜まらない）
+        self.input_timer = None  # 次のフレームの処理タイマー
+        self.pending_motion = None  # 最後のカーソル位置（ウィンドウ座標）
+        self.pending_pan = None  # 最後のパン位置（ウィンドウ座標）
+        self.pending_scroll = [0, 0]  # 溜まったスクロール量 [X, Y]（units）
+        self.pending_zoom_steps = 0  # 溜まったズームの段数（正: ズームイン, 負: ズームアウト）
+        self.pending_zoom_anchor = None  # ズームの中心（ウィンドウ座標）
+
         # メニューバー
         menubar = tk.Menu(root)
         root.config(menu=menubar)
@@ -55,8 +1671,29 @@ class PDFViewer:
         menubar.add_cascade(label="File", menu=file_menu)
         file_menu.add_command(label="Open File", command=self.open_file)
         file_menu.add_separator()
+        file_menu.add_command(label="Import Points...", command=self.import_points)
+        file_menu.add_command(label="Export Points...", command=self.export_points)
+        file_menu.add_separator()
         file_menu.add_command(label="Exit", command=root.quit)
 
+        view_menu = tk.Menu(menubar, tearoff=0)
+        menubar.add_cascade(label="View", menu=view_menu)
+        view_menu.add_checkbutton(label="Continuous Scroll", variable=self.continuous,
+                                  command=self.toggle_continuous)
+        view_menu.add_checkbutton(label="Thumbnails", variable=self.show_thumbnails,
+                                  command=self.toggle_thumbnails)
+        view_menu.add_separator()
+        view_menu.add_checkbutton(label="Show Nearest Word", variable=self.show_nearest_word,
+                                  command=self.request_word_index)
+        view_menu.add_checkbutton(label="Snap to Words", variable=self.snap_to_words,
+                                  command=self.request_word_index)
+        view_menu.add_checkbutton(label="Snap to Geometry", variable=self.snap_to_geometry,
+                                  command=self.request_snap_index)
+        view_menu.add_separator()
+        view_menu.add_command(label="Render Cache Stats", command=self.show_cache_stats)
+        view_menu.add_checkbutton(label="Performance HUD", variable=self.show_perf_hud,
+                                  command=self.toggle_perf_hud)
+
         # 使い方メニュー
         menubar.add_command(label="How to Use", command=self.show_usage)
 
@@ -84,12 +1721,15 @@ class PDFViewer:
         self.invert_btn = tk.Button(toolbar, text="⚫⚪ Invert", command=self.toggle_invert, state=tk.DISABLED)
         self.invert_btn.pack(side=tk.LEFT, padx=(5, 5))
 
+        # 巨大なPDFを開いている間の進捗表示とキャンセルボタン（開いている間だけ配置）
+        self.open_cancel_btn = tk.Button(toolbar, text="Cancel", command=self.cancel_open)
+        self.open_progress = ttk.Progressbar(toolbar, mode='indeterminate', length=100)
+
         # 座標倍率設定
         scale_label = tk.Label(toolbar, text="Coord Scale:", bg="lightgray")
         scale_label.pack(side=tk.LEFT, padx=(20, 5))
 
-        scale_options = [0.0001,0.005,0.001,0.005,0.01,0.05, 0.1, 0.5, 1.0, 2.0]
-        self.scale_dropdown = tk.OptionMenu(toolbar, self.coord_scale, *scale_options)
+        self.scale_dropdown = tk.OptionMenu(toolbar, self.coord_scale, *COORD_SCALE_OPTIONS)
         self.scale_dropdown.config(width=5)
         self.scale_dropdown.pack(side=tk.LEFT, padx=2)
 
@@ -97,22 +1737,38 @@ class PDFViewer:
         canvas_frame = tk.Frame(root)
         canvas_frame.pack(fill=tk.BOTH, expand=True)
 
+        # サムネイル一覧（表示するまでは配置しない）
+        self.thumb_frame = tk.Frame(canvas_frame)
+        self.thumb_canvas = tk.Canvas(self.thumb_frame, width=THUMB_PANEL_WIDTH, bg="dim gray", highlightthickness=0)
+        self.thumb_scrollbar = tk.Scrollbar(self.thumb_frame, orient=tk.VERTICAL, command=self.thumb_canvas.yview)
+        self.thumb_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.thumb_canvas.pack(side=tk.LEFT, fill=tk.Y, expand=True)
+        self.thumb_canvas.config(yscrollcommand=self.on_thumb_yscroll)
+        self.thumb_canvas.bind("<Configure>", lambda e: self.schedule_thumb_update())
+        self.thumb_canvas.bind("<Button-1>", self.on_thumb_click)
+        self.thumb_canvas.bind("<MouseWheel>", self.on_thumb_mousewheel)
+
         self.canvas = tk.Canvas(canvas_frame, bg="gray")
         self.canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
 
         # スクロールバー
-        scrollbar_y = tk.Scrollbar(canvas_frame, orient=tk.VERTICAL, command=self.canvas.yview)
-        scrollbar_y.pack(side=tk.RIGHT, fill=tk.Y)
+        self.scrollbar_y = tk.Scrollbar(canvas_frame, orient=tk.VERTICAL, command=self.canvas.yview)
+        self.scrollbar_y.pack(side=tk.RIGHT, fill=tk.Y)
 
-        scrollbar_x = tk.Scrollbar(root, orient=tk.HORIZONTAL, command=self.canvas.xview)
-        scrollbar_x.pack(side=tk.BOTTOM, fill=tk.X)
+        self.scrollbar_x = tk.Scrollbar(root, orient=tk.HORIZONTAL, command=self.canvas.xview)
+        self.scrollbar_x.pack(side=tk.BOTTOM, fill=tk.X)
 
-        self.canvas.config(yscrollcommand=scrollbar_y.set, xscrollcommand=scrollbar_x.set)
+        # スクロール時に表示範囲のタイルを補充する
+        self.canvas.config(yscrollcommand=self.on_yscroll, xscrollcommand=self.on_xscroll)
 
         # ステータスバー（座標表示）
         self.status_bar = tk.Label(root, text="0_0", bd=1, relief=tk.SUNKEN, anchor=tk.W)
         self.status_bar.pack(side=tk.BOTTOM, fill=tk.X)
 
+        # 描画の段階ごとの時間の表示（HUDを表示するまでは配置しない）
+        self.perf_label = tk.Label(root, text="", bd=1, relief=tk.SUNKEN, anchor=tk.W, justify=tk.LEFT,
+                                   font=("Courier", 9), bg="black", fg="light green")
+
         # イベントバインディング
         self.canvas.bind("<Motion>", self.on_mouse_move)
         self.canvas.bind("<Button-1>", self.on_left_click)  # 左クリックで座標コピー
@@ -129,20 +1785,28 @@ class PDFViewer:
         # キーボードショートカット
         self.root.bind("<Left>", lambda e: self.prev_page())
         self.root.bind("<Right>", lambda e: self.next_page())
+        self.root.bind("<Escape>", lambda e: self.cancel_open())
         self.root.bind("<Control-o>", lambda e: self.open_file())
         self.root.bind("<Command-o>", lambda e: self.open_file())  # Mac用
 
+        # 入力の記録（PDFXY_TRACE_RECORD が指定された場合のみ）
+        self.trace_file = None
+        self.trace_start = time.perf_counter()
+        if TRACE_RECORD:
+            self.start_trace(TRACE_RECORD)
+
         self.photo_image = None  # 画像の参照を保持
         self.placeholder_image = None  # プレースホルダー画像の参照を保持
-        self.marker_images = []  # マーカー画像の参照を保持
-        self.marker_positions = []  # マーカーの座標リスト
+        self.marker_sprites = {}  # マーカー画像（大きさ・色ごとに1枚を共有）
+        self.marker_positions = MarkerStore()  # マーカーの座標（正規化座標）
+        self.marker_items = {}  # 表示中のマーカー {マーカー番号: キャンバスID}
+        self.marker_overlay = None  # 大量のマーカーをまとめた画像 (キャンバスID, PhotoImage, 範囲, 状態)
 
         # プレースホルダー画像を読み込む
         self.load_placeholder_image()
 
-        # ドラッグアンドドロップのサポート
-        self.root.drop_target_register(DND_FILES)
-        self.root.dnd_bind('<<Drop>>', self.on_drop)
+        # 起動時間の計測で、最初のページの描画完了を1回だけ報告する
+        self.startup_pending = STARTUP_TIMING
 
         # キャンバスのリサイズイベントをバインド
         self.canvas.bind('<Configure>', self.on_canvas_configure)
@@ -183,7 +1847,11 @@ class PDFViewer:
                 messagebox.showwarning("Warning", "Please drop a PDF, PNG, or JPG file.")
 
     def load_placeholder_image(self):
-        """プレースホルダー画像（hippo_019.png）を読み込む"""
+        """プレースホルダー画像（hippo_019_placeholder.png）を読み込む
+
+        hippo_019.png を300x300に収めて30%の不透明度にした画像を用意してあるので、
+        PILを使わずにTkだけで読み込める（起動時に縮小・透過処理をしない）。
+        """
         try:
             # 実行ファイルの場所を取得（PyInstallerでビルドした場合に対応）
             if getattr(sys, 'frozen', False):
@@ -193,38 +1861,58 @@ class PDFViewer:
                 # 通常のPythonスクリプトとして実行された場合
                 base_path = os.path.dirname(os.path.abspath(__file__))
 
-            image_path = os.path.join(base_path, 'hippo_019.png')
-
-            # 画像を読み込み
-            img = Image.open(image_path)
+            image_path = os.path.join(base_path, 'hippo_019_placeholder.png')
+            self.placeholder_image = tk.PhotoImage(file=image_path)
 
-            # パレット画像の場合、警告を避けるために明示的にRGBAに変換
-            if img.mode == 'P':
-                img = img.convert('RGBA')
-            elif img.mode != 'RGBA':
-                img = img.convert('RGBA')
+        except Exception as e:
+            print(f"Warning: Could not load placeholder image: {str(e)}")
+            self.placeholder_image = None
 
-            # アスペクト比を維持したまま固定サイズ（最大300x300）に収める
-            max_size = (300, 300)
-            img.thumbnail(max_size, Image.Resampling.LANCZOS)
+    def finish_startup(self, file_path=None):
+        """ウィンドウの表示後に残りの初期化を行う
 
-            # 透過処理（アルファ値を50%に設定）
-            alpha = img.split()[3]  # アルファチャンネルを取得
-            alpha = alpha.point(lambda p: int(p * 0.3))  # 30%透過
-            img.putalpha(alpha)
+        Args:
+            file_path: 起動時に開くファイル（コマンドライン引数）
+        """
+        self.enable_drag_and_drop()
 
-            # PhotoImageに変換
-            self.placeholder_image = ImageTk.PhotoImage(img)
+        # ファイルを開くまでの間に重いモジュールを読み込んでおく
+        if file_path is None:
+            threading.Thread(target=preload_modules, daemon=True).start()
+        else:
+            self.load_file(file_path)
 
+    def enable_drag_and_drop(self):
+        """ドラッグアンドドロップのサポートを有効化（tkdndの読み込みはウィンドウの表示後に行う）"""
+        # tkinterdnd2がなくtk.Tkで作成された場合は何もしない（警告はcreate_rootで表示済み）
+        if not hasattr(self.root, 'drop_target_register'):
+            return
+        try:
+            from tkinterdnd2 import DND_FILES, TkinterDnD
+            self.root.TkdndVersion = TkinterDnD._require(self.root)
+            self.root.drop_target_register(DND_FILES)
+            self.root.dnd_bind('<<Drop>>', self.on_drop)
         except Exception as e:
-            print(f"Warning: Could not load placeholder image: {str(e)}")
-            self.placeholder_image = None
+            print(f"Warning: Could not enable drag and drop: {str(e)}")
 
     def on_canvas_configure(self, event):
         """キャンバスがリサイズされた時の処理"""
         # ファイルが開かれていない場合のみプレースホルダーを再描画
         if not self.pdf_document and not self.image_file:
             self.display_placeholder()
+        else:
+            # 表示範囲が広がった分のタイルを描画
+            self.schedule_tile_update()
+
+    def on_xscroll(self, first, last):
+        """X方向スクロール時の処理"""
+        self.scrollbar_x.set(first, last)
+        self.schedule_tile_update()
+
+    def on_yscroll(self, first, last):
+        """Y方向スクロール時の処理"""
+        self.scrollbar_y.set(first, last)
+        self.schedule_tile_update()
 
     def display_placeholder(self):
         """プレースホルダー画像を画面中央に表示"""
@@ -271,38 +1959,66 @@ class PDFViewer:
         try:
             ext = file_path.lower()
 
-            # 既存のファイルをクローズ
+            # 開いている途中のPDFは取り消す
+            self.end_open()
+
+            # 既存のファイルをクローズ（次に開いた時のためにズームを覚えておく）
             if self.pdf_document:
+                self.remember_zoom()
                 self.pdf_document.close()
                 self.pdf_document = None
             self.image_file = None
             self.cached_image = None  # キャッシュをクリア
-            self.marker_positions = []  # マーカーをクリア
+            self.image_pyramid = None
+            self.release_large_image()
+            self.marker_positions.clear()  # マーカーをクリア
+            self.word_indexes.clear()
+            self.snap_indexes.clear()
+            self.page_sizes = None
+            self.clear_thumbnails()
+            self.doc_key = (os.path.abspath(file_path), os.path.getmtime(file_path))
+            self.doc_fingerprint = None
 
             # ファイルの種類で分岐
             if ext.endswith('.pdf'):
                 # PDFモード
                 self.is_image_mode = False
-                self.pdf_document = fitz.open(file_path)
                 self.current_page = 0
-                self.display_page()
-
-                # ページナビゲーションボタンを有効化
-                self.prev_btn.config(state=tk.NORMAL)
-                self.next_btn.config(state=tk.NORMAL)
+                try:
+                    self.doc_fingerprint = file_fingerprint(file_path)
+                except OSError as e:
+                    print(f"Warning: Could not identify file for disk cache: {str(e)}")
+
+                # 以前に修復したPDFは、修復済みのコピーを開く
+                # （内容の識別子が求まらなければ、パスと更新日時で区別する）
+                repair_id = self.doc_fingerprint or hashlib.sha1(repr(self.doc_key).encode()).hexdigest()
+                repaired_path = os.path.join(get_cache_dir(), 'repaired', f"{repair_id}.pdf")
+                if os.path.exists(repaired_path):
+                    # 修復済みのコピーは修復なしで開けるので、そのまま開く
+                    os.utime(repaired_path)
+                    self.open_pdf(repaired_path)
+                else:
+                    # 修復が必要かどうかは開いてみないとわからないため、大きさに関係なく
+                    # 別プロセスで開く（開き終わったら open_pdf() を呼ぶ）
+                    self.start_open(file_path, repaired_path)
 
             elif ext.endswith('.png') or ext.endswith('.jpg') or ext.endswith('.jpeg'):
                 # 画像モード
                 self.is_image_mode = True
                 self.image_file = file_path
                 self.current_page = 0
-
-                # 画像を読み込んでキャッシュ
-                self.cached_image = Image.open(file_path)
-                if self.cached_image.mode == 'P':
-                    self.cached_image = self.cached_image.convert('RGBA')
-                elif self.cached_image.mode != 'RGB' and self.cached_image.mode != 'RGBA':
-                    self.cached_image = self.cached_image.convert('RGB')
+                self.page_layout = None
+
+                # 画像を読み込んでキャッシュ（この時点ではヘッダーだけを読む）
+                # 大きさは表示用のモードに変換した後のもので判定する（パレット画像は4倍になる）
+                img = Image.open(file_path)
+                mode = display_image_mode(img.mode)
+                if img.width * img.height * bytes_per_pixel(mode) > LARGE_IMAGE_MB * 1024 * 1024:
+                    # 巨大な画像はメモリ使用量を抑えて読み込む
+                    self.load_large_image(file_path, img)
+                else:
+                    self.cached_image = img if img.mode == mode else img.convert(mode)
+                    self.image_pyramid = ImagePyramid(self.cached_image)
 
                 self.display_page()
 
@@ -318,147 +2034,1246 @@ class PDFViewer:
             filename = os.path.basename(file_path)
             self.root.title(f"PDF XY Viewer - {filename}")
 
+            # 再生時に同じファイル・ウィンドウの大きさ・ズームから始められるように記録
+            self.write_trace({'event': '<<Load>>', 'file': os.path.abspath(file_path),
+                              'width': self.root.winfo_width(), 'height': self.root.winfo_height(),
+                              'zoom': self.zoom, 'continuous': self.continuous.get()})
+
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to open file: {str(e)}")
+
+    def open_pdf(self, file_path):
+        """PDFを開いて最初のページを表示
+
+        ファイルのパスを渡して開くので、MuPDFは必要な部分だけをファイルから読む
+        （ファイル全体をメモリに読み込まない）。
+        """
+        self.pdf_document = fitz.open(file_path)
+        if self.pdf_document.needs_pass:
+            self.pdf_document.close()
+            self.pdf_document = None
+            raise ValueError(PASSWORD_ERROR)
+        self.doc_key = (os.path.abspath(file_path), os.path.getmtime(file_path))
+
+        # 前回このファイルを閉じた時のズームで開く
+        saved_zoom = self.load_saved_zooms().get(self.doc_fingerprint)
+        if saved_zoom is not None:
+            self.zoom = saved_zoom
+        self.page_layout = PageLayout(self.get_page_sizes()) if self.continuous.get() else None
+        self.prepare_thumbnails()
+        self.display_page()
+
+        # ページナビゲーションボタンを有効化
+        self.prev_btn.config(state=tk.NORMAL)
+        self.next_btn.config(state=tk.NORMAL)
+
+    def start_open(self, file_path, repaired_path):
+        """PDFを別プロセスで開き始める（UIは止めずに進捗を表示し、キャンセルできる）
+
+        Args:
+            file_path: 開くPDF
+            repaired_path: 修復が必要だった場合に修復済みのコピーを保存するファイル
+        """
+        receiver, sender = multiprocessing.Pipe(duplex=False)
+        process = multiprocessing.Process(target=open_document_process, args=(file_path, repaired_path, sender),
+                                          daemon=True)
+        process.start()
+        # 子プロセスが異常終了した時に受信側でEOFを検出できるよう、送信側はこちらでは閉じる
+        sender.close()
+
+        self.open_job = (process, receiver, file_path, repaired_path, time.perf_counter())
+        self.open_stage = "Opening"
+        self.page_label.config(text="Opening...")
+        self.poll_open(self.open_job)
+
+    def poll_open(self, job):
+        """別プロセスで開いているPDFの進捗を確認し、開き終わっていれば表示する"""
+        if job is not self.open_job:
+            return  # キャンセルしたか、別のファイルを開いた
+        _, receiver, file_path, repaired_path, start_time = job
+
+        try:
+            while receiver.poll():
+                kind, value = receiver.recv()
+                if kind == 'pages':
+                    # ページ数はわかった時点で表示する
+                    self.page_label.config(text=f"Opening... ({value} pages)")
+                elif kind == 'stage':
+                    self.open_stage = value
+                elif kind == 'done':
+                    self.end_open()
+                    if value == repaired_path:
+                        trim_repaired_copies(os.path.dirname(repaired_path))
+                    self.open_pdf(value)
+                    return
+                elif kind == 'error':
+                    self.end_open()
+                    messagebox.showerror("Error", f"Failed to open file: {value}")
+                    return
+        except (EOFError, OSError):
+            # MuPDFが異常終了した場合など
+            self.end_open()
+            messagebox.showerror("Error", f"Failed to open file: {os.path.basename(file_path)} could not be read")
+            return
+        except Exception as e:
+            self.end_open()
+            messagebox.showerror("Error", f"Failed to open file: {str(e)}")
+            return
+
+        # すぐに開けるPDFでは進捗を表示しない
+        elapsed = time.perf_counter() - start_time
+        if elapsed >= OPEN_PROGRESS_DELAY:
+            if not self.open_progress_shown:
+                self.open_progress_shown = True
+                self.open_progress.pack(side=tk.LEFT, padx=(20, 5))
+                self.open_progress.start()
+                self.open_cancel_btn.pack(side=tk.LEFT, padx=5)
+            self.status_bar.config(text=f"{self.open_stage}... {elapsed:.0f}s (Esc to cancel)", fg="blue")
+        self.root.after(OPEN_POLL_MS, self.poll_open, job)
+
+    def end_open(self):
+        """PDFを開いているプロセスを終了し、進捗表示を片付ける"""
+        if not self.stop_open():
+            return
+        if self.open_progress_shown:
+            self.open_progress_shown = False
+            self.open_progress.stop()
+            self.open_progress.pack_forget()
+            self.open_cancel_btn.pack_forget()
+            self.status_bar.config(text="0_0", fg="black")
+
+    def stop_open(self):
+        """PDFを開いているプロセスを終了する（ウィジェットには触らないので終了時にも呼べる）
+
+        Returns:
+            bool: 開いている途中のPDFがあったかどうか
+        """
+        if self.open_job is None:
+            return False
+        process, receiver, _, _, _ = self.open_job
+        self.open_job = None
+        receiver.close()
+        if process.is_alive():
+            process.terminate()
+        process.join(1)
+        return True
+
+    def cancel_open(self):
+        """別プロセスで開いているPDFを開くのをやめる"""
+        if self.open_job is None:
+            return
+        self.end_open()
+        self.page_label.config(text="No PDF loaded")
+        self.root.title("PDF XY Viewer")
+        self.display_placeholder()
+
+    def load_large_image(self, file_path, img):
+        """巨大な画像を、常駐メモリを上限内に抑えて読み込む
+
+        JPEGは縮小デコード（draft）ですぐに表示しておき、元の解像度の画像は
+        メモリマップしたファイルにバックグラウンドで展開してから差し替える。
+        """
+        self.image_store = MappedImageStore()
+
+        if img.format == 'JPEG':
+            full_size = img.size
+            img.draft('RGB', (img.width // 8, img.height // 8))
+            self.cached_image = img.convert('RGB')
+            self.image_pyramid = ImagePyramid(self.cached_image, base_scale=self.cached_image.width / full_size[0],
+                                              full_size=full_size)
+            # 縮小版のタイルを元の解像度のタイルと区別してキャッシュする
+            self.doc_key = self.doc_key + ('draft',)
+
+        self.status_bar.config(text="Loading large image...", fg="blue")
+        if self.decode_executor is None:
+            self.decode_executor = ThreadPoolExecutor(max_workers=1)
+        self.large_image_future = self.decode_executor.submit(load_mapped_image, file_path, self.image_store)
+        self.root.after(100, self.poll_large_image, self.large_image_future)
+
+    def poll_large_image(self, future):
+        """巨大画像の読み込み完了を確認し、完了していれば表示を差し替える"""
+        if future is not self.large_image_future:
+            return  # 別のファイルを開いた
+        if not future.done():
+            self.root.after(100, self.poll_large_image, future)
+            return
+
+        self.large_image_future = None
+        try:
+            pyramid = future.result()
         except Exception as e:
             messagebox.showerror("Error", f"Failed to open file: {str(e)}")
+            self.close_failed_image()
+            return
+
+        self.image_pyramid = pyramid
+        self.cached_image = pyramid.levels[0]
+        self.doc_key = self.doc_key[:2]
+        self.status_bar.config(text="0_0", fg="black")
+        self.display_page()
+
+    def close_failed_image(self):
+        """展開できなかった画像を閉じ、ファイルを開く前の表示に戻す（縮小版も破棄する）"""
+        self.release_large_image()
+        self.is_image_mode = False
+        self.image_file = None
+        self.cached_image = None
+        self.image_pyramid = None
+        self.tile_view = None
+        self.doc_key = None
+        self.clear_markers_btn.config(state=tk.DISABLED)
+        self.invert_btn.config(state=tk.DISABLED)
+        self.status_bar.config(text="0_0", fg="black")
+        self.page_label.config(text="No PDF loaded")
+        self.root.title("PDF XY Viewer")
+        self.display_placeholder()
+
+    def release_large_image(self):
+        """巨大画像の展開先を解放"""
+        self.large_image_future = None
+        if self.image_store is not None:
+            self.image_store.close()
+            self.image_store = None
 
     def display_page(self, quality='high'):
         """現在のページを表示（PDF/画像対応）
 
+        ページ全体をレンダリングせず、表示範囲に重なるタイルだけを描画する。
+        連続スクロールモードでは、全ページを縦に並べた領域のうち表示範囲に重なる部分だけを描画する。
+
         Args:
             quality: 'low' (高速・低品質) or 'high' (低速・高品質)
         """
         if not self.pdf_document and not self.image_file:
             return
 
+        start = time.perf_counter()
         try:
-            # マーカー画像の参照をクリア（座標は保持）
-            self.marker_images = []
-
             if self.is_image_mode:
                 # 画像モード（キャッシュから取得）
-                if self.cached_image is None:
+                if self.image_pyramid is None:
+                    # 巨大画像の展開中は何も表示しない
+                    self.canvas.delete("all")
+                    self.tile_items = {}
+                    self.page_bg_items = {}
+                    self.marker_items = {}
+                    self.marker_overlay = None
+                    self.zoom_preview = None
+                    self.tile_view = None
+                    self.page_label.config(text="Loading...")
                     return
 
-                # ズームを適用
-                original_size = self.cached_image.size
-                new_size = (int(original_size[0] * self.zoom), int(original_size[1] * self.zoom))
+                # ページ情報を更新（画像は1ページのみ）
+                self.page_label.config(text="Image")
 
-                # 品質に応じてリサンプリング方法を切り替え
-                if quality == 'low':
-                    img = self.cached_image.resize(new_size, Image.Resampling.BILINEAR)
-                else:
-                    img = self.cached_image.resize(new_size, Image.Resampling.LANCZOS)
+            else:
+                # ページ情報とページナビゲーションボタンの状態を更新
+                self.update_page_label()
+
+            # ズーム適用後の表示領域の大きさを計算（連続スクロールでは全ページ分）
+            width, height = self.get_content_pixel_size()
+            self.page_pixel_size = (width, height)
+
+            # 座標スケールを自動調整（X座標が3桁以内になるように）
+            self.auto_adjust_coord_scale(width)
+
+            # 前の状態のレンダリングジョブを取り消す（先読みは schedule_prefetch で出し直す）
+            self.pdf_worker.cancel_all()
+            self.image_worker.cancel_all()
+
+            # 連続スクロールではスクロールでページが変わってもタイルを配置し直さない
+            shown_page = -1 if self.page_layout is not None else self.current_page
+            tile_view = (self.doc_key, shown_page, round(self.zoom, 4))
+            if tile_view == self.tile_view:
+                # 品質や反転だけが変わった場合は、新しいタイルが届くまで古いタイルを表示しておく
+                self.canvas.delete("page_bg", "marker")
+                self.stale_tiles = set(self.tile_items)
+            elif self.zoom_preview is not None and self.tile_view is not None and tile_view[:2] == self.tile_view[:2]:
+                self.bump_render_generation()
+                # ズームのプレビューは新しいタイルが届くまで残しておく
+                self.canvas.delete("tile", "page_bg", "marker")
+                self.tile_items = {}
+                self.stale_tiles = set()
+            else:
+                # キャンバスをクリア
+                self.bump_render_generation()
+                self.canvas.delete("all")
+                self.tile_items = {}
+                self.stale_tiles = set()
+                self.zoom_preview = None
+            self.tile_view = tile_view
+            self.tile_quality = quality
+            self.page_bg_items = {}
+
+            # スクロール領域を更新（ページ全体の大きさ）
+            self.canvas.config(scrollregion=(0, 0, width, height))
+
+            # 表示範囲のタイルとマーカーを描画（マーカーは座標を保持したまま配置し直す）
+            self.marker_items = {}
+            self.marker_overlay = None
+            self.update_tiles()
+
+            # タイルが揃うまでの間に見せるページ全体の粗い画像
+            if self.zoom_preview is None and not self.visible_tiles <= self.tile_items.keys():
+                self.request_coarse_pass()
+
+            # 高品質表示の時だけ前後のページを先読み（ズーム操作中は行わない）
+            if quality == 'high':
+                self.schedule_prefetch()
+                self.request_word_index()
+                self.request_snap_index()
+
+            # 取り消したサムネイルのジョブを出し直す
+            self.schedule_thumb_update()
+
+            self.perf.record('display_page', time.perf_counter() - start, (width, height),
+                             page=self.current_page, zoom=round(self.zoom, 4), quality=quality)
 
-                # 座標スケールを自動調整（X座標が3桁以内になるように）
-                self.auto_adjust_coord_scale(new_size[0])
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to display: {str(e)}")
 
-                # グレースケール反転処理
-                if self.invert_colors:
-                    img = img.convert('L')  # グレースケールに変換
-                    img = ImageOps.invert(img)  # 反転
+    def update_page_label(self):
+        """ページ番号の表示、ページナビゲーションボタンの状態、サムネイルの選択を更新"""
+        self.page_label.config(text=f"Page {self.current_page + 1} / {len(self.pdf_document)}")
+        self.prev_btn.config(state=tk.NORMAL if self.current_page > 0 else tk.DISABLED)
+        self.next_btn.config(state=tk.NORMAL if self.current_page < len(self.pdf_document) - 1 else tk.DISABLED)
+        self.highlight_thumbnail()
 
-                # PIL ImageをTkinter PhotoImageに変換
-                self.photo_image = ImageTk.PhotoImage(img)
+    def get_page_pixel_size(self, page_index=None):
+        """現在のズームでのページサイズ（ピクセル）を返す
 
-                # ページ情報を更新（画像は1ページのみ）
-                self.page_label.config(text="Image")
+        Args:
+            page_index: ページ番号（省略時は現在のページ）
+        """
+        if self.is_image_mode:
+            original_size = self.image_pyramid.size
+            return int(original_size[0] * self.zoom), int(original_size[1] * self.zoom)
+
+        if page_index is None:
+            page_index = self.current_page
+        if self.page_layout is not None:
+            return self.page_layout.page_pixel_size(page_index, self.zoom)
+        page = self.pdf_document[page_index]
+        irect = (page.rect * fitz.Matrix(self.zoom, self.zoom)).irect
+        return irect.width, irect.height
+
+    def get_content_pixel_size(self):
+        """現在のズームでの表示領域の大きさ（連続スクロールでは全ページを並べた大きさ）"""
+        if self.page_layout is not None:
+            return self.page_layout.pixel_size(self.zoom)
+        return self.get_page_pixel_size()
+
+    def page_origin(self, page_index):
+        """ページの左上のキャンバス座標（連続スクロール以外では常に (0, 0)）"""
+        if self.page_layout is None:
+            return 0, 0
+        return self.page_layout.origin(page_index, self.zoom)
+
+    def pages_in_view(self, margin=TILE_MARGIN):
+        """表示範囲（＋余白）に重なるページ番号のリスト"""
+        if self.page_layout is None:
+            return [self.current_page]
+        view_y0 = self.canvas.canvasy(0) - margin
+        view_y1 = self.canvas.canvasy(max(self.canvas.winfo_height(), 1)) + margin
+        return self.page_layout.pages_between(view_y0 / self.zoom, view_y1 / self.zoom)
+
+    def canvas_to_page(self, x, y):
+        """キャンバス座標をページ内の座標に変換
+
+        Returns:
+            (ページ番号, x, y) 座標はページの左上を原点としたズーム適用後のピクセル座標
+        """
+        if self.page_layout is None:
+            return self.current_page, x, y
+        page_index = self.page_layout.page_at(y / self.zoom)
+        origin_x, origin_y = self.page_origin(page_index)
+        return page_index, x - origin_x, y - origin_y
+
+    def schedule_tile_update(self):
+        """タイル更新を予約（連続したスクロールイベントをまとめる）"""
+        if self.tile_update_timer is None:
+            self.tile_update_timer = self.root.after_idle(self.update_tiles)
+
+    def update_tiles(self):
+        """表示範囲（＋余白）に重なるタイルを描画し、範囲外のタイルを破棄"""
+        self.tile_update_timer = None
+        start = time.perf_counter()
+        if not self.pdf_document and not self.image_file:
+            return
 
+        width, height = self.page_pixel_size
+        if width <= 0 or height <= 0:
+            return
+
+        # 連続スクロールでは表示範囲の上端のページを現在のページとする
+        # （ページ送りで先頭までスクロールしたページが現在のページになるよう、数ピクセル下を見る）
+        if self.page_layout is not None:
+            top_page = self.page_layout.page_at((self.canvas.canvasy(0) + 2) / self.zoom)
+            if top_page != self.current_page:
+                self.page_direction = 1 if top_page > self.current_page else -1
+                self.current_page = top_page
+                self.update_page_label()
+                self.request_word_index()
+                self.request_snap_index()
+
+        self.update_page_backgrounds()
+        self.update_markers()
+
+        if self.tile_view is None or self.tile_view[2] != round(self.zoom, 4):
+            # ズームのプレビュー中は、確定した倍率で display_page() が呼ばれるまで描画しない
+            return
+
+        needed = self.tiles_in_view()
+        self.visible_tiles = needed
+
+        # 範囲外のタイルを破棄（メモリは表示範囲の大きさで頭打ちになる）
+        for key in list(self.tile_items):
+            if key not in needed:
+                item, _, _ = self.tile_items.pop(key)
+                self.canvas.delete(item)
+                self.stale_tiles.discard(key)
+
+        # 範囲外になったタイルのレンダリング待ちを取り消す（他のページの先読みは残す）
+        prefix = self.tile_cache_key(0, 0, 0, self.tile_quality)[:4]
+        continuous = self.page_layout is not None
+        current_page = self.current_page
+
+        def is_shown(key):
+            return key[:4] == prefix and (continuous or key[4] == current_page)
+
+        worker = self.image_worker if self.is_image_mode else self.pdf_worker
+        worker.discard(lambda key: not is_shown(key) or key[4:] in needed)
+
+        # 実行中のジョブに範囲外のタイルがあれば、世代を進めて打ち切る
+        # （まだ必要なタイルが巻き添えで打ち切られた場合は、結果を受け取った時に出し直す）
+        if not self.is_image_mode and any(is_shown(key) and key[4:] not in needed
+                                          for key in self.pdf_worker.in_flight.values()):
+            self.bump_render_generation()
+
+        missing = [key for key in needed if key not in self.tile_items or key in self.stale_tiles]
+        if not missing:
+            self.drop_zoom_preview()
+            return
+
+        # 画面中央に近いタイルから順に処理する
+        center_x = self.canvas.canvasx(self.canvas.winfo_width() / 2)
+        center_y = self.canvas.canvasy(self.canvas.winfo_height() / 2)
+        origins = {page_index: self.page_origin(page_index) for page_index in {key[0] for key in missing}}
+
+        def distance(key):
+            origin_x, origin_y = origins[key[0]]
+            return ((origin_x + (key[1] + 0.5) * TILE_SIZE - center_x) ** 2
+                    + (origin_y + (key[2] + 0.5) * TILE_SIZE - center_y) ** 2)
+        missing.sort(key=distance)
+
+        # 実際に見えているタイルを先に、余白のタイルを後に描画する
+        on_screen = self.tiles_in_view(margin=0)
+
+        for tile in missing:
+            cache_key = self.tile_cache_key(*tile, self.tile_quality)
+            priority = 0 if tile in on_screen else 1
+            if worker.is_queued(cache_key):
+                # 先読みで待機中のジョブは優先度を上げる
+                self.submit_tile(*tile, cache_key, priority=priority)
+                continue
+
+            # キャッシュにあれば再レンダリングしない（メモリになければディスクを探す）
+            img = self.render_cache.get(cache_key)
+            if img is None:
+                disk_key = self.disk_tile_key(cache_key)
+                if disk_key is not None:
+                    load_start = time.perf_counter()
+                    img = self.disk_cache.get(disk_key)
+                    if img is not None:
+                        self.perf.record('disk_load', time.perf_counter() - load_start, img.size)
+                        self.render_cache.put(cache_key, img)
+            if img is not None:
+                self.place_tile(*tile, img)
             else:
-                # PDFモード
-                page = self.pdf_document[self.current_page]
+                self.submit_tile(*tile, cache_key, priority=priority)
 
-                # 品質に応じてレンダリング解像度を変更
-                if quality == 'low':
-                    # 低品質モード: 解像度を70%に下げて高速化
-                    zoom_factor = self.zoom * 0.7
-                else:
-                    # 高品質モード: 通常の解像度
-                    zoom_factor = self.zoom
+        self.schedule_render_poll()
+        self.perf.record('update_tiles', time.perf_counter() - start, missing=len(missing))
+
+    def update_page_backgrounds(self):
+        """表示範囲のページに背景を敷き、範囲外のページの背景を破棄
+
+        PDFはタイル描画前でもページの範囲がわかるように背景を敷く。
+        """
+        if self.is_image_mode:
+            return
+        pages = self.pages_in_view()
+        for page_index in [p for p in self.page_bg_items if p not in pages]:
+            self.canvas.delete(self.page_bg_items.pop(page_index))
+
+        bg_color = "black" if self.invert_colors else "white"
+        for page_index in pages:
+            if page_index in self.page_bg_items:
+                continue
+            x0, y0 = self.page_origin(page_index)
+            width, height = self.get_page_pixel_size(page_index)
+            item = self.canvas.create_rectangle(x0, y0, x0 + width, y0 + height, fill=bg_color, outline="",
+                                                tags="page_bg")
+            self.canvas.tag_lower(item)
+            self.page_bg_items[page_index] = item
+
+    def page_tiles_in_view(self, page_size, origin=(0, 0), margin=TILE_MARGIN):
+        """1ページのうち表示範囲（＋余白）に重なるタイルの集合を返す
 
-                # ページをPixmapにレンダリング（ズームを適用）
-                mat = fitz.Matrix(zoom_factor, zoom_factor)
-                pix = page.get_pixmap(matrix=mat, alpha=False)
+        Args:
+            page_size: ズーム適用後のページサイズ（ピクセル）
+            origin: ページの左上のキャンバス座標
+            margin: 表示範囲の周りに加える余白（ピクセル）
+        """
+        width, height = page_size
+        origin_x, origin_y = origin
+
+        # 表示範囲（ページ内の座標）を取得し、余白を加える
+        view_x0 = self.canvas.canvasx(0) - margin - origin_x
+        view_y0 = self.canvas.canvasy(0) - margin - origin_y
+        view_x1 = self.canvas.canvasx(max(self.canvas.winfo_width(), 1)) + margin - origin_x
+        view_y1 = self.canvas.canvasy(max(self.canvas.winfo_height(), 1)) + margin - origin_y
+
+        # 必要なタイルの範囲
+        tx0 = max(0, int(view_x0 // TILE_SIZE))
+        ty0 = max(0, int(view_y0 // TILE_SIZE))
+        tx1 = min((width - 1) // TILE_SIZE, int(view_x1 // TILE_SIZE))
+        ty1 = min((height - 1) // TILE_SIZE, int(view_y1 // TILE_SIZE))
+        return {(tx, ty) for tx in range(tx0, tx1 + 1) for ty in range(ty0, ty1 + 1)}
+
+    def tiles_in_view(self, margin=TILE_MARGIN):
+        """表示範囲（＋余白）に重なるタイルの集合を返す
+
+        Returns:
+            {(ページ番号, tx, ty)}
+        """
+        tiles = set()
+        for page_index in self.pages_in_view(margin):
+            page_size = self.get_page_pixel_size(page_index)
+            for tx, ty in self.page_tiles_in_view(page_size, self.page_origin(page_index), margin):
+                tiles.add((page_index, tx, ty))
+        return tiles
+
+    def tile_box(self, tx, ty, page_size):
+        """タイルの範囲（ページ内のズーム適用後のピクセル座標）
+
+        Args:
+            page_size: ページサイズ
+        """
+        width, height = page_size
+        x0 = tx * TILE_SIZE
+        y0 = ty * TILE_SIZE
+        return x0, y0, min(x0 + TILE_SIZE, width), min(y0 + TILE_SIZE, height)
 
-                # 座標スケールを自動調整（X座標が3桁以内になるように）
-                self.auto_adjust_coord_scale(int(pix.width / zoom_factor * self.zoom))
+    def submit_tile(self, page_index, tx, ty, cache_key, page_size=None, priority=0, prefetch=False):
+        """タイルのレンダリングをバックグラウンドに依頼
 
-                # PixmapをPIL Imageに変換
-                img_data = pix.tobytes("ppm")
-                img = Image.open(io.BytesIO(img_data))
+        Args:
+            page_size: ページサイズ（省略時は page_index のページの大きさ）
+            priority: 優先度（見えているタイルは0、余白のタイルは1、先読みは2以上）
+            prefetch: 先読みかどうか（先読みは表示が変わっても打ち切らずにキャッシュに入れる）
+        """
+        box = self.tile_box(tx, ty, page_size or self.get_page_pixel_size(page_index))
+        if self.is_image_mode:
+            self.image_worker.submit(cache_key, render_image_tile_job, self.image_pyramid,
+                                     self.zoom, box, self.tile_quality, self.invert_colors,
+                                     priority=priority)
+        else:
+            disk_key = self.disk_tile_key(cache_key)
+            disk_path = self.disk_cache.path(disk_key) if disk_key is not None else None
+            self.pdf_worker.submit(cache_key, render_pdf_tile_job, self.doc_key, page_index,
+                                   self.zoom, box, self.tile_quality, self.invert_colors,
+                                   disk_path=disk_path, priority=priority, cancellable=not prefetch)
+
+    def schedule_prefetch(self):
+        """前後のページを現在のズーム・反転状態でバックグラウンドに先読み
+
+        進行方向のページを優先し、メモリの上限に達したらそれ以上は先読みしない。
+        進行方向が変わったりズームが変わった場合は、古い先読みを取り消して出し直す。
+        連続スクロールでは表示範囲の余白のタイルが先読みを兼ねるので行わない。
+        """
+        if self.is_image_mode or not self.pdf_document or self.page_layout is not None:
+            return
 
-                # 低品質モードでレンダリングした場合、実際のズームサイズにリサイズ
-                if quality == 'low':
-                    target_size = (int(pix.width / 0.7), int(pix.height / 0.7))
-                    img = img.resize(target_size, Image.Resampling.BILINEAR)
+        # 待機中の先読みを一旦取り消す（実行中のものはキャッシュに入る）
+        # 表示中のページのタイルや、単語・図形の抽出などタイル以外のジョブは残す
+        prefix = self.tile_cache_key(0, 0, 0, self.tile_quality)[:4]
+        current_page = self.current_page
+        self.pdf_worker.discard(lambda key: key[0] != self.doc_key or (key[:4] == prefix and key[4] == current_page))
+
+        # 進行方向を先に、逆方向を後に並べる
+        pages = [self.current_page + self.page_direction * i for i in range(1, PREFETCH_PAGES + 1)]
+        pages += [self.current_page - self.page_direction * i for i in range(1, PREFETCH_PAGES_BEHIND + 1)]
+        pages = [p for p in pages if 0 <= p < len(self.pdf_document)]
+
+        # 先読みでキャッシュの表示中タイルを追い出さないよう、上限はキャッシュの半分まで
+        budget = min(PREFETCH_MB * 1024 * 1024, self.render_cache.max_bytes // 2)
+        # 反転表示のタイルはL、通常はRGB（PILでは1ピクセル4バイト）
+        tile_bpp = bytes_per_pixel('L' if self.invert_colors else 'RGB')
+        used = 0
+        for priority, page_index in enumerate(pages, start=2):
+            page_size = self.get_page_pixel_size(page_index)
+
+            # ページを開いた時に見える範囲（現在のスクロール位置）のタイルを先読み
+            for tx, ty in self.page_tiles_in_view(page_size):
+                x0, y0, x1, y1 = self.tile_box(tx, ty, page_size)
+                used += (x1 - x0) * (y1 - y0) * tile_bpp
+                if used > budget:
+                    self.schedule_render_poll()
+                    return
 
-                # グレースケール反転処理
-                if self.invert_colors:
-                    img = img.convert('L')  # グレースケールに変換
-                    img = ImageOps.invert(img)  # 反転
+                cache_key = self.tile_cache_key(page_index, tx, ty, self.tile_quality)
+                if cache_key in self.render_cache.entries:
+                    continue
+                disk_key = self.disk_tile_key(cache_key)
+                if disk_key is not None and self.disk_cache.contains(disk_key):
+                    continue
+                self.submit_tile(page_index, tx, ty, cache_key, page_size, priority=priority, prefetch=True)
+
+        self.schedule_render_poll()
+
+    def place_tile(self, page_index, tx, ty, img):
+        """レンダリング済みのタイルをキャンバスに配置"""
+        tile = (page_index, tx, ty)
+        old = self.tile_items.pop(tile, None)
+        if old is not None:
+            self.canvas.delete(old[0])
+        self.stale_tiles.discard(tile)
+
+        origin_x, origin_y = self.page_origin(page_index)
+        start = time.perf_counter()
+        photo = ImageTk.PhotoImage(img)
+        lap = time.perf_counter()
+        item = self.canvas.create_image(origin_x + tx * TILE_SIZE, origin_y + ty * TILE_SIZE, anchor=tk.NW,
+                                        image=photo, tags="tile")
+        self.tile_items[tile] = (item, photo, img)
+
+        # タイルはマーカーの下に重ねる
+        self.canvas.tag_raise("marker")
+        self.perf.record('photo', lap - start, img.size, page=page_index)
+        self.perf.record('canvas', time.perf_counter() - lap, img.size, page=page_index)
+
+        # 表示範囲のタイルが揃ったらズームのプレビューを消す
+        if self.zoom_preview is not None and self.visible_tiles <= self.tile_items.keys() and not self.stale_tiles:
+            self.drop_zoom_preview()
+
+        if self.startup_pending and self.tiles_in_view(margin=0) <= self.tile_items.keys():
+            self.startup_pending = False
+            report_startup("first page rendered")
+
+    def show_zoom_preview(self, old_zoom, anchor):
+        """ズーム前のタイルを拡大縮小して新しいズームの表示を即座に作り、カーソル位置を固定する
 
-                # PIL ImageをTkinter PhotoImageに変換
-                self.photo_image = ImageTk.PhotoImage(img)
+        Args:
+            old_zoom: ズーム前の倍率
+            anchor: 位置を固定する点（ウィンドウ座標）
+        """
+        if self.is_image_mode and self.image_pyramid is None:
+            return
 
-                # ページ情報を更新
-                self.page_label.config(text=f"Page {self.current_page + 1} / {len(self.pdf_document)}")
+        if self.zoom_preview is None:
+            # 連続したズームでは、最初のズーム前のタイルを元に拡大縮小し続ける
+            images = {}
+            for (page_index, tx, ty), value in self.tile_items.items():
+                if (page_index, tx, ty) in self.stale_tiles:
+                    continue
+                origin_x, origin_y = self.page_origin(page_index)
+                images[(origin_x + tx * TILE_SIZE, origin_y + ty * TILE_SIZE)] = value[2]
+            self.zoom_preview = (self.tile_view[2] if self.tile_view else old_zoom, images, None, None)
+        base_zoom, images = self.zoom_preview[:2]
+
+        # カーソル下のページ上の点（正規化座標）
+        anchor_x, anchor_y = anchor
+        page_x = self.canvas.canvasx(anchor_x) / old_zoom
+        page_y = self.canvas.canvasy(anchor_y) / old_zoom
+
+        # 新しいページサイズでスクロール領域を更新し、その点がカーソル下に来るようにスクロール
+        width, height = self.get_content_pixel_size()
+        self.page_pixel_size = (width, height)
+        self.canvas.config(scrollregion=(0, 0, width, height))
+        self.canvas.xview_moveto((page_x * self.zoom - anchor_x) / width)
+        self.canvas.yview_moveto((page_y * self.zoom - anchor_y) / height)
+
+        # 古いタイルを消して、プレビュー画像を1枚だけ配置
+        self.canvas.delete("tile", "page_bg", "marker", "preview")
+        self.tile_items = {}
+        self.stale_tiles = set()
+        self.page_bg_items = {}
+        self.marker_items = {}
+        self.marker_overlay = None
+
+        self.update_page_backgrounds()
+        self.place_preview(base_zoom, images)
+        self.update_markers()
+
+    def place_preview(self, base_zoom, images):
+        """手元の画像を現在のズームに拡大縮小し、表示範囲にプレビューとして配置
 
-                # ページナビゲーションボタンの状態を更新
-                self.prev_btn.config(state=tk.NORMAL if self.current_page > 0 else tk.DISABLED)
-                self.next_btn.config(state=tk.NORMAL if self.current_page < len(self.pdf_document) - 1 else tk.DISABLED)
+        Args:
+            base_zoom: 画像のズーム倍率
+            images: 画像 {(左端, 上端): Image} 位置はズーム base_zoom でのキャンバス座標
+        """
+        width, height = self.page_pixel_size
+        view_x0 = max(0, int(self.canvas.canvasx(0)))
+        view_y0 = max(0, int(self.canvas.canvasy(0)))
+        view_x1 = min(width, int(self.canvas.canvasx(max(self.canvas.winfo_width(), 1))))
+        view_y1 = min(height, int(self.canvas.canvasy(max(self.canvas.winfo_height(), 1))))
+
+        self.canvas.delete("preview")
+        item = photo = None
+        if images and view_x1 > view_x0 and view_y1 > view_y0:
+            start = time.perf_counter()
+            img = render_zoom_preview(images, base_zoom, self.zoom, (view_x0, view_y0, view_x1, view_y1))
+            photo = ImageTk.PhotoImage(img)
+            item = self.canvas.create_image(view_x0, view_y0, anchor=tk.NW, image=photo, tags="preview")
+            self.perf.record('preview', time.perf_counter() - start, img.size, zoom=round(self.zoom, 4))
+        self.zoom_preview = (base_zoom, images, item, photo)
+
+        # 背景 → プレビュー → タイル → マーカーの順に重ねる
+        self.canvas.tag_lower("preview")
+        self.canvas.tag_lower("page_bg")
+
+    def drop_zoom_preview(self):
+        """ズームのプレビューを消す"""
+        if self.zoom_preview is not None:
+            self.canvas.delete("preview")
+            self.zoom_preview = None
+
+    def schedule_render_poll(self):
+        """レンダリング結果の確認を予約"""
+        if self.render_poll_timer is None and (self.pdf_worker.busy() or self.image_worker.busy()):
+            self.render_poll_timer = self.root.after(RENDER_POLL_MS, self.poll_render_results)
+
+    def poll_render_results(self):
+        """バックグラウンドで完了したタイルを受け取って表示"""
+        self.render_poll_timer = None
+
+        for key, result, error in self.pdf_worker.poll():
+            if key[0] == 'words':
+                self.on_word_index_built(key, result, error)
+                continue
+            if key[0] == 'snap':
+                self.on_snap_index_built(key, result, error)
+                continue
+            if key[0] == 'thumb':
+                self.on_thumbnail_rendered(key, result, error)
+                continue
+            if error is not None:
+                print(f"Warning: Could not render tile: {str(error)}")
+                continue
+            if result is None:
+                # 表示が変わって打ち切られた（まだ必要なタイルや粗い画像なら出し直す）
+                if key[0] != 'coarse':
+                    self.schedule_tile_update()
+                elif key in self.coarse_requests:
+                    self.submit_coarse_pass(key)
+                continue
+            mode, size, data, timings, saved = result
+            if key[0] == 'coarse':
+                self.perf.record_all(timings, page=key[2], zoom=key[3], coarse=True)
+                self.on_coarse_rendered(key, Image.frombytes(mode, size, data))
+                continue
+            self.perf.record_all(timings, page=key[4], zoom=key[1], quality=key[2])
+            self.on_tile_rendered(key, Image.frombytes(mode, size, data), saved)
+
+        for key, result, error in self.image_worker.poll():
+            if error is not None:
+                print(f"Warning: Could not render tile: {str(error)}")
+                continue
+            img, timings = result
+            self.perf.record_all(timings, zoom=key[1], quality=key[2])
+            self.on_tile_rendered(key, img)
+
+        self.schedule_render_poll()
+
+    def on_tile_rendered(self, cache_key, img, saved=0):
+        """タイルのレンダリング完了時の処理
 
-            # キャンバスをクリア
-            self.canvas.delete("all")
+        Args:
+            saved: ワーカーがディスクキャッシュに保存したバイト数（保存しなかった・失敗した時は0）
+        """
+        # 取り消し後に届いた結果も、キャッシュには入れておく
+        self.render_cache.put(cache_key, img)
+        if saved and self.disk_cache is not None:
+            self.disk_cache.added(saved)
 
-            # キャンバスに画像を表示
-            self.canvas.create_image(0, 0, anchor=tk.NW, image=self.photo_image)
+        # 現在の表示状態のタイルなら配置
+        if cache_key[:4] != self.tile_cache_key(0, 0, 0, self.tile_quality)[:4]:
+            return
+        tile = cache_key[4:]
+        if tile in self.visible_tiles:
+            self.place_tile(*tile, img)
 
-            # スクロール領域を更新
-            self.canvas.config(scrollregion=self.canvas.bbox("all"))
+    def request_word_index(self):
+        """表示中のページの単語の空間インデックスをバックグラウンドで作成（作成済みなら何もしない）"""
+        if self.is_image_mode or not self.pdf_document:
+            return
+        if not self.show_nearest_word.get() and not self.snap_to_words.get():
+            return
+        for page_index in self.pages_in_view(margin=0):
+            index_key = (self.doc_key, page_index)
+            if index_key in self.word_indexes:
+                self.word_indexes.move_to_end(index_key)
+                continue
+            # 表示中のタイルの後、先読みより先に処理する
+            self.pdf_worker.submit(('words',) + index_key, build_word_index_job, *index_key,
+                                   priority=INDEX_PRIORITY)
+        self.schedule_render_poll()
+
+    def on_word_index_built(self, key, index, error):
+        """単語の空間インデックスの作成完了時の処理"""
+        if error is not None:
+            print(f"Warning: Could not extract words: {str(error)}")
+            return
+        self.word_indexes[key[1:]] = index
+        while len(self.word_indexes) > WORD_INDEX_PAGES:
+            self.word_indexes.popitem(last=False)
 
-            # マーカーを再描画
-            for x, y in self.marker_positions:
-                self._draw_marker_at(x, y)
+    def request_snap_index(self):
+        """表示中のページの図形の吸着点をバックグラウンドで作成（作成済みなら何もしない）"""
+        if self.is_image_mode or not self.pdf_document or not self.snap_to_geometry.get():
+            return
+        for page_index in self.pages_in_view(margin=0):
+            index_key = (self.doc_key, page_index)
+            if index_key in self.snap_indexes:
+                self.snap_indexes.move_to_end(index_key)
+                continue
+            self.pdf_worker.submit(('snap',) + index_key, build_snap_index_job, *index_key,
+                                   priority=INDEX_PRIORITY)
+        self.schedule_render_poll()
+
+    def on_snap_index_built(self, key, index, error):
+        """図形の吸着点の作成完了時の処理"""
+        if error is not None:
+            print(f"Warning: Could not extract drawings: {str(error)}")
+            return
+        self.snap_indexes[key[1:]] = index
+        while len(self.snap_indexes) > SNAP_INDEX_PAGES:
+            self.snap_indexes.popitem(last=False)
 
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to display: {str(e)}")
+    def find_snap_point(self, page_index, x, y):
+        """ページ内の座標の付近にある図形の吸着点を返す（インデックスが未作成か、付近になければNone）
 
-    def auto_adjust_coord_scale(self, width):
-        """X座標が3桁以内になるようにスケールを自動調整"""
-        # 利用可能なスケールオプション
-        scale_options = [0.0001,0.005,0.001,0.005,0.01,0.05, 0.1, 0.5, 1.0, 2.0]
-
-        # X座標が999以下になる最大のスケールを見つける
-        best_scale = 1  # デフォルト最小値
-        for scale in scale_options:
-            if width * scale <= 999:
-                best_scale = scale
+        Returns:
+            (x, y, 種類の名前) 座標はページ内の座標
+        """
+        if self.is_image_mode or not self.pdf_document:
+            return None
+        index = self.snap_indexes.get((self.doc_key, page_index))
+        if index is None:
+            return None
+        point = index.nearest(x / self.zoom, y / self.zoom, SNAP_TOLERANCE_PX / self.zoom)
+        if point is None:
+            return None
+        return point[0] * self.zoom, point[1] * self.zoom, point[2]
+
+    def find_nearest_word(self, page_index, x, y):
+        """ページ内の座標の付近にある単語を返す（インデックスが未作成か、付近になければNone）
+
+        Returns:
+            (x0, y0, x1, y1, 文字列) 座標はページ内の座標
+        """
+        if self.is_image_mode or not self.pdf_document:
+            return None
+        index = self.word_indexes.get((self.doc_key, page_index))
+        if index is None:
+            return None
+        word = index.nearest(x / self.zoom, y / self.zoom, WORD_SNAP_PX / self.zoom)
+        if word is None:
+            return None
+        x0, y0, x1, y1, text = word
+        return x0 * self.zoom, y0 * self.zoom, x1 * self.zoom, y1 * self.zoom, text
+
+    def lookup_cursor(self, x, y):
+        """カーソル位置をページ内の座標に変換し、図形・単語への吸着を適用して返す
+
+        図形と単語の両方に吸着させる場合は、図形を優先する。
+
+        Args:
+            x, y: キャンバス座標
+
+        Returns:
+            (ページ番号, x, y, 付近の単語, 吸着した図形の種類) 座標はページ内の座標、
+            単語は find_nearest_word() の戻り値
+        """
+        page_index, x, y = self.canvas_to_page(x, y)
+
+        snap_kind = None
+        if self.snap_to_geometry.get():
+            point = self.find_snap_point(page_index, x, y)
+            if point is not None:
+                x, y, snap_kind = point
+
+        word = None
+        if self.show_nearest_word.get() or self.snap_to_words.get():
+            word = self.find_nearest_word(page_index, x, y)
+            if word is not None and snap_kind is None and self.snap_to_words.get():
+                x = (word[0] + word[2]) / 2
+                y = (word[1] + word[3]) / 2
+        return page_index, x, y, word, snap_kind
+
+    def bump_render_generation(self):
+        """描画の世代を進め、実行中の古いジョブを打ち切らせる"""
+        with self.render_generation.get_lock():
+            self.render_generation.value += 1
+
+    def request_coarse_pass(self):
+        """表示範囲の粗い画像を最優先で描画し、タイルが揃うまでの間に表示する
+
+        解像度を落としても描画する図形の数は変わらないため、ページ全体ではなく
+        見えている範囲だけを描く（タイル1枚分と同程度の時間で済む）。
+        """
+        if self.is_image_mode or not self.pdf_document:
+            return
+        coarse_zoom = round(self.zoom * COARSE_SCALE, 4)
+        self.coarse_requests = set()
+        images = {}
+        for page_index in self.pages_in_view(margin=0):
+            # 表示範囲のうちこのページに重なる部分（粗い画像のページ内の座標）
+            origin_x, origin_y = self.page_origin(page_index)
+            width, height = self.get_page_pixel_size(page_index)
+            box = (max(0, int((self.canvas.canvasx(0) - origin_x) * COARSE_SCALE)),
+                   max(0, int((self.canvas.canvasy(0) - origin_y) * COARSE_SCALE)),
+                   min(int(width * COARSE_SCALE),
+                       int((self.canvas.canvasx(max(self.canvas.winfo_width(), 1)) - origin_x) * COARSE_SCALE) + 1),
+                   min(int(height * COARSE_SCALE),
+                       int((self.canvas.canvasy(max(self.canvas.winfo_height(), 1)) - origin_y) * COARSE_SCALE) + 1))
+            if box[2] <= box[0] or box[3] <= box[1]:
+                continue
+
+            key = ('coarse', self.doc_key, page_index, coarse_zoom, self.invert_colors, box)
+            img = self.render_cache.get(key)
+            if img is not None:
+                images[self.coarse_position(key)] = img
+                continue
+            self.coarse_requests.add(key)
+            self.submit_coarse_pass(key)
+
+        if images:
+            self.place_preview(coarse_zoom, images)
+        self.schedule_render_poll()
+
+    def submit_coarse_pass(self, key):
+        """粗い画像のレンダリングを最優先でバックグラウンドに依頼"""
+        _, doc_key, page_index, coarse_zoom, invert, box = key
+        self.pdf_worker.submit(key, render_pdf_tile_job, doc_key, page_index, coarse_zoom,
+                               box, 'high', invert, priority=-1, cancellable=True)
+
+    def coarse_position(self, key):
+        """粗い画像の左上の位置（粗い画像の倍率でのキャンバス座標）"""
+        _, _, page_index, coarse_zoom, _, box = key
+        origin_x, origin_y = self.page_origin(page_index)
+        return round(origin_x * COARSE_SCALE) + box[0], round(origin_y * COARSE_SCALE) + box[1]
+
+    def on_coarse_rendered(self, key, img):
+        """表示範囲の粗い画像の完了時の処理"""
+        self.render_cache.put(key, img)
+        if key not in self.coarse_requests:
+            return
+        self.coarse_requests.discard(key)
+
+        # ズームのプレビュー中は上書きしない（複数ページ分の粗い画像はまとめて表示する）
+        images = {}
+        if self.zoom_preview is not None:
+            if self.zoom_preview[0] != key[3]:
+                return
+            images = dict(self.zoom_preview[1])
+
+        # タイルがまだ揃っていなければ、その下に敷く
+        if not self.visible_tiles <= self.tile_items.keys():
+            images[self.coarse_position(key)] = img
+            self.place_preview(key[3], images)
+
+    def tile_cache_key(self, page_index, tx, ty, quality):
+        """タイルのキャッシュキー（ファイル, ズーム, 品質, 反転, ページ, タイル位置）"""
+        return (self.doc_key, round(self.zoom, 4), quality, self.invert_colors, page_index, tx, ty)
+
+    def disk_tile_key(self, cache_key):
+        """タイルのディスクキャッシュのキー（ディスクに保存しないタイルはNone）
+
+        ファイルはパスではなく内容の識別子で区別し、ズーム操作中の低品質タイルは保存しない。
+        描画方法の版も含め、以前の版で保存したタイルが新しいタイルと並ばないようにする。
+        """
+        if self.disk_cache is None or self.is_image_mode or self.doc_fingerprint is None:
+            return None
+        if cache_key[2] != 'high':
+            return None
+        return (self.doc_fingerprint, TILE_SIZE, TILE_RENDER_VERSION) + cache_key[1:]
+
+    def load_saved_zooms(self):
+        """ファイルごとの最後のズームを読み込む（初回のみ）"""
+        if self.saved_zooms is None:
+            self.saved_zooms = {}
+            try:
+                with open(os.path.join(get_cache_dir(), 'zoom.json'), 'r', encoding='utf-8') as f:
+                    self.saved_zooms = dict(json.load(f))
+            except FileNotFoundError:
+                pass
+            except (OSError, ValueError, TypeError) as e:
+                print(f"Warning: Could not load saved zoom levels: {str(e)}")
+        return self.saved_zooms
+
+    def remember_zoom(self):
+        """開いているPDFの現在のズームを保存（次に開いた時に使う）"""
+        if self.is_image_mode or not self.pdf_document or self.doc_fingerprint is None:
+            return
+        zooms = self.load_saved_zooms()
+
+        # 最近使ったものを後ろに並べ、古いものから捨てる
+        zooms.pop(self.doc_fingerprint, None)
+        zooms[self.doc_fingerprint] = round(self.zoom, 4)
+        while len(zooms) > ZOOM_HISTORY_FILES:
+            del zooms[next(iter(zooms))]
+
+        try:
+            cache_dir = get_cache_dir()
+            os.makedirs(cache_dir, exist_ok=True)
+            path = os.path.join(cache_dir, 'zoom.json')
+            with open(f"{path}.tmp", 'w', encoding='utf-8') as f:
+                json.dump(zooms, f)
+            os.replace(f"{path}.tmp", path)
+        except OSError as e:
+            print(f"Warning: Could not save zoom level: {str(e)}")
+
+    def get_page_sizes(self):
+        """全ページの大きさ（PDFのポイント、初回のみ取得）"""
+        if self.page_sizes is None:
+            self.page_sizes = [(page.rect.width, page.rect.height) for page in self.pdf_document]
+        return self.page_sizes
+
+    def toggle_thumbnails(self):
+        """サムネイル一覧の表示を切り替え"""
+        if self.show_thumbnails.get():
+            self.thumb_frame.pack(side=tk.LEFT, fill=tk.Y, before=self.canvas)
+            self.prepare_thumbnails()
+        else:
+            self.thumb_frame.pack_forget()
+            self.clear_thumbnails()
+
+    def clear_thumbnails(self):
+        """サムネイルを全て破棄し、待機中のサムネイルのジョブを取り消す"""
+        self.thumb_canvas.delete("all")
+        self.thumb_items = {}
+        self.thumb_layout = None
+        self.thumb_dir = None
+        self.pdf_worker.discard(lambda key: key[0] != 'thumb')
+
+    def prepare_thumbnails(self):
+        """開いているPDFのサムネイルの配置と保存先を用意"""
+        if not self.show_thumbnails.get() or self.is_image_mode or not self.pdf_document:
+            return
+
+        # 一番幅の広いページを THUMB_WIDTH に合わせ、ページ番号の分の間隔を空けて並べる
+        sizes = self.get_page_sizes()
+        self.thumb_scale = THUMB_WIDTH / max(width for width, _ in sizes)
+        self.thumb_layout = PageLayout(sizes, gap=THUMB_GAP / self.thumb_scale)
+        self.thumb_items = {}
+        self.thumb_canvas.delete("all")
+        _, height = self.thumb_layout.pixel_size(self.thumb_scale)
+        self.thumb_canvas.config(scrollregion=(0, 0, THUMB_PANEL_WIDTH, height + THUMB_GAP))
+        self.thumb_canvas.yview_moveto(0)
+
+        # 保存先はファイルの内容ごとに分ける（同じファイルを開き直せばすぐに表示できる）
+        if self.doc_fingerprint is not None:
+            self.thumb_dir = os.path.join(get_cache_dir(), 'thumbs', f"{self.doc_fingerprint}_{THUMB_WIDTH}")
+        else:
+            self.thumb_dir = None
+
+        self.highlight_thumbnail()
+        self.schedule_thumb_update()
+
+    def thumb_position(self, page_index):
+        """サムネイルの左上の位置（サムネイル一覧のキャンバス座標）"""
+        _, y = self.thumb_layout.origin(page_index, self.thumb_scale)
+        width, _ = self.thumb_layout.page_pixel_size(page_index, self.thumb_scale)
+        return (THUMB_PANEL_WIDTH - width) // 2, y + THUMB_GAP // 2
+
+    def thumb_path(self, page_index):
+        """サムネイルの保存先のファイル（保存先がなければNone）"""
+        if self.thumb_dir is None:
+            return None
+        return os.path.join(self.thumb_dir, f"{page_index}.png")
+
+    def schedule_thumb_update(self):
+        """サムネイル更新を予約（連続したスクロールイベントをまとめる）"""
+        if self.thumb_update_timer is None and self.thumb_layout is not None:
+            self.thumb_update_timer = self.root.after_idle(self.update_thumbnails)
+
+    def update_thumbnails(self):
+        """サムネイル一覧の表示範囲（＋1画面分）のサムネイルを配置し、範囲外のものは破棄
+
+        ディスクキャッシュにあるサムネイルはその場で読み込み、ないものだけを
+        バックグラウンドでレンダリングする。
+        """
+        self.thumb_update_timer = None
+        if self.thumb_layout is None:
+            return
+
+        view_height = max(self.thumb_canvas.winfo_height(), 1)
+        view_y0 = self.thumb_canvas.canvasy(0) - view_height
+        view_y1 = self.thumb_canvas.canvasy(view_height) + view_height
+        needed = set(self.thumb_layout.pages_between(view_y0 / self.thumb_scale, view_y1 / self.thumb_scale))
+
+        for page_index in [p for p in self.thumb_items if p not in needed]:
+            items, _ = self.thumb_items.pop(page_index)
+            self.thumb_canvas.delete(*items)
+
+        # 範囲外になったサムネイルのレンダリング待ちを取り消す
+        self.pdf_worker.discard(lambda key: key[0] != 'thumb' or key[2] in needed)
+
+        for page_index in sorted(needed):
+            key = ('thumb', self.doc_key, page_index)
+            if page_index in self.thumb_items:
+                # 配置済みでも、display_page() の cancel_all() で取り消されたジョブは出し直す
+                if self.thumb_items[page_index][1] is not None or self.pdf_worker.is_queued(key):
+                    continue
             else:
-                break
+                self.place_thumbnail_frame(page_index)
+
+                img = self.load_cached_thumbnail(page_index)
+                if img is not None:
+                    self.place_thumbnail(page_index, img)
+                    continue
+            self.pdf_worker.submit(key, render_thumbnail_job, self.doc_key,
+                                   page_index, self.thumb_scale, self.thumb_path(page_index),
+                                   priority=THUMB_PRIORITY)
+
+        self.schedule_render_poll()
+
+    def load_cached_thumbnail(self, page_index):
+        """ディスクキャッシュからサムネイルを読み込む（なければNone）"""
+        path = self.thumb_path(page_index)
+        if path is None:
+            return None
+        try:
+            img = Image.open(path)
+            img.load()
+            return img
+        except FileNotFoundError:
+            return None
+        except OSError as e:
+            print(f"Warning: Could not load cached thumbnail: {str(e)}")
+            return None
+
+    def place_thumbnail_frame(self, page_index):
+        """サムネイルが届くまでの白紙とページ番号を配置"""
+        x0, y0 = self.thumb_position(page_index)
+        width, height = self.thumb_layout.page_pixel_size(page_index, self.thumb_scale)
+        items = [
+            self.thumb_canvas.create_rectangle(x0, y0, x0 + width, y0 + height, fill="white", outline=""),
+            self.thumb_canvas.create_text(THUMB_PANEL_WIDTH // 2, y0 + height + 2, text=str(page_index + 1),
+                                          anchor=tk.N, fill="white"),
+        ]
+        self.thumb_items[page_index] = (items, None)
+
+    def place_thumbnail(self, page_index, img):
+        """サムネイル画像を配置"""
+        items, _ = self.thumb_items[page_index]
+        x0, y0 = self.thumb_position(page_index)
+        photo = ImageTk.PhotoImage(img)
+        items.append(self.thumb_canvas.create_image(x0, y0, anchor=tk.NW, image=photo))
+        self.thumb_items[page_index] = (items, photo)
+        self.thumb_canvas.tag_raise("thumb_current")
+
+    def on_thumbnail_rendered(self, key, result, error):
+        """サムネイルのレンダリング完了時の処理"""
+        if error is not None:
+            print(f"Warning: Could not render thumbnail: {str(error)}")
+            return
+        _, doc_key, page_index = key
+        if doc_key != self.doc_key or page_index not in self.thumb_items or self.thumb_items[page_index][1]:
+            return
+        self.place_thumbnail(page_index, Image.frombytes(*result))
+
+    def highlight_thumbnail(self):
+        """現在のページのサムネイルを枠で囲み、サムネイル一覧の表示範囲に入れる"""
+        if self.thumb_layout is None:
+            return
+        self.thumb_canvas.delete("thumb_current")
+        x0, y0 = self.thumb_position(self.current_page)
+        width, height = self.thumb_layout.page_pixel_size(self.current_page, self.thumb_scale)
+        self.thumb_canvas.create_rectangle(x0 - 3, y0 - 3, x0 + width + 2, y0 + height + 2,
+                                           outline="orange", width=3, tags="thumb_current")
+
+        # 表示範囲の外なら、そのサムネイルが見える位置までスクロール
+        view_y0 = self.thumb_canvas.canvasy(0)
+        view_y1 = self.thumb_canvas.canvasy(max(self.thumb_canvas.winfo_height(), 1))
+        if y0 < view_y0 or y0 + height > view_y1:
+            _, total = self.thumb_layout.pixel_size(self.thumb_scale)
+            self.thumb_canvas.yview_moveto(max(0, y0 - THUMB_GAP) / (total + THUMB_GAP))
+
+    def on_thumb_yscroll(self, first, last):
+        """サムネイル一覧のスクロール時の処理"""
+        self.thumb_scrollbar.set(first, last)
+        self.schedule_thumb_update()
+
+    def on_thumb_mousewheel(self, event):
+        """マウスホイールでサムネイル一覧をスクロール"""
+        self.thumb_canvas.yview_scroll(-1 if event.delta > 0 else 1, "units")
+
+    def on_thumb_click(self, event):
+        """クリックしたサムネイルのページに移動"""
+        if self.thumb_layout is None:
+            return
+        page_index = self.thumb_layout.page_at(self.thumb_canvas.canvasy(event.y) / self.thumb_scale)
+        if page_index != self.current_page or self.page_layout is not None:
+            self.go_to_page(page_index)
 
-        # スケールを設定
-        self.coord_scale.set(best_scale)
+    def auto_adjust_coord_scale(self, width):
+        """X座標が3桁以内になるようにスケールを自動調整"""
+        self.coord_scale.set(choose_coord_scale(width))
 
     def prev_page(self):
         """前のページに移動"""
         if self.pdf_document and self.current_page > 0:
-            self.current_page -= 1
-            # ページ移動時はマーカーをクリア
-            self.marker_positions = []
-            self.display_page()
+            self.go_to_page(self.current_page - 1)
 
     def next_page(self):
         """次のページに移動"""
         if self.pdf_document and self.current_page < len(self.pdf_document) - 1:
-            self.current_page += 1
-            # ページ移動時はマーカーをクリア
-            self.marker_positions = []
-            self.display_page()
+            self.go_to_page(self.current_page + 1)
+
+    def go_to_page(self, page_index):
+        """指定ページに移動"""
+        self.page_direction = 1 if page_index >= self.current_page else -1
+        if self.page_layout is not None:
+            # 連続スクロールではページの先頭までスクロールする（マーカーは残す）
+            self.scroll_to_page(page_index)
+            return
+        self.current_page = page_index
+        # ページ移動時はマーカーをクリア
+        self.marker_positions.clear()
+        self.display_page()
+
+    def scroll_to_page(self, page_index):
+        """連続スクロールで指定ページの先頭までスクロール"""
+        self.current_page = page_index
+        _, height = self.page_pixel_size
+        _, origin_y = self.page_origin(page_index)
+        self.canvas.yview_moveto(origin_y / max(height, 1))
+        self.update_page_label()
+        self.schedule_tile_update()
+
+    def toggle_continuous(self):
+        """連続スクロールの切り替え"""
+        if self.pdf_document is None or self.is_image_mode:
+            return
+
+        page_index = self.current_page
+        self.page_layout = PageLayout(self.get_page_sizes()) if self.continuous.get() else None
+
+        # マーカーの座標系（ページ内/全ページ）が変わるのでクリアする
+        self.marker_positions.clear()
+        self.display_page()
+        if self.page_layout is not None:
+            self.scroll_to_page(page_index)
+        else:
+            self.canvas.yview_moveto(0)
 
     def clear_markers(self):
         """赤丸マーカーを全てクリア"""
         # マーカーをクリア
-        self.marker_images = []
-        self.marker_positions = []
+        self.marker_positions.clear()
 
         # 現在のページを再描画
         if self.pdf_document or self.image_file:
@@ -477,23 +3292,90 @@ class PDFViewer:
         # ページを再描画
         self.display_page()
 
+    def schedule_input_frame(self):
+        """溜まったマウス操作の処理を次のフレームに予約"""
+        if self.input_timer is None:
+            self.input_timer = self.root.after(INPUT_FRAME_MS, self.process_input_frame)
+
+    def process_input_frame(self):
+        """前のフレームから溜まったマウス操作をまとめて反映"""
+        self.input_timer = None
+        start = time.perf_counter()
+        kinds = []  # 計測の記録用（このフレームで処理した操作）
+
+        if self.pending_pan is not None:
+            x, y = self.pending_pan
+            self.pending_pan = None
+            # ドラッグした分だけピクセル単位でずらす
+            self.canvas.scan_dragto(x, y, gain=1)
+            kinds.append('pan')
+
+        dx, dy = self.pending_scroll
+        self.pending_scroll = [0, 0]
+        if dx:
+            self.canvas.xview_scroll(dx, "units")
+        if dy:
+            self.canvas.yview_scroll(dy, "units")
+        if dx or dy:
+            kinds.append('scroll')
+
+        if self.pending_zoom_steps:
+            steps = self.pending_zoom_steps
+            self.pending_zoom_steps = 0
+            self.apply_zoom(steps, self.pending_zoom_anchor)
+            kinds.append('zoom')
+
+        if self.pending_motion is not None:
+            x, y = self.pending_motion
+            self.pending_motion = None
+            self.update_cursor_readout(x, y)
+            kinds.append('motion')
+
+        self.perf.record('input_frame', time.perf_counter() - start, kinds='+'.join(kinds))
+
     def on_mouse_move(self, event):
-        """マウス移動時の座標を表示"""
-        x = self.canvas.canvasx(event.x)
-        y = self.canvas.canvasy(event.y)
+        """マウス移動時の座標を表示（次のフレームでまとめて処理）"""
+        self.pending_motion = (event.x, event.y)
+        self.schedule_input_frame()
+
+    def update_cursor_readout(self, event_x, event_y):
+        """カーソル位置の座標をステータスバーに表示
+
+        Args:
+            event_x, event_y: カーソル位置（ウィンドウ座標）
+        """
+        x = self.canvas.canvasx(event_x)
+        y = self.canvas.canvasy(event_y)
 
         # パン中でなければ座標を表示
         if not self.is_panning:
+            page_index, x, y, word, snap_kind = self.lookup_cursor(x, y)
+
             # 倍率を適用
             scale = self.coord_scale.get()
             scaled_x = x * scale
             scaled_y = y * scale
-            self.status_bar.config(text=f"{int(scaled_x)}_{int(scaled_y)}")
+            text = f"{int(scaled_x)}_{int(scaled_y)}"
+            if self.page_layout is not None:
+                text += f" (Page {page_index + 1})"
+            if snap_kind is not None:
+                text += f" [{snap_kind}]"
+
+            # 付近の単語とその範囲を表示
+            if word is not None and self.show_nearest_word.get():
+                x0, y0, x1, y1, word_text = word
+                text += (f"    \"{word_text}\" {int(x0 * scale)}_{int(y0 * scale)}"
+                         f" - {int(x1 * scale)}_{int(y1 * scale)}")
+            self.status_bar.config(text=text)
 
     def on_left_click(self, event):
         """左クリック時に座標をクリップボードにコピー"""
         x = self.canvas.canvasx(event.x)
         y = self.canvas.canvasy(event.y)
+        if self.snap_to_words.get() or self.snap_to_geometry.get():
+            page_index, x, y, _, _ = self.lookup_cursor(x, y)
+        else:
+            page_index, x, y = self.canvas_to_page(x, y)
 
         # 倍率を適用
         scale = self.coord_scale.get()
@@ -508,10 +3390,103 @@ class PDFViewer:
             self.root.after(2000, lambda: self.status_bar.config(text=coord_text, fg="black"))
 
             # クリック位置に赤い丸を描画
-            self.draw_marker(x, y)
+            origin_x, origin_y = self.page_origin(page_index)
+            self.draw_marker(origin_x + x, origin_y + y)
         except Exception as e:
             messagebox.showerror("Error", f"Failed to copy to clipboard: {str(e)}")
 
+    def ask_point_unit(self, title):
+        """座標の単位を選ばせる
+
+        Returns:
+            'pt' (PDFのポイント/画像のピクセル), 'scaled' (ステータスバーの x_y と同じ単位), キャンセル時はNone
+        """
+        answer = messagebox.askyesnocancel(
+            title,
+            "座標の単位を選んでください\n\n"
+            "はい: PDFのポイント（画像はピクセル）\n"
+            "いいえ: ステータスバーと同じ単位（x_y、Coord Scale 適用後）")
+        if answer is None:
+            return None
+        return 'pt' if answer else 'scaled'
+
+    def import_points(self):
+        """CSV/JSONの座標一覧を現在のページにマーカーとして読み込む
+
+        連続スクロールでは現在のページ内の座標として読み込む。
+        """
+        if not self.pdf_document and not self.image_file:
+            return
+
+        file_path = filedialog.askopenfilename(
+            title="Import Points",
+            filetypes=[
+                ("Point files", "*.csv;*.json"),
+                ("CSV files", "*.csv"),
+                ("JSON files", "*.json"),
+                ("All files", "*.*")
+            ]
+        )
+        if not file_path:
+            return
+
+        try:
+            xs, ys, unit = read_points(file_path)
+            if unit is None:
+                unit = self.ask_point_unit("Import Points")
+                if unit is None:
+                    return
+
+            # 正規化座標（元画像の座標系）にまとめて変換
+            if unit == 'scaled':
+                factor = self.zoom * self.coord_scale.get()
+                xs = xs / factor
+                ys = ys / factor
+            if self.page_layout is not None:
+                ys = ys + self.page_layout.tops[self.current_page]
+            self.marker_positions.extend(xs, ys)
+            self.update_markers()
+            self.status_bar.config(text=f"Imported {len(xs)} points", fg="green")
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to import points: {str(e)}")
+
+    def export_points(self):
+        """現在のマーカーをCSV/JSONに書き出す
+
+        連続スクロールではマーカーごとにそのページ内の座標として書き出す。
+        """
+        if not len(self.marker_positions):
+            messagebox.showinfo("Export Points", "No markers to export.")
+            return
+
+        file_path = filedialog.asksaveasfilename(
+            title="Export Points",
+            defaultextension=".csv",
+            filetypes=[
+                ("CSV files", "*.csv"),
+                ("JSON files", "*.json")
+            ]
+        )
+        if not file_path:
+            return
+
+        unit = self.ask_point_unit("Export Points")
+        if unit is None:
+            return
+
+        try:
+            xs, ys = self.marker_positions.as_arrays()
+            if self.page_layout is not None:
+                ys = ys - self.page_layout.tops[self.page_layout.page_at(ys)]
+            if unit == 'scaled':
+                factor = self.zoom * self.coord_scale.get()
+                xs = xs * factor
+                ys = ys * factor
+            write_points(file_path, xs, ys, unit)
+            self.status_bar.config(text=f"Exported {len(xs)} points", fg="green")
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to export points: {str(e)}")
+
     def draw_marker(self, x, y):
         """クリック位置に赤い丸マーカーを描画
 
@@ -521,60 +3496,124 @@ class PDFViewer:
         # 座標を正規化して保存（元画像の座標系に変換）
         normalized_x = x / self.zoom
         normalized_y = y / self.zoom
-        self.marker_positions.append((normalized_x, normalized_y))
+        index = self.marker_positions.append(normalized_x, normalized_y)
 
         # マーカーを描画
-        self._draw_marker_at(normalized_x, normalized_y)
+        self._draw_marker_at(index)
+
+    def get_marker_sprite(self, size=MARKER_SIZE, color=MARKER_COLOR):
+        """マーカー画像を取得（大きさ・色ごとに1回だけ作成して全マーカーで共有）"""
+        key = (size, color)
+        sprite = self.marker_sprites.get(key)
+        if sprite is None:
+            # PILで半透明の円を作成
+            img = Image.new('RGBA', (size, size), (0, 0, 0, 0))  # 透明な背景
+            draw = ImageDraw.Draw(img)
+            draw.ellipse([0, 0, size-1, size-1], fill=color)
+            sprite = ImageTk.PhotoImage(img)
+            self.marker_sprites[key] = sprite
+        return sprite
+
+    def update_markers(self):
+        """表示範囲（＋余白）にあるマーカーだけをキャンバスに配置し、範囲外のものは破棄
+
+        見えているマーカーが多い場合は、個別のキャンバスアイテムを作らずに
+        1枚の画像にまとめて描く。
+        """
+        margin = TILE_MARGIN
+        width, height = self.page_pixel_size
+        view = (max(0, int(self.canvas.canvasx(0)) - margin),
+                max(0, int(self.canvas.canvasy(0)) - margin),
+                min(width, int(self.canvas.canvasx(max(self.canvas.winfo_width(), 1))) + margin),
+                min(height, int(self.canvas.canvasy(max(self.canvas.winfo_height(), 1))) + margin))
+        if view[2] <= view[0] or view[3] <= view[1]:
+            return
+
+        # 円がはみ出す分も含めて範囲内のマーカーを探す
+        r = MARKER_SIZE / 2
+        visible = self.marker_positions.in_rect((view[0] - r) / self.zoom, (view[1] - r) / self.zoom,
+                                                (view[2] + r) / self.zoom, (view[3] + r) / self.zoom)
+
+        if len(visible) > MARKER_ITEM_LIMIT:
+            # 個別のマーカーを破棄して、まとめた画像に切り替える
+            for item in self.marker_items.values():
+                self.canvas.delete(item)
+            self.marker_items = {}
+            self.update_marker_overlay(view, visible)
+            return
+
+        start = time.perf_counter()
+        if self.marker_overlay is not None:
+            self.canvas.delete(self.marker_overlay[0])
+            self.marker_overlay = None
+
+        visible = set(visible.tolist())
+        for index in [index for index in self.marker_items if index not in visible]:
+            self.canvas.delete(self.marker_items.pop(index))
+        for index in visible:
+            if index not in self.marker_items:
+                self._draw_marker_at(index)
+        self.perf.record('markers', time.perf_counter() - start, count=len(visible))
+
+    def update_marker_overlay(self, view, visible):
+        """大量のマーカーをまとめた画像を更新
 
-    def _draw_marker_at(self, normalized_x, normalized_y):
-        """指定座標にマーカーを描画（内部用）
+        前回の画像が表示範囲を覆っていて、ズームやマーカーも変わっていなければ描き直さない。
 
         Args:
-            normalized_x, normalized_y: 正規化座標（元画像の座標系）
+            view: 表示範囲（＋余白）のキャンバス座標
+            visible: 範囲内のマーカー番号
         """
-        # 現在のズーム倍率を適用して実座標に変換
-        x = normalized_x * self.zoom
-        y = normalized_y * self.zoom
-
-        # PILで半透明の赤い円を作成
-        size = 20
-        img = Image.new('RGBA', (size, size), (0, 0, 0, 0))  # 透明な背景
-        draw = ImageDraw.Draw(img)
-        draw.ellipse([0, 0, size-1, size-1], fill=(255, 0, 0, 128))  # 赤色、50%透過
+        state = (round(self.zoom, 4), self.marker_positions.version)
+        if self.marker_overlay is not None:
+            item, _, rect, old_state = self.marker_overlay
+            view_x0 = self.canvas.canvasx(0)
+            view_y0 = self.canvas.canvasy(0)
+            view_x1 = self.canvas.canvasx(self.canvas.winfo_width())
+            view_y1 = self.canvas.canvasy(self.canvas.winfo_height())
+            if old_state == state and rect[0] <= view_x0 and rect[1] <= view_y0 and view_x1 <= rect[2] and view_y1 <= rect[3]:
+                return
+            self.canvas.delete(item)
+
+        start = time.perf_counter()
+        xs, ys = self.marker_positions.views()
+        img = render_marker_overlay(xs[visible], ys[visible], self.zoom, view)
+        photo = ImageTk.PhotoImage(img)
+        item = self.canvas.create_image(view[0], view[1], anchor=tk.NW, image=photo, tags="marker")
+        self.marker_overlay = (item, photo, view, state)
+        self.perf.record('markers', time.perf_counter() - start, img.size, count=len(visible), overlay=True)
+
+    def _draw_marker_at(self, index):
+        """指定番号のマーカーを描画（内部用）
 
-        # PhotoImageに変換
-        marker_img = ImageTk.PhotoImage(img)
+        Args:
+            index: MarkerStore内のマーカー番号
+        """
+        # 現在のズーム倍率を適用して実座標に変換
+        x = self.marker_positions.xs[index] * self.zoom
+        y = self.marker_positions.ys[index] * self.zoom
 
         # キャンバスに配置（中心座標で配置）
-        self.canvas.create_image(x, y, image=marker_img)
-
-        # 画像の参照を保持（ガベージコレクションを防ぐ）
-        self.marker_images.append(marker_img)
+        self.marker_items[index] = self.canvas.create_image(x, y, image=self.get_marker_sprite(), tags="marker")
 
     def on_pan_start(self, event):
         """パン開始（右クリック押下）"""
         self.is_panning = True
-        self.pan_start_x = event.x
-        self.pan_start_y = event.y
+        self.canvas.scan_mark(event.x, event.y)
         self.canvas.config(cursor="hand2")  # カーソルを手のアイコンに変更
 
     def on_pan_move(self, event):
-        """パン中の移動（右クリックドラッグ）"""
+        """パン中の移動（右クリックドラッグ、次のフレームでまとめて処理）"""
         if self.is_panning:
-            # 移動量を計算
-            dx = event.x - self.pan_start_x
-            dy = event.y - self.pan_start_y
-
-            # キャンバスをスクロール
-            self.canvas.xview_scroll(int(-dx / 10), "units")
-            self.canvas.yview_scroll(int(-dy / 10), "units")
-
-            # 開始位置を更新
-            self.pan_start_x = event.x
-            self.pan_start_y = event.y
+            self.pending_pan = (event.x, event.y)
+            self.schedule_input_frame()
 
     def on_pan_end(self, event):
         """パン終了（右クリック解放）"""
+        if self.pending_pan is not None:
+            # 最後の移動を取りこぼさないように反映
+            self.canvas.scan_dragto(*self.pending_pan, gain=1)
+            self.pending_pan = None
         self.is_panning = False
         self.canvas.config(cursor="")  # カーソルを元に戻す
 
@@ -582,32 +3621,36 @@ class PDFViewer:
         """マウスホイールでY方向にスクロール"""
         # Windowsでは event.delta が 120/-120
         # 正の値で上スクロール（上に移動 = Y減少）、負の値で下スクロール（下に移動 = Y増加）
-        if event.delta > 0:
-            self.canvas.yview_scroll(-1, "units")
-        else:
-            self.canvas.yview_scroll(1, "units")
+        self.pending_scroll[1] += -1 if event.delta > 0 else 1
+        self.schedule_input_frame()
 
     def on_shift_mousewheel(self, event):
         """Shift+マウスホイールでX方向にスクロール"""
-        if event.delta > 0:
-            self.canvas.xview_scroll(-1, "units")
-        else:
-            self.canvas.xview_scroll(1, "units")
+        self.pending_scroll[0] += -1 if event.delta > 0 else 1
+        self.schedule_input_frame()
 
     def on_ctrl_mousewheel(self, event):
-        """Ctrl+マウスホイールでズーム（段階的レンダリング + 遅延実行）"""
+        """Ctrl+マウスホイールでズーム（次のフレームでまとめて処理）"""
+        if not self.pdf_document and not self.image_file:
+            return
+        self.pending_zoom_steps += 1 if event.delta > 0 else -1
+        self.pending_zoom_anchor = (event.x, event.y)
+        self.schedule_input_frame()
+
+    def apply_zoom(self, steps, anchor=None):
+        """溜まったホイールの段数をまとめて1回のズームとして反映（即座にプレビュー + 遅延実行）
+
+        Args:
+            steps: ズームの段数（1段で1.1倍、負の値はズームアウト）
+            anchor: ズームの中心（ウィンドウ座標、省略時はキャンバスの中央）
+        """
         if not self.pdf_document and not self.image_file:
             return
 
         # 前回のズーム値を保存
         old_zoom = self.zoom
 
-        if event.delta > 0:
-            # ズームイン
-            self.zoom *= 1.1
-        else:
-            # ズームアウト
-            self.zoom /= 1.1
+        self.zoom *= 1.1 ** steps
 
         # ズーム倍率の制限（0.1倍～10倍）
         self.zoom = max(0.1, min(10.0, self.zoom))
@@ -625,8 +3668,12 @@ class PDFViewer:
         self.canvas.config(cursor="watch")
         self.root.config(cursor="watch")
 
-        # 即座に低品質プレビューを表示
-        self.display_page(quality='low')
+        # 表示中のタイルを拡大縮小したプレビューを即座に表示（カーソル下の点は動かさない）
+        if anchor is None:
+            anchor = (self.canvas.winfo_width() / 2, self.canvas.winfo_height() / 2)
+        start = time.perf_counter()
+        self.show_zoom_preview(old_zoom, anchor)
+        self.perf.record('zoom', time.perf_counter() - start, zoom=round(self.zoom, 4), steps=steps)
 
         # ズーム倍率を一時的に表示
         zoom_percent = int(self.zoom * 100)
@@ -647,6 +3694,102 @@ class PDFViewer:
             # ステータスバーの色を元に戻す
             self.root.after(1500, lambda: self.status_bar.config(fg="black"))
 
+    def start_trace(self, file_path):
+        """キャンバスが受け取るイベントの記録を開始
+
+        既存のバインディングはそのままに、同じイベントに記録用の処理を追加する。
+        """
+        try:
+            self.trace_file = open(file_path, 'w', encoding='utf-8')
+        except OSError as e:
+            print(f"Warning: Could not open input trace: {str(e)}")
+            return
+        self.trace_start = time.perf_counter()
+        for sequence in TRACE_CANVAS_EVENTS:
+            self.canvas.bind(sequence, lambda e, s=sequence: self.record_trace_event(s, e), add='+')
+        for sequence in TRACE_KEY_EVENTS:
+            self.root.bind(sequence, lambda e, s=sequence: self.record_trace_event(s, e), add='+')
+
+    def record_trace_event(self, sequence, event):
+        """受け取ったイベントを1行記録（座標はキャンバスのウィンドウ座標）"""
+        self.write_trace({'event': sequence, 'x': event.x, 'y': event.y,
+                          'delta': getattr(event, 'delta', 0) or 0})
+
+    def write_trace(self, entry):
+        """入力の記録に1行追加（記録していなければ何もしない）"""
+        if self.trace_file is None:
+            return
+        entry = dict(entry, t=round(time.perf_counter() - self.trace_start, 4))
+        try:
+            self.trace_file.write(json.dumps(entry) + '\n')
+        except OSError as e:
+            print(f"Warning: Could not write input trace: {str(e)}")
+            self.trace_file = None
+
+    def toggle_perf_hud(self):
+        """描画の段階ごとの時間の表示を切り替え"""
+        self.perf.hud = self.show_perf_hud.get()
+        if self.perf.hud:
+            self.perf_label.pack(side=tk.BOTTOM, fill=tk.X, after=self.status_bar)
+            self.update_perf_hud()
+        else:
+            self.perf_label.pack_forget()
+            if self.perf_hud_timer is not None:
+                self.root.after_cancel(self.perf_hud_timer)
+                self.perf_hud_timer = None
+
+    def update_perf_hud(self):
+        """段階ごとの直近・平均・最大の時間を表示し、次の更新を予約"""
+        self.perf_hud_timer = None
+        if not self.perf.hud:
+            return
+        cells = []
+        for stage, last, mean, peak, (width, height) in self.perf.summary():
+            size = f" {width}x{height}" if width else ""
+            cells.append(f"{stage:<12} {last:7.1f} {mean:7.1f} {peak:7.1f}{size}")
+        if cells:
+            # 2列に並べる（左: ワーカーの段階、右: メインスレッドの段階の順）
+            half = (len(cells) + 1) // 2
+            header = f"{'stage':<12} {'last':>7} {'avg':>7} {'max':>7}  ms (last {PERF_SAMPLES})"
+            rows = [header] + [f"{left:<46}{right}" for left, right in
+                               zip(cells[:half], cells[half:] + [""])]
+            self.perf_label.config(text="\n".join(rows))
+        else:
+            self.perf_label.config(text="No timings yet")
+        self.perf_hud_timer = self.root.after(PERF_HUD_MS, self.update_perf_hud)
+
+    def show_cache_stats(self):
+        """レンダリングキャッシュの統計を表示"""
+        stats = self.render_cache.stats()
+        lookups = stats['hits'] + stats['misses']
+        hit_rate = stats['hits'] / lookups * 100 if lookups else 0.0
+        text = (f"Hits: {stats['hits']}\n"
+                f"Misses: {stats['misses']}\n"
+                f"Hit rate: {hit_rate:.1f}%\n"
+                f"Evictions: {stats['evictions']}\n"
+                f"Entries: {stats['entries']}\n"
+                f"Memory: {stats['bytes'] / 1024 / 1024:.1f} / {stats['max_bytes'] / 1024 / 1024:.0f} MB")
+        if self.disk_cache is not None:
+            disk = self.disk_cache.stats()
+            text += (f"\n\nDisk hits: {disk['hits']}\n"
+                     f"Disk misses: {disk['misses']}\n"
+                     f"Disk: {disk['bytes'] / 1024 / 1024:.1f} / {disk['max_bytes'] / 1024 / 1024:.0f} MB")
+        messagebox.showinfo("Render Cache Stats", text)
+
+    def shutdown(self):
+        """終了時にズームを保存し、バックグラウンドワーカーを停止（ウィンドウは破棄済み）"""
+        self.stop_open()
+        self.remember_zoom()
+        self.pdf_worker.shutdown()
+        self.image_worker.shutdown()
+        if self.decode_executor is not None:
+            self.decode_executor.shutdown(wait=False)
+        self.release_large_image()
+        self.perf.close()
+        if self.trace_file is not None:
+            self.trace_file.close()
+            self.trace_file = None
+
     def center_window(self, window, width, height):
         """ウィンドウをメインウィンドウの中央に配置"""
         # メインウィンドウの位置とサイズを取得
@@ -852,18 +3995,226 @@ class PDFViewer:
         close_btn.pack(pady=8)
 
 
+BATCH_EXTENSIONS = ('.pdf', '.png', '.jpg', '.jpeg')  # 一括処理の対象
+BATCH_QUEUE_PER_WORKER = 2  # ワーカーごとに先に投入しておくページ数（結果は順次書き出してメモリを抑える）
+
+
+def list_batch_files(input_dir):
+    """一括処理の対象ファイル（フォルダ直下のPDF/画像、名前順）"""
+    return sorted(os.path.join(input_dir, name) for name in os.listdir(input_dir)
+                  if name.lower().endswith(BATCH_EXTENSIONS) and os.path.isfile(os.path.join(input_dir, name)))
+
+
+def batch_page_job(file_path, page_index, zoom, invert, output_dir, save_png, with_words, with_features):
+    """ワーカープロセスで1ページを処理（PNGの書き出しと座標の抽出）
+
+    座標はステータスバーの x_y と同じ単位（ズームと、display_page() と同じ方法で選んだ Coord Scale を適用）。
+
+    Returns:
+        結果のJSONにするdict
+    """
+    is_pdf = file_path.lower().endswith('.pdf')
+    if is_pdf:
+        page = open_worker_document((file_path, os.path.getmtime(file_path)))[page_index]
+        size = (page.rect.width, page.rect.height)
+    else:
+        # ビューアーと同じ表示用のモードに変換する（出力のPNGを画面と揃える）
+        with Image.open(file_path) as img:
+            source = img.convert(display_image_mode(img.mode))
+        size = source.size
+
+    # ズーム適用後の大きさは get_page_pixel_size() と同じ方法で求める
+    if is_pdf:
+        irect = (page.rect * fitz.Matrix(zoom, zoom)).irect
+        pixel_size = (irect.width, irect.height)
+    else:
+        pixel_size = (int(size[0] * zoom), int(size[1] * zoom))
+    box = (0, 0) + pixel_size
+
+    coord_scale = choose_coord_scale(pixel_size[0])
+    factor = zoom * coord_scale
+    record = {
+        'file': os.path.basename(file_path),
+        'page': page_index + 1,
+        'width': size[0],
+        'height': size[1],
+        'pixel_width': pixel_size[0],
+        'pixel_height': pixel_size[1],
+        'zoom': zoom,
+        'coord_scale': coord_scale,
+        'unit': 'scaled',
+    }
+
+    if save_png:
+        if is_pdf:
+            img = render_pdf_tile(page, zoom, box, 'high', invert)
+        else:
+            img = render_image_tile(ImagePyramid(source), zoom, box, 'high', invert)
+        name = f"{os.path.splitext(record['file'])[0]}_p{page_index + 1:04d}.png"
+        img.save(os.path.join(output_dir, name))
+        record['png'] = name
+
+    if with_words and is_pdf:
+        record['words'] = [[round(x0 * factor, 2), round(y0 * factor, 2), round(x1 * factor, 2),
+                            round(y1 * factor, 2), text] for x0, y0, x1, y1, text in extract_page_words(page)]
+
+    if with_features and is_pdf:
+        # 複数の線分で共有する端点などは1つにまとめる
+        points, kinds, _ = extract_snap_geometry(page)
+        features = np.unique(np.column_stack([np.round(points * factor, 2), kinds]), axis=0)
+        record['features'] = [[x, y, SnapIndex.KINDS[int(kind)]] for x, y, kind in features.tolist()]
+
+    return record
+
+
+def run_batch(argv):
+    """ヘッドレスの一括処理（GUIを起動せずにフォルダ内のPDF/画像をプロセスプールで処理）
+
+    python pdf_viewer.py batch 入力フォルダ 出力フォルダ [--zoom 1.5] [--invert] [--words] [--features]
+
+    各ページのPNGを出力フォルダに書き出し、ページごとの結果を完了した順に results.jsonl に1行ずつ追記する。
+
+    Returns:
+        終了コード（失敗したページがあれば1）
+    """
+    import argparse
+    from concurrent.futures import wait, FIRST_COMPLETED
+
+    parser = argparse.ArgumentParser(prog="pdf_viewer.py batch",
+                                     description="Render PDFs/images to PNG and extract coordinates to JSON.")
+    parser.add_argument('input_dir', help="folder containing PDF/PNG/JPG files")
+    parser.add_argument('output_dir', help="folder for PNG files and results.jsonl")
+    parser.add_argument('--zoom', type=float, default=1.5, help="zoom level (default: 1.5)")
+    parser.add_argument('--invert', action='store_true', help="render inverted grayscale")
+    parser.add_argument('--words', action='store_true', help="include word coordinates")
+    parser.add_argument('--features', action='store_true',
+                        help="include geometry feature coordinates (end/mid/center points)")
+    parser.add_argument('--no-png', action='store_true', help="do not write PNG files")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help="number of worker processes (default: number of CPUs)")
+    args = parser.parse_args(argv)
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+    if args.zoom <= 0:
+        parser.error("--zoom must be positive")
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    results_path = os.path.join(args.output_dir, 'results.jsonl')
+
+    # ページ単位のジョブに分ける（PDFは開くだけならすぐに終わる）
+    jobs = []
+    failed = []
+    for file_path in list_batch_files(args.input_dir):
+        if file_path.lower().endswith('.pdf'):
+            try:
+                with fitz.open(file_path) as doc:
+                    page_count = len(doc)
+            except Exception as e:
+                failed.append({'file': os.path.basename(file_path), 'error': str(e)})
+                continue
+        else:
+            page_count = 1
+        jobs += [(file_path, page_index) for page_index in range(page_count)]
+
+    print(f"Processing {len(jobs)} pages with {args.workers} workers...", flush=True)
+    start_time = time.perf_counter()
+    last_report = start_time
+    done = 0
+    errors = len(failed)
+    with open(results_path, 'w', encoding='utf-8') as out, \
+            ProcessPoolExecutor(max_workers=args.workers) as executor:
+        for record in failed:
+            out.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+        pending = {}
+        job_iter = iter(jobs)
+        while True:
+            # 同時に投入するジョブを絞り、結果は届いた順に書き出す
+            for file_path, page_index in job_iter:
+                future = executor.submit(batch_page_job, file_path, page_index, args.zoom, args.invert,
+                                         args.output_dir, not args.no_png, args.words, args.features)
+                pending[future] = (file_path, page_index)
+                if len(pending) >= args.workers * BATCH_QUEUE_PER_WORKER:
+                    break
+            if not pending:
+                break
+
+            finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in finished:
+                file_path, page_index = pending.pop(future)
+                try:
+                    record = future.result()
+                except Exception as e:
+                    record = {'file': os.path.basename(file_path), 'page': page_index + 1, 'error': str(e)}
+                    errors += 1
+                out.write(json.dumps(record, ensure_ascii=False) + '\n')
+                done += 1
+            out.flush()
+
+            # 進捗は1秒に1回だけ表示する
+            now = time.perf_counter()
+            if now - last_report >= 1.0:
+                last_report = now
+                print(f"{done}/{len(jobs)} pages ({done / (now - start_time):.1f} pages/s)", flush=True)
+
+    elapsed = time.perf_counter() - start_time
+    rate = done / elapsed if elapsed > 0 else 0.0
+    print(f"Processed {done} pages in {elapsed:.1f} s ({rate:.1f} pages/s), {errors} errors")
+    print(f"Results: {results_path}")
+    return 1 if errors else 0
+
+
+def create_root():
+    """ルートウィンドウを作成
+
+    tkinterdnd2のメソッド（drop_target_registerなど）はDnDWrapperにしかないため、
+    tk.TkにDnDWrapperを混ぜたクラスで作成する。tkdnd（Tcl側）の読み込みは
+    TkinterDnD.Tk()と違ってここでは行わず、ウィンドウの表示後に
+    enable_drag_and_dropで行う。
+
+    Returns:
+        tk.Tk: ルートウィンドウ（tkinterdnd2がなければ通常のtk.Tk）
+    """
+    try:
+        from tkinterdnd2 import TkinterDnD
+    except ImportError as e:
+        print(f"Warning: Could not enable drag and drop: {str(e)}")
+        return tk.Tk()
+
+    class DnDRoot(tk.Tk, TkinterDnD.DnDWrapper):
+        pass
+
+    return DnDRoot()
+
+
 def main():
-    root = TkinterDnD.Tk()  # ドラッグアンドドロップをサポートするために TkinterDnD.Tk() を使用
+    # PyInstallerでビルドした場合にワーカープロセスを正しく起動するため
+    multiprocessing.freeze_support()
+
+    # python pdf_viewer.py batch ... はGUIを起動せずに一括処理する
+    if len(sys.argv) > 1 and sys.argv[1] == 'batch':
+        sys.exit(run_batch(sys.argv[2:]))
+
+    report_startup("modules imported")
+
+    # ドラッグアンドドロップ（tkdnd）はウィンドウの表示後に有効化する
+    root = create_root()
     app = PDFViewer(root)
 
+    # 重い処理の前にウィンドウを表示する
+    root.update()
+    report_startup("first paint")
+
     # コマンドライン引数でファイルが指定されていれば開く
+    file_path = None
     if len(sys.argv) > 1:
-        file_path = sys.argv[1]
-        ext = file_path.lower()
+        ext = sys.argv[1].lower()
         if ext.endswith('.pdf') or ext.endswith('.png') or ext.endswith('.jpg') or ext.endswith('.jpeg'):
-            app.load_file(file_path)
+            file_path = sys.argv[1]
+    root.after_idle(app.finish_startup, file_path)
 
     root.mainloop()
+    app.shutdown()
 
 
 if __name__ == "__main__":
@@ -7,7 +7,9 @@ block_cipher = None
 datas = collect_data_files('tkinterdnd2')
 
 # プレースホルダー画像とアイコンを追加
+# （hippo_019_placeholder.png は起動時に縮小・透過処理をしないよう事前に加工したもの）
 datas += [('hippo_019.png', '.')]
+datas += [('hippo_019_placeholder.png', '.')]
 datas += [('hippo_019_cir.ico', '.')]
 
 a = Analysis(
@@ -22,14 +24,23 @@ a = Analysis(
         'PIL',
         'PIL.Image',
         'PIL.ImageTk',
+        # 以下は起動を速くするために最初に使う時に読み込む（importlib経由なので自動では検出されない）
+        'PIL.ImageOps',
+        'PIL.ImageDraw',
+        'numpy',
+        'pyperclip',
+        'webbrowser',
         'tkinterdnd2',
     ],
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
+    # concurrent / multiprocessing（およびその依存の pickle, socket, select, runpy）は
+    # バックグラウンドレンダリングで使うため除外しない
+    # numpy は座標一覧の読み込みとマーカーのまとめ描画で使うため除外しない
+    # argparse は一括処理（pdf_viewer.py batch）のコマンドライン引数の解析で使うため除外しない
     excludes=[
         'matplotlib',
-        'numpy',
         'pandas',
         'scipy',
         'pytest',
@@ -46,15 +57,11 @@ a = Analysis(
         'pydoc',
         'doctest',
         'asyncio',
-        'concurrent',
-        'multiprocessing',
         'sqlite3',
         'bz2',
         'lzma',
         'ssl',
-        'socket',
         'socketserver',
-        'select',
         'ftplib',
         'telnetlib',
         'smtplib',
@@ -70,7 +77,6 @@ a = Analysis(
         'cProfile',
         'pstats',
         'difflib',
-        'argparse',
         'optparse',
         'getopt',
         'wave',
@@ -88,7 +94,6 @@ a = Analysis(
         'statistics',
         'secrets',
         'calendar',
-        'pickle',
         'shelve',
         'dbm',
         'csv',
@@ -96,7 +101,6 @@ a = Analysis(
         'zipimport',
         'pkgutil',
         'modulefinder',
-        'runpy',
         'sysconfig',
         'tabnanny',
         'timeit',